@@ -0,0 +1,138 @@
+# admision.py
+"""Control de admisión y tiempo máximo de consulta por ruta.
+
+Las rutas de LIMITES_RUTA tienen un máximo de requests atendidos a la vez y
+una cola acotada: con la cola llena se responde 429 y, si la espera en la
+cola supera ESPERA_MAX, 503, ambos con Retry-After. Así una ráfaga de
+/cross_data o /all no ocupa todos los hilos ni las conexiones que usan las
+rutas baratas.
+
+Cada request recibe además un plazo (PRESUPUESTO_MS o el de su ruta). El
+progress handler de SQLite interrumpe la sentencia en curso cuando el plazo
+vence, y la app responde 503.
+"""
+import asyncio
+import contextvars
+import os
+import sqlite3
+import time
+from metricas import medicion_actual, plantilla_ruta
+
+PRESUPUESTO_MS = float(os.environ.get("MDP_PRESUPUESTO_MS", "10000"))
+PESADAS_CONCURRENTES = int(os.environ.get("MDP_PESADAS_CONCURRENTES", "2"))
+PESADAS_EN_COLA = int(os.environ.get("MDP_PESADAS_EN_COLA", "8"))
+ESPERA_MAX = float(os.environ.get("MDP_ESPERA_MAX_S", "5"))
+RETRY_AFTER = int(os.environ.get("MDP_RETRY_AFTER_S", "2"))
+# Instrucciones de la VM de SQLite entre dos llamadas al progress handler
+PASOS_PROGRESO = 10000
+# Tope de `limit` en los listados paginados y en los pares de /cross_data
+MAX_LIMIT = int(os.environ.get("MDP_MAX_LIMIT", "5000"))
+MAX_PARES = int(os.environ.get("MDP_MAX_PARES", "100000"))
+
+# plantilla de ruta -> (concurrentes, en cola, presupuesto en ms)
+LIMITES_RUTA = {
+    "/conflicto/all": (PESADAS_CONCURRENTES, PESADAS_EN_COLA, 120000),
+    "/tierras/all": (PESADAS_CONCURRENTES, PESADAS_EN_COLA, 120000),
+    "/cross_data/by/{campo}": (PESADAS_CONCURRENTES, PESADAS_EN_COLA, PRESUPUESTO_MS),
+    "/conflicto/buscar": (2 * PESADAS_CONCURRENTES, PESADAS_EN_COLA, PRESUPUESTO_MS),
+    "/conflicto/agregado": (2 * PESADAS_CONCURRENTES, PESADAS_EN_COLA, PRESUPUESTO_MS),
+    "/tierras/agregado": (2 * PESADAS_CONCURRENTES, PESADAS_EN_COLA, PRESUPUESTO_MS),
+}
+
+# Momento (time.monotonic) en que vence el request actual, o None
+plazo_actual = contextvars.ContextVar("plazo_actual", default=None)
+
+
+def _vencido():
+    plazo = plazo_actual.get()
+    return plazo is not None and time.monotonic() > plazo
+
+
+def limitar_duracion(dbapi_connection, connection_record):
+    """Listener de "connect": interrumpe las sentencias cuyo request ya venció."""
+    dbapi_connection.set_progress_handler(_vencido, PASOS_PROGRESO)
+
+
+def consulta_interrumpida(error):
+    """Verdadero si `error` es la interrupción por plazo vencido de limitar_duracion."""
+    original = getattr(error, "orig", error)
+    return isinstance(original, sqlite3.OperationalError) and str(original) == "interrupted" and _vencido()
+
+
+class Compuerta:
+    """Semáforo con cola acotada para una ruta."""
+
+    def __init__(self, concurrentes, en_cola):
+        self.semaforo = asyncio.Semaphore(concurrentes)
+        self.en_cola = en_cola
+        self.esperando = 0
+
+    async def entrar(self):
+        """"ok", "cola_llena" o "espera_vencida"."""
+        if not self.semaforo.locked():
+            # Con lugar libre acquire no espera
+            await self.semaforo.acquire()
+            return "ok"
+        if self.esperando >= self.en_cola:
+            return "cola_llena"
+        self.esperando += 1
+        try:
+            await asyncio.wait_for(self.semaforo.acquire(), ESPERA_MAX)
+        except asyncio.TimeoutError:
+            return "espera_vencida"
+        finally:
+            self.esperando -= 1
+        return "ok"
+
+    def salir(self):
+        self.semaforo.release()
+
+
+async def rechazar(send, status, detalle):
+    cuerpo = ('{"detail":"%s"}' % detalle).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(cuerpo)).encode("ascii")),
+        (b"retry-after", str(RETRY_AFTER).encode("ascii")),
+    ]})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+class AdmisionHTTP:
+    """Middleware ASGI: plazo por request y compuertas para las rutas pesadas."""
+
+    def __init__(self, app, limites=LIMITES_RUTA):
+        self.app = app
+        self.limites = limites
+        self.compuertas = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        medicion = medicion_actual.get()
+        ruta = medicion.ruta if medicion is not None else plantilla_ruta(scope)
+        limite = self.limites.get(ruta)
+        presupuesto = limite[2] if limite else PRESUPUESTO_MS
+
+        compuerta = None
+        if limite:
+            compuerta = self.compuertas.get(ruta)
+            if compuerta is None:
+                compuerta = self.compuertas[ruta] = Compuerta(limite[0], limite[1])
+            resultado = await compuerta.entrar()
+            if resultado == "cola_llena":
+                await rechazar(send, 429, "Demasiadas solicitudes para esta ruta")
+                return
+            if resultado == "espera_vencida":
+                await rechazar(send, 503, "Servicio ocupado")
+                return
+
+        token = plazo_actual.set(time.monotonic() + presupuesto / 1000) if presupuesto else None
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if token is not None:
+                plazo_actual.reset(token)
+            if compuerta is not None:
+                compuerta.salir()
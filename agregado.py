@@ -0,0 +1,104 @@
+# agregado.py
+from fastapi import HTTPException
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from models import ConflictoMaceda, TierrasTitulomerced
+from columnar import orden_sqlite
+from filtros import filtrar_conflicto, filtrar_tierras
+from geografia import diccionario_geografico, nivel_de
+
+DIMENSIONES_CONFLICTO = {
+    "año": ConflictoMaceda.año,
+    "mes": ConflictoMaceda.mes,
+    "trimestre": ConflictoMaceda.trimestre,
+    "comuna": ConflictoMaceda.comuna_gid,
+    "provincia": ConflictoMaceda.provincia_gid,
+    "region": ConflictoMaceda.region_gid,
+    "tipo_evento": ConflictoMaceda.evento_tipo_maceda,
+    "evento_tipo_maceda": ConflictoMaceda.evento_tipo_maceda,
+    "evento_especifico": ConflictoMaceda.evento_especifico,
+    "ubicacion_tipo": ConflictoMaceda.ubicacion_tipo,
+    "rural": ConflictoMaceda.rural,
+    "actor_tipo_1": ConflictoMaceda.actor_tipo_1,
+    "actor_tipo_2": ConflictoMaceda.actor_tipo_2,
+    "actor_mapuche": ConflictoMaceda.actor_mapuche,
+    "mapuche_identificado": ConflictoMaceda.mapuche_identificado,
+    "confrontacion": ConflictoMaceda.confrontacion,
+    "iniciador": ConflictoMaceda.iniciador,
+}
+MEDIDAS_CONFLICTO = {
+    "heridos": ConflictoMaceda.heridos,
+    "muertos": ConflictoMaceda.muertos,
+    "arrestos": ConflictoMaceda.arrestos,
+    "perdida_estimada": ConflictoMaceda.perdida_estimada,
+}
+
+DIMENSIONES_TIERRAS = {
+    "region": TierrasTitulomerced.region_gid,
+    "provincia": TierrasTitulomerced.provincia_gid,
+    "comuna": TierrasTitulomerced.comuna_gid,
+    "año": TierrasTitulomerced.tdm_año,
+    "tdm_letra": TierrasTitulomerced.tdm_letra,
+}
+MEDIDAS_TIERRAS = {
+    "tdm_area": TierrasTitulomerced.tdm_area,
+    "tdm_geoarea": TierrasTitulomerced.tdm_geoarea,
+    "tdm_perim": TierrasTitulomerced.tdm_perim,
+}
+
+FUNCIONES = {"sum": func.sum, "avg": func.avg, "min": func.min, "max": func.max, "count": func.count}
+
+
+def _numerico(columna):
+    """La columna solo cuando guarda un número; '' y texto quedan como NULL."""
+    return case((func.typeof(columna).in_(["integer", "real"]), columna))
+
+
+def _lista(texto):
+    return [p.strip() for p in (texto or "").split(",") if p.strip()]
+
+
+def compilar_metricas(metricas, medidas):
+    """'count,sum:heridos,avg:muertos' -> [(nombre, expresión)]."""
+    resultado = []
+    for metrica in _lista(metricas) or ["count"]:
+        funcion, _, medida = metrica.partition(":")
+        if funcion == "count" and not medida:
+            resultado.append(("count", func.count()))
+        elif funcion in FUNCIONES and medida in medidas:
+            resultado.append((f"{funcion}_{medida}", FUNCIONES[funcion](_numerico(medidas[medida]))))
+        else:
+            raise HTTPException(status_code=400, detail=f"Métrica no válida: {metrica}")
+    return resultado
+
+
+def agregar(db: Session, modelo, dimensiones, medidas, filtrar, por, metricas, limit=None, **filtros):
+    """Un solo GROUP BY con las dimensiones de `por`, las `metricas` y los filtros."""
+    nombres = _lista(por)
+    invalidas = [d for d in nombres if d not in dimensiones]
+    if invalidas:
+        raise HTTPException(status_code=400, detail=f"Dimensión no válida: {', '.join(invalidas)}")
+    columnas = [dimensiones[d].label(d) for d in nombres]
+    agregados = [expr.label(nombre) for nombre, expr in compilar_metricas(metricas, medidas)]
+    query = filtrar(db.query(*columnas, *agregados).select_from(modelo), **filtros)
+    geograficas = [d for d in nombres if nivel_de(dimensiones[d])]
+    if geograficas:
+        # Se agrupa por gid y el nombre canónico se pone después, una vez por grupo
+        filas = [dict(fila._mapping) for fila in query.group_by(*(dimensiones[d] for d in nombres))]
+        diccionario_geografico.nombrar_columnas(filas, geograficas)
+        filas.sort(key=lambda fila: tuple(orden_sqlite(fila[d]) for d in nombres))
+        return filas[:limit] if limit else filas
+    if columnas:
+        grupos = [dimensiones[d] for d in nombres]
+        query = query.group_by(*grupos).order_by(*grupos)
+    if limit:
+        query = query.limit(limit)
+    return [dict(fila._mapping) for fila in query]
+
+
+def agregar_conflicto(db: Session, por, metricas, limit=None, **filtros):
+    return agregar(db, ConflictoMaceda, DIMENSIONES_CONFLICTO, MEDIDAS_CONFLICTO, filtrar_conflicto, por, metricas, limit, **filtros)
+
+
+def agregar_tierras(db: Session, por, metricas, limit=None, **filtros):
+    return agregar(db, TierrasTitulomerced, DIMENSIONES_TIERRAS, MEDIDAS_TIERRAS, filtrar_tierras, por, metricas, limit, **filtros)
@@ -0,0 +1,253 @@
+# benchmark.py
+"""Benchmark reproducible de todos los endpoints sobre datos sintéticos.
+
+    python benchmark.py --escala 1
+    python benchmark.py --escala 10 --concurrencia 16
+    python benchmark.py --escala 1 --guardar-baseline
+
+Genera (o reutiliza) bench_<escala>.db con datos_sinteticos.py y llama a la
+app en proceso, directo por ASGI, sin red. Por escenario mide p50/p99 en
+serie, throughput con `--concurrencia` clientes simultáneos y el pico de RSS.
+Compara contra benchmark_baseline.json y termina con código 1 si algún
+escenario empeora más allá de la tolerancia.
+
+La caché de respuestas se desactiva para medir el trabajo de cada endpoint;
+`--con-cache` la deja activa.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from urllib.parse import quote, urlencode
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Debajo de esta diferencia una variación de latencia se considera ruido
+MIN_DIFERENCIA_MS = 2.0
+
+# (nombre, ruta, parámetros, pesado). Los pesados recorren la tabla completa
+# y corren menos repeticiones.
+ESCENARIOS = [
+    ("conflicto_all", "/conflicto/all", {}, True),
+    ("conflicto_all_ndjson", "/conflicto/all", {"formato": "ndjson"}, True),
+    ("tierras_all", "/tierras/all", {}, True),
+    ("conflicto_lista", "/conflicto/", {"limit": 100}, False),
+    ("conflicto_lista_filtros", "/conflicto/", {"region": "Araucanía", "tipo_evento": "Protesta", "limit": 100}, False),
+    ("conflicto_lista_multi", "/conflicto/", [("comuna", "Ercilla"), ("comuna", "Tirúa"), ("comuna", "Collipulli"), ("año_min", 2005), ("año_max", 2015), ("total", "true")], False),
+    ("conflicto_lista_offset", "/conflicto/", {"skip": 2000, "limit": 100}, False),
+    ("conflicto_lista_orden", "/conflicto/", {"orden": "año", "limit": 100}, False),
+    ("conflicto_lista_fields", "/conflicto/", {"fields": "año,comuna,evento_tipo_maceda", "limit": 1000}, False),
+    ("conflicto_actor", "/conflicto/", {"actor": "Carabineros", "limit": 100}, False),
+    ("conflicto_buscar", "/conflicto/buscar", {"q": "quema fundo"}, False),
+    ("conflicto_agregado", "/conflicto/agregado", {"por": "region,año", "metricas": "count,sum:heridos"}, False),
+    ("conflicto_serie", "/conflicto/serie/mes", {"por": "region", "ventana": 12}, False),
+    ("conflicto_count_by", "/conflicto/count_by/año", {}, False),
+    ("conflicto_id", "/conflicto/1", {}, False),
+    ("conflicto_lote", "/conflicto/lote", {"ids": ",".join(str(i) for i in range(1, 1000, 2))}, False),
+    ("tierras_lista", "/tierras/", {"limit": 100}, False),
+    ("tierras_lista_filtros", "/tierras/", {"region": "Araucanía", "area_min": 100, "limit": 100}, False),
+    ("tierras_agregado", "/tierras/agregado", {"por": "comuna", "metricas": "count,sum:tdm_area"}, False),
+    ("tierras_area_by", "/tierras/area_by/comuna", {}, False),
+    ("tierras_bbox", "/tierras/bbox", {"lon_min": -73.0, "lon_max": -72.5, "lat_min": -38.5, "lat_max": -38.0}, False),
+    ("tierras_radio", "/tierras/radio", {"lon": -72.38, "lat": -38.06, "radio_km": 15}, False),
+    ("tierras_cercanos", "/tierras/cercanos", {"lon": -72.38, "lat": -38.06, "k": 10}, False),
+    ("tierras_id", "/tierras/1", {}, False),
+    ("cross_data", "/cross_data/by/comuna", {"limit": 1000}, False),
+    ("cross_data_conteo", "/cross_data/by/comuna", {"solo_conteo": "true"}, False),
+    ("summary", "/summary/by/region", {}, False),
+    ("estadisticas_cruce", "/estadisticas/by/comuna", {"orden": "eventos_por_hectarea", "titulos_min": 1}, False),
+    ("filtro_opciones_conflicto", "/filtro_opciones/conflicto", {}, False),
+    ("filtro_opciones_tierras", "/filtro_opciones/tierras", {}, False),
+    ("filtro_opciones_sugerencias", "/filtro_opciones/conflicto/sugerencias", {"field": "actor_especifico_1", "prefix": "car"}, False),
+]
+
+
+async def pedir(app, ruta, parametros):
+    """Un GET por ASGI; devuelve (status, bytes del cuerpo)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": quote(ruta).encode("ascii"),
+        "root_path": "",
+        "query_string": urlencode(parametros).encode("ascii"),
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    enviado = False
+    respuesta = {"status": None, "tamano": 0}
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta["status"] = mensaje["status"]
+        elif mensaje["type"] == "http.response.body":
+            respuesta["tamano"] += len(mensaje.get("body", b""))
+
+    await app(scope, receive, send)
+    return respuesta["status"], respuesta["tamano"]
+
+
+def rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB, macOS bytes
+    return pico / (1024 * 1024) if platform.system() == "Darwin" else pico / 1024
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+async def medir(app, ruta, parametros, repeticiones, concurrencia):
+    status, tamano = await pedir(app, ruta, parametros)
+    if status != 200:
+        raise RuntimeError(f"{ruta} {parametros}: status {status}")
+
+    latencias = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await pedir(app, ruta, parametros)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    # `concurrencia` clientes simultáneos, cada uno con `repeticiones` pedidos seguidos
+    rechazos = []
+
+    async def cliente():
+        for _ in range(repeticiones):
+            status, _ = await pedir(app, ruta, parametros)
+            if status != 200:
+                rechazos.append(status)
+
+    total = repeticiones * concurrencia
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concurrencia)))
+    transcurrido = time.perf_counter() - inicio
+    if rechazos:
+        # 429/503 de admision.py: el req/s no sería comparable
+        raise RuntimeError(f"{ruta} {parametros}: {len(rechazos)} de {total} pedidos rechazados ({sorted(set(rechazos))})")
+
+    return {
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "rps": round(total / transcurrido, 1),
+        "bytes": tamano,
+        "rss_mb": round(rss_pico_mb(), 1),
+    }
+
+
+async def ejecutar(escenarios, repeticiones, concurrencia):
+    from main import app
+
+    await app.router.startup()
+    resultados = {}
+    try:
+        for nombre, ruta, parametros, pesado in escenarios:
+            veces = max(3, repeticiones // 10) if pesado else repeticiones
+            resultados[nombre] = await medir(app, ruta, parametros, veces, concurrencia)
+            r = resultados[nombre]
+            print(f"{nombre:28} p50 {r['p50_ms']:9.2f} ms  p99 {r['p99_ms']:9.2f} ms  {r['rps']:9.1f} req/s  RSS {r['rss_mb']:7.1f} MB")
+    finally:
+        await app.router.shutdown()
+    return resultados
+
+
+def comparar(resultados, baseline, tolerancia, tolerancia_p99, tolerancia_rss):
+    """Lista de regresiones de `resultados` respecto de `baseline`."""
+    regresiones = []
+    for nombre, actual in resultados.items():
+        base = baseline.get(nombre)
+        if base is None:
+            continue
+        for metrica, factor in (("p50_ms", tolerancia), ("p99_ms", tolerancia_p99)):
+            limite = max(base[metrica] * factor, base[metrica] + MIN_DIFERENCIA_MS)
+            if actual[metrica] > limite:
+                regresiones.append(f"{nombre}: {metrica} {actual[metrica]} > {limite:.3f} (baseline {base[metrica]})")
+        if actual["rps"] < base["rps"] / tolerancia:
+            regresiones.append(f"{nombre}: rps {actual['rps']} < {base['rps'] / tolerancia:.1f} (baseline {base['rps']})")
+    comunes = [baseline[n]["rss_mb"] for n in resultados if n in baseline]
+    pico, pico_base = max(r["rss_mb"] for r in resultados.values()), max(comunes, default=0)
+    if comunes and pico > pico_base * tolerancia_rss:
+        regresiones.append(f"RSS pico {pico} MB > {pico_base * tolerancia_rss:.1f} MB (baseline {pico_base})")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la API sobre datos sintéticos")
+    parser.add_argument("--escala", type=float, default=1)
+    parser.add_argument("--db", help="por defecto bench_<escala>.db, generada si no existe")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--solo", help="nombres de escenario separados por coma")
+    parser.add_argument("--con-cache", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--guardar-baseline", action="store_true")
+    parser.add_argument("--salida", help="escribe los resultados en este JSON")
+    parser.add_argument("--tolerancia", type=float, default=1.5)
+    parser.add_argument("--tolerancia-p99", type=float, default=2.0)
+    parser.add_argument("--tolerancia-rss", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    escala = f"{args.escala:g}"
+    db = args.db or f"bench_{escala}.db"
+    # models.py y cache.py leen la configuración al importarse
+    os.environ["MDP_DATABASE_URL"] = f"sqlite:///{db}"
+    if not args.con_cache:
+        os.environ["MDP_CACHE_BYTES"] = "0"
+    # Que la cola de las rutas pesadas admita a todos los clientes: se mide la espera, no el rechazo
+    os.environ.setdefault("MDP_PESADAS_EN_COLA", str(args.concurrencia))
+    if not os.path.exists(db):
+        import datos_sinteticos
+        from models import engine
+
+        with engine.begin() as conn:
+            datos_sinteticos.generar(conn, args.escala, args.semilla)
+
+    escenarios = ESCENARIOS
+    if args.solo:
+        nombres = set(args.solo.split(","))
+        escenarios = [e for e in ESCENARIOS if e[0] in nombres]
+    resultados = asyncio.run(ejecutar(escenarios, args.repeticiones, args.concurrencia))
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump({"escala": escala, "escenarios": resultados}, archivo, indent=2, ensure_ascii=False)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as archivo:
+            baselines = json.load(archivo)
+    if args.guardar_baseline:
+        baselines[escala] = dict(baselines.get(escala, {}), **resultados)
+        with open(args.baseline, "w", encoding="utf-8") as archivo:
+            json.dump(baselines, archivo, indent=2, ensure_ascii=False, sort_keys=True)
+            archivo.write("\n")
+        print(f"Baseline de escala {escala} guardado en {args.baseline}")
+        return 0
+    if escala not in baselines:
+        print(f"Sin baseline para escala {escala}; usar --guardar-baseline")
+        return 0
+
+    regresiones = comparar(resultados, baselines[escala], args.tolerancia, args.tolerancia_p99, args.tolerancia_rss)
+    for regresion in regresiones:
+        print(f"REGRESIÓN {regresion}")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# busqueda.py
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, table, column
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from admision import consulta_interrumpida
+from models import ConflictoMaceda
+from filtros import filtrar_conflicto
+
+COLUMNAS_TEXTO = ["descripcion", "evento_especifico", "actor_especifico_1", "actor_especifico_2"]
+# Mensajes de SQLite para una expresión MATCH mal formada
+ERRORES_FTS = ("fts5:", "unterminated string", "no such column", "unknown special query")
+
+# Índice FTS5 de contenido externo sobre conflicto_maceda; se mantiene con triggers
+conflicto_fts = table("conflicto_fts", column("rowid"))
+_fts = literal_column("conflicto_fts")
+
+_columnas = ", ".join(COLUMNAS_TEXTO)
+_nuevos = ", ".join(f"new.{c}" for c in COLUMNAS_TEXTO)
+_viejos = ", ".join(f"old.{c}" for c in COLUMNAS_TEXTO)
+
+DDL_BUSQUEDA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS conflicto_fts USING fts5(
+        {_columnas}, content='conflicto_maceda', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS conflicto_fts_ai AFTER INSERT ON conflicto_maceda
+    BEGIN
+        INSERT INTO conflicto_fts(rowid, {_columnas}) VALUES (new.id, {_nuevos});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conflicto_fts_ad AFTER DELETE ON conflicto_maceda
+    BEGIN
+        INSERT INTO conflicto_fts(conflicto_fts, rowid, {_columnas}) VALUES ('delete', old.id, {_viejos});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conflicto_fts_au AFTER UPDATE OF {_columnas} ON conflicto_maceda
+    BEGIN
+        INSERT INTO conflicto_fts(conflicto_fts, rowid, {_columnas}) VALUES ('delete', old.id, {_viejos});
+        INSERT INTO conflicto_fts(rowid, {_columnas}) VALUES (new.id, {_nuevos});
+    END""",
+]
+
+
+def preparar_busqueda(conn):
+    """Crea el índice FTS5 y sus triggers, y lo reconstruye si no cubre toda la tabla."""
+    for sentencia in DDL_BUSQUEDA:
+        conn.exec_driver_sql(sentencia)
+    indexadas = conn.exec_driver_sql("SELECT count(*) FROM conflicto_fts_docsize").scalar()
+    total = conn.exec_driver_sql("SELECT count(*) FROM conflicto_maceda").scalar()
+    if indexadas != total:
+        conn.exec_driver_sql("INSERT INTO conflicto_fts(conflicto_fts) VALUES ('rebuild')")
+
+
+def consulta_fts(q, avanzada=False):
+    """Convierte el texto del usuario en una consulta FTS5.
+
+    Por defecto cada palabra se busca literal (todas deben aparecer) y la última
+    admite prefijo, para que el campo de búsqueda funcione mientras se escribe.
+    Con `avanzada` se pasa la sintaxis FTS5 tal cual (OR, NEAR, comillas, *).
+    """
+    if avanzada:
+        return q
+    palabras = ['"' + p.replace('"', '""') + '"' for p in q.split()]
+    if not palabras:
+        raise HTTPException(status_code=400, detail="Consulta vacía")
+    palabras[-1] += "*"
+    return " ".join(palabras)
+
+
+def buscar_conflictos(db: Session, q, avanzada=False, skip=0, limit=20, **filtros):
+    """Conflictos que coinciden con `q`, ordenados por bm25, con fragmento resaltado."""
+    query = (
+        db.query(
+            ConflictoMaceda.id,
+            ConflictoMaceda.año,
+            ConflictoMaceda.fecha_reportada,
+            ConflictoMaceda.comuna,
+            ConflictoMaceda.region,
+            ConflictoMaceda.evento_tipo_maceda,
+            ConflictoMaceda.evento_especifico,
+            func.bm25(_fts).label("puntaje"),
+            func.snippet(_fts, -1, "<b>", "</b>", "…", 16).label("fragmento"),
+        )
+        .select_from(conflicto_fts)
+        .join(ConflictoMaceda, ConflictoMaceda.id == conflicto_fts.c.rowid)
+        .filter(_fts.op("MATCH")(consulta_fts(q, avanzada)))
+    )
+    query = filtrar_conflicto(query, **filtros)
+    query = query.order_by(literal_column("puntaje")).offset(skip).limit(limit)
+    try:
+        filas = query.all()
+    except OperationalError as error:
+        # Un plazo vencido lo responde la app con 503; solo la sintaxis FTS5 es culpa del cliente
+        if consulta_interrumpida(error) or not str(error.orig).startswith(ERRORES_FTS):
+            raise
+        raise HTTPException(status_code=400, detail="Consulta de búsqueda no válida")
+    return [dict(fila._mapping) for fila in filas]
@@ -0,0 +1,126 @@
+# cache.py
+import hashlib
+import os
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode
+from version import version_datos
+
+CACHE_BYTES = int(os.environ.get("MDP_CACHE_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRADA = int(os.environ.get("MDP_CACHE_MAX_ENTRADA", str(4 * 1024 * 1024)))
+CACHE_MAX_AGE = int(os.environ.get("MDP_CACHE_MAX_AGE", "0"))
+
+# Rutas cuya respuesta no depende solo de los datos
+RUTAS_SIN_CACHE = {"/metrics"}
+
+
+class CacheLRU:
+    """Respuestas completas indexadas por clave, acotadas por bytes totales."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entradas = OrderedDict()
+
+    def obtener(self, clave):
+        entrada = self.entradas.get(clave)
+        if entrada is not None:
+            self.entradas.move_to_end(clave)
+        return entrada
+
+    def guardar(self, clave, status, headers, cuerpo):
+        if clave in self.entradas:
+            self.bytes -= len(self.entradas.pop(clave)[2])
+        self.entradas[clave] = (status, headers, cuerpo)
+        self.bytes += len(cuerpo)
+        while self.bytes > self.max_bytes and self.entradas:
+            _, (_, _, viejo) = self.entradas.popitem(last=False)
+            self.bytes -= len(viejo)
+
+    def limpiar(self):
+        self.entradas.clear()
+        self.bytes = 0
+
+
+def normalizar_query(query_string):
+    """Parámetros ordenados, para que ?a=1&b=2 y ?b=2&a=1 compartan entrada."""
+    return urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+
+
+def calcular_etag(version, path, query):
+    resumen = hashlib.sha1(f"{version}\0{path}\0{query}".encode("utf-8")).hexdigest()[:24]
+    return f'"{resumen}"'.encode("ascii")
+
+
+def coincide_etag(if_none_match, etag):
+    # `*` no coincide: sin pasar por la app no se sabe si el recurso existe
+    etiquetas = [e.strip() for e in if_none_match.split(b",")]
+    return etag in etiquetas or b"W/" + etag in etiquetas
+
+
+class CacheHTTP:
+    """Middleware ASGI de GET condicional y caché de respuestas por versión del dataset.
+
+    Cada GET recibe un ETag derivado de (versión, ruta, query normalizada) y
+    Cache-Control. Un If-None-Match que coincide responde 304 sin tocar la base.
+    Las respuestas 200 de hasta CACHE_MAX_ENTRADA bytes se guardan en un LRU
+    que se vacía cuando cambia la versión.
+    """
+
+    def __init__(self, app, max_bytes=CACHE_BYTES):
+        self.app = app
+        self.cache = CacheLRU(max_bytes)
+        self.version = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] in RUTAS_SIN_CACHE:
+            await self.app(scope, receive, send)
+            return
+
+        version = version_datos()
+        if version != self.version:
+            self.cache.limpiar()
+            self.version = version
+        query = normalizar_query(scope.get("query_string", b""))
+        clave = (scope["path"], query, version)
+        etag = calcular_etag(version, scope["path"], query)
+        cabeceras_cache = [
+            (b"etag", etag),
+            (b"cache-control", f"public, max-age={CACHE_MAX_AGE}, must-revalidate".encode("ascii")),
+        ]
+
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+        if if_none_match and coincide_etag(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": cabeceras_cache})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        entrada = self.cache.obtener(clave)
+        if entrada is not None:
+            status, headers, cuerpo = entrada
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": cuerpo})
+            return
+
+        estado = {"status": None, "headers": None, "partes": [], "tamano": 0, "guardar": False}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["status"] = mensaje["status"]
+                estado["guardar"] = mensaje["status"] == 200
+                if mensaje["status"] == 200:
+                    headers = [(k, v) for k, v in mensaje.get("headers", []) if k.lower() not in (b"etag", b"cache-control")]
+                    mensaje = dict(mensaje, headers=headers + cabeceras_cache)
+                estado["headers"] = mensaje.get("headers", [])
+            elif mensaje["type"] == "http.response.body" and estado["guardar"]:
+                cuerpo = mensaje.get("body", b"")
+                estado["tamano"] += len(cuerpo)
+                if estado["tamano"] > CACHE_MAX_ENTRADA:
+                    estado["guardar"] = False
+                    estado["partes"] = []
+                else:
+                    estado["partes"].append(cuerpo)
+                    if not mensaje.get("more_body", False):
+                        self.cache.guardar(clave, estado["status"], estado["headers"], b"".join(estado["partes"]))
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
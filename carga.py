@@ -0,0 +1,149 @@
+# carga.py
+"""Carga masiva e incremental de los CSV de conflicto y tierras en mdp.db.
+
+    python carga.py conflicto conflicto_maceda.csv
+    python carga.py tierras tierras_titulomerced.csv --lote 10000
+
+Las filas cuya clave ya existe se actualizan y las demás se insertan, todo en
+una sola transacción. La clave es id_evento para conflicto y
+(tdm_numero, tdm_letra) para tierras; un valor vacío y NULL cuentan como el
+mismo, y solo las filas sin ningún valor de clave se insertan siempre.
+"""
+import argparse
+import csv
+import sys
+from dataclasses import dataclass, field
+from sqlalchemy import Integer, Float, bindparam, func, insert, select, update
+from models import engine, ConflictoMaceda, TierrasTitulomerced
+from schemas import convertir_a_int, convertir_a_float
+from geografia import asignar_geografia
+
+TAMANO_LOTE = 5000
+
+TABLAS = {
+    "conflicto": (ConflictoMaceda, ("id_evento",)),
+    "tierras": (TierrasTitulomerced, ("tdm_numero", "tdm_letra")),
+}
+
+
+def convertir_a_str(valor):
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def coerciones(tabla):
+    """Conversión por columna según su tipo, con las mismas reglas que schemas.py."""
+    resultado = {}
+    for columna in tabla.columns:
+        if isinstance(columna.type, Integer):
+            resultado[columna.name] = convertir_a_int
+        elif isinstance(columna.type, Float):
+            resultado[columna.name] = convertir_a_float
+        else:
+            resultado[columna.name] = convertir_a_str
+    return resultado
+
+
+def normalizar_llave(valores):
+    """Clave de upsert con NULL y '' como el mismo valor; None si no tiene ningún valor."""
+    llave = tuple("" if v is None else v for v in valores)
+    return None if all(v == "" for v in llave) else llave
+
+
+def convertir_lote(filas, columnas, conversiones):
+    """Convierte un lote columna por columna y lo devuelve como lista de dicts."""
+    valores = {c: list(map(conversiones[c], (f.get(c) for f in filas))) for c in columnas}
+    return [dict(zip(columnas, fila)) for fila in zip(*(valores[c] for c in columnas))]
+
+
+@dataclass
+class Resumen:
+    insertados: int = 0
+    actualizados: int = 0
+    # ids nuevos o modificados, para refrescar tablas derivadas
+    ids: list = field(default_factory=list)
+
+
+def _leer_lotes(archivo, tamano, separador):
+    lector = csv.DictReader(archivo, delimiter=separador)
+    lote = []
+    for fila in lector:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lector.fieldnames, lote
+            lote = []
+    if lote:
+        yield lector.fieldnames, lote
+
+
+def cargar(conn, nombre, archivo, tamano=TAMANO_LOTE, separador=","):
+    """Inserta o actualiza las filas del CSV `archivo` en la tabla `nombre`."""
+    modelo, clave = TABLAS[nombre]
+    tabla = modelo.__table__
+    conversiones = coerciones(tabla)
+    # En la base hay claves vacías guardadas como '' y como NULL
+    columnas_clave = [func.coalesce(tabla.c[c], "") for c in clave]
+
+    existentes = {}
+    for fila in conn.execute(select(*columnas_clave, tabla.c.id)):
+        llave = normalizar_llave(fila[:-1])
+        if llave is not None:
+            existentes[llave] = fila[-1]
+    sentencia_insert = insert(tabla)
+    # Con executemany, SET incluye las columnas presentes en los parámetros
+    sentencia_update = update(tabla).where(tabla.c.id == bindparam("_id"))
+    resumen = Resumen()
+
+    for encabezado, filas in _leer_lotes(archivo, tamano, separador):
+        columnas = [c for c in encabezado if c in conversiones and c != "id"]
+        nuevas, cambios = {}, {}
+        sin_clave = []
+        for fila in convertir_lote(filas, columnas, conversiones):
+            llave = normalizar_llave(fila.get(c) for c in clave)
+            if llave is None:
+                sin_clave.append(fila)
+            elif llave in existentes:
+                cambios[llave] = dict(fila, _id=existentes[llave])
+            else:
+                # Si la clave se repite en el archivo gana la última fila
+                nuevas[llave] = fila
+
+        if cambios:
+            conn.execute(sentencia_update, list(cambios.values()))
+            resumen.actualizados += len(cambios)
+            resumen.ids.extend(f["_id"] for f in cambios.values())
+        insertar = list(nuevas.values()) + sin_clave
+        if insertar:
+            ultimo_id = conn.execute(select(func.coalesce(func.max(tabla.c.id), 0))).scalar()
+            conn.execute(sentencia_insert, insertar)
+            resumen.insertados += len(insertar)
+            for fila in conn.execute(select(*columnas_clave, tabla.c.id).where(tabla.c.id > ultimo_id)):
+                resumen.ids.append(fila[-1])
+                llave = normalizar_llave(fila[:-1])
+                if llave is not None:
+                    existentes[llave] = fila[-1]
+    return resumen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga CSV de conflicto o tierras en mdp.db")
+    parser.add_argument("tabla", choices=sorted(TABLAS))
+    parser.add_argument("archivo")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE)
+    parser.add_argument("--separador", default=",")
+    parser.add_argument("--encoding", default="utf-8-sig")
+    args = parser.parse_args(argv)
+
+    with open(args.archivo, newline="", encoding=args.encoding) as archivo, engine.begin() as conn:
+        resumen = cargar(conn, args.tabla, archivo, args.lote, args.separador)
+        asignar_geografia(conn, TABLAS[args.tabla][0], resumen.ids)
+    # El servidor no necesita aviso: version_datos() ve el cambio en la fecha
+    # de modificación de mdp.db y su -wal, y con eso invalida sus cachés
+    print(f"{args.tabla}: {resumen.insertados} insertados, {resumen.actualizados} actualizados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# columnar.py
+import os
+import threading
+from sqlalchemy import select, func
+from models import engine_lectura, ConflictoMaceda, TierrasTitulomerced
+from schemas import convertir_a_float
+from version import version_datos
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy las agregaciones se resuelven en SQLite
+    np = None
+
+ACTIVADO = os.environ.get("MDP_COLUMNAR", "1") != "0"
+TAMANO_LOTE = 10000
+
+
+def orden_sqlite(valor):
+    """Mismo orden que GROUP BY en SQLite: NULL, números y luego texto."""
+    if valor is None:
+        return (0, 0)
+    if isinstance(valor, (int, float)):
+        return (1, valor)
+    return (2, str(valor))
+
+
+class Categorica:
+    """Columna codificada como diccionario: códigos enteros y valores ordenados."""
+
+    def __init__(self, valores):
+        vistos = {}
+        codigos = [vistos.setdefault(v, len(vistos)) for v in valores]
+        categorias = sorted(vistos, key=orden_sqlite)
+        # Recodificar para que el código siga el orden de las categorías
+        nuevo = np.empty(len(vistos), dtype=np.int32)
+        for i, v in enumerate(categorias):
+            nuevo[vistos[v]] = i
+        self.categorias = categorias
+        self.codigos = nuevo[np.asarray(codigos, dtype=np.int32)] if codigos else np.empty(0, dtype=np.int32)
+
+
+class Instantanea:
+    """Copia columnar en memoria de algunas columnas de una tabla."""
+
+    def __init__(self, categoricas, numericas):
+        columnas = list(categoricas) + list(numericas)
+        datos = [[] for _ in columnas]
+        with engine_lectura.connect() as conn:
+            resultado = conn.execution_options(stream_results=True).execute(select(*columnas))
+            for lote in resultado.partitions(TAMANO_LOTE):
+                for destino, valores in zip(datos, zip(*lote)):
+                    destino.extend(valores)
+        self.categoricas = {c.key: Categorica(v) for c, v in zip(categoricas, datos)}
+        self.numericas = {
+            c.key: np.array([convertir_a_float(x) for x in v], dtype=np.float64)
+            for c, v in zip(numericas, datos[len(categoricas):])
+        }
+
+    def contar_por(self, columna):
+        cat = self.categoricas[columna.key]
+        conteos = np.bincount(cat.codigos, minlength=len(cat.categorias))
+        return [(v, int(n)) for v, n in zip(cat.categorias, conteos)]
+
+    def sumar_por(self, columna, medida):
+        cat = self.categoricas[columna.key]
+        valores = self.numericas[medida.key]
+        validos = ~np.isnan(valores)
+        sumas = np.bincount(cat.codigos[validos], weights=valores[validos], minlength=len(cat.categorias))
+        presentes = np.bincount(cat.codigos[validos], minlength=len(cat.categorias))
+        # SUM de SQL devuelve NULL si el grupo no tiene valores
+        return [(v, float(s) if n else None) for v, s, n in zip(cat.categorias, sumas, presentes)]
+
+
+class MotorAgregaciones:
+    """Agregaciones agrupadas sobre una instantánea columnar, con SQLite como respaldo.
+
+    La instantánea se carga al iniciar y se reconstruye cuando cambia la versión
+    del dataset. Si NumPy no está instalado o MDP_COLUMNAR=0, se usa GROUP BY.
+    """
+
+    def __init__(self, categoricas, numericas):
+        self.categoricas = categoricas
+        self.numericas = numericas
+        self.instantanea = None
+        self.version = None
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self):
+        return ACTIVADO and np is not None
+
+    def cargar(self):
+        version = version_datos()
+        instantanea = Instantanea(self.categoricas, self.numericas)
+        self.instantanea, self.version = instantanea, version
+
+    def _actual(self):
+        if not self.activo:
+            return None
+        if self.version != version_datos():
+            with self._lock:
+                if self.version != version_datos():
+                    self.cargar()
+        return self.instantanea
+
+    def contar_por(self, db, columna):
+        instantanea = self._actual()
+        if instantanea is not None:
+            return instantanea.contar_por(columna)
+        return [tuple(r) for r in db.query(columna, func.count()).group_by(columna).order_by(columna)]
+
+    def sumar_por(self, db, columna, medida):
+        instantanea = self._actual()
+        if instantanea is not None:
+            return instantanea.sumar_por(columna, medida)
+        return [tuple(r) for r in db.query(columna, func.sum(medida)).group_by(columna).order_by(columna)]
+
+
+motor_conflicto = MotorAgregaciones(
+    [ConflictoMaceda.año, ConflictoMaceda.evento_tipo_maceda, ConflictoMaceda.region_gid, ConflictoMaceda.comuna_gid],
+    [],
+)
+motor_tierras = MotorAgregaciones(
+    [TierrasTitulomerced.tdm_año, TierrasTitulomerced.region_gid, TierrasTitulomerced.provincia_gid, TierrasTitulomerced.comuna_gid],
+    [TierrasTitulomerced.tdm_area],
+)
@@ -0,0 +1,233 @@
+# compresion.py
+import os
+import zlib
+from starlette.concurrency import run_in_threadpool
+from cache import CacheLRU, RUTAS_SIN_CACHE, normalizar_query, coincide_etag
+from version import version_datos
+
+try:
+    import brotli
+except ImportError:  # Sin brotli se negocia zstd o gzip
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional
+    zstandard = None
+
+COMPRESION_BYTES = int(os.environ.get("MDP_COMPRESION_BYTES", str(64 * 1024 * 1024)))
+COMPRESION_MAX_ENTRADA = int(os.environ.get("MDP_COMPRESION_MAX_ENTRADA", str(16 * 1024 * 1024)))
+# Por debajo de este tamaño comprimir no compensa
+COMPRESION_MIN_BYTES = int(os.environ.get("MDP_COMPRESION_MIN_BYTES", "1024"))
+# Respuestas estables desde este tamaño (sin comprimir) se guardan ya comprimidas
+COMPRESION_MIN_ALMACEN = int(os.environ.get("MDP_COMPRESION_MIN_ALMACEN", str(64 * 1024)))
+# Trozos más grandes se comprimen fuera del event loop
+TAMANO_EN_HILO = 64 * 1024
+
+# Descargas grandes que solo cambian con el dataset: nivel alto, una vez por versión
+RUTAS_PRECOMPRIMIDAS = {"/conflicto/all", "/tierras/all", "/filtro_opciones/conflicto", "/filtro_opciones/tierras"}
+
+TIPOS_COMPRIMIBLES = (b"application/json", b"application/x-ndjson", b"text/", b"application/vnd.apache.arrow.stream")
+
+
+class _Brotli:
+    def __init__(self, calidad):
+        self.compresor = brotli.Compressor(quality=calidad)
+
+    def compress(self, datos):
+        return self.compresor.process(datos)
+
+    def flush(self):
+        return self.compresor.finish()
+
+
+# Codificación -> fábrica de compresores (alto=True para las precomprimidas), en orden de preferencia
+CODIFICACIONES = {}
+if brotli is not None:
+    CODIFICACIONES["br"] = lambda alto: _Brotli(9 if alto else 4)
+if zstandard is not None:
+    CODIFICACIONES["zstd"] = lambda alto: zstandard.ZstdCompressor(level=12 if alto else 3).compressobj()
+CODIFICACIONES["gzip"] = lambda alto: zlib.compressobj(9 if alto else 6, zlib.DEFLATED, 31)
+
+
+def negociar(accept_encoding):
+    """Codificación preferida que acepta el cliente según Accept-Encoding, o None."""
+    pesos = {}
+    for parte in accept_encoding.decode("latin-1").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        parametro = parametros.strip()
+        if parametro.startswith("q="):
+            try:
+                calidad = float(parametro[2:])
+            except ValueError:
+                continue
+        pesos[nombre.strip().lower()] = calidad
+    candidatas = [
+        (pesos.get(c, pesos.get("*", 0.0)), -i, c) for i, c in enumerate(CODIFICACIONES)
+    ]
+    calidad, _, codificacion = max(candidatas)
+    return codificacion if calidad > 0 else None
+
+
+def etag_codificado(etag, codificacion):
+    """'"abc"' -> '"abc-gzip"': cada codificación es una representación distinta."""
+    return etag[:-1] + b"-" + codificacion.encode("ascii") + b'"'
+
+
+def _sin_sufijo(if_none_match, codificacion):
+    """If-None-Match para la capa de abajo, que solo conoce los ETag sin codificar."""
+    sufijo = f'-{codificacion}"'.encode("ascii")
+    etiquetas = []
+    for etiqueta in if_none_match.split(b","):
+        etiqueta = etiqueta.strip()
+        etiquetas.append(etiqueta[:-len(sufijo)] + b'"' if etiqueta.endswith(sufijo) else etiqueta)
+    return b", ".join(etiquetas)
+
+
+def _cabecera(headers, nombre):
+    for clave, valor in headers:
+        if clave.lower() == nombre:
+            return valor
+    return None
+
+
+def _agregar_vary(headers):
+    vary = _cabecera(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return [(k, v) for k, v in headers if k.lower() != b"vary"] + [(b"vary", vary + b", Accept-Encoding")]
+
+
+class CompresionHTTP:
+    """Middleware ASGI de compresión negociada (br, zstd si está instalado, gzip).
+
+    Las respuestas chicas se comprimen al vuelo, trozo a trozo. Las grandes y
+    estables por versión (todo GET salvo RUTAS_SIN_CACHE) se guardan ya
+    comprimidas en un LRU acotado, por (ruta, query, versión, codificación), y
+    se sirven tal cual hasta que cambia la versión del dataset. El ETag lleva la
+    codificación como sufijo y un If-None-Match con sufijo se traduce para
+    CacheHTTP, que queda debajo.
+    """
+
+    def __init__(self, app, max_bytes=COMPRESION_BYTES):
+        self.app = app
+        self.almacen = CacheLRU(max_bytes)
+        self.version = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        codificacion = negociar(headers.get(b"accept-encoding", b""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        clave = None
+        if scope["method"] == "GET" and scope["path"] not in RUTAS_SIN_CACHE:
+            version = version_datos()
+            if version != self.version:
+                self.almacen.limpiar()
+                self.version = version
+            clave = (scope["path"], normalizar_query(scope.get("query_string", b"")), version, codificacion)
+            entrada = self.almacen.obtener(clave)
+            if entrada is not None:
+                status, cabeceras, cuerpo = entrada
+                if_none_match = headers.get(b"if-none-match")
+                if if_none_match and coincide_etag(if_none_match, _cabecera(cabeceras, b"etag")):
+                    cabeceras_304 = [(k, v) for k, v in cabeceras if k in (b"etag", b"cache-control", b"vary")]
+                    await send({"type": "http.response.start", "status": 304, "headers": cabeceras_304})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                await send({"type": "http.response.start", "status": status, "headers": cabeceras})
+                await send({"type": "http.response.body", "body": cuerpo})
+                return
+
+        if_none_match = headers.get(b"if-none-match")
+        if if_none_match:
+            scope = dict(scope, headers=[
+                (k, _sin_sufijo(v, codificacion) if k == b"if-none-match" else v) for k, v in scope["headers"]
+            ])
+
+        alto = scope["path"] in RUTAS_PRECOMPRIMIDAS
+        estado = {"inicio": None, "compresor": None, "partes": [], "tamano": 0, "comprimido": 0, "guardar": False}
+
+        async def comprimir(datos, final):
+            compresor = estado["compresor"]
+            if len(datos) >= TAMANO_EN_HILO:
+                salida = await run_in_threadpool(compresor.compress, datos)
+            else:
+                salida = compresor.compress(datos)
+            if final:
+                salida += compresor.flush()
+            return salida
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = mensaje.get("headers", [])
+                if mensaje["status"] == 304:
+                    etag = _cabecera(cabeceras, b"etag")
+                    if etag is not None and if_none_match and etag_codificado(etag, codificacion) in if_none_match:
+                        cabeceras = [(k, etag_codificado(v, codificacion) if k == b"etag" else v) for k, v in cabeceras]
+                        mensaje = dict(mensaje, headers=_agregar_vary(cabeceras))
+                    await send(mensaje)
+                    return
+                tipo = _cabecera(cabeceras, b"content-type") or b""
+                largo = _cabecera(cabeceras, b"content-length")
+                if (
+                    mensaje["status"] != 200
+                    or _cabecera(cabeceras, b"content-encoding") is not None
+                    or not tipo.startswith(TIPOS_COMPRIMIBLES)
+                    or (largo is not None and int(largo) < COMPRESION_MIN_BYTES)
+                ):
+                    await send(mensaje)
+                    return
+                # Se espera al primer trozo para saber si el cuerpo viene entero
+                estado["inicio"] = mensaje
+                return
+
+            inicio = estado["inicio"]
+            if inicio is None:
+                await send(mensaje)
+                return
+            cuerpo = mensaje.get("body", b"")
+            final = not mensaje.get("more_body", False)
+            if estado["compresor"] is None:
+                estado["inicio"] = None
+                if final and len(cuerpo) < COMPRESION_MIN_BYTES:
+                    await send(inicio)
+                    await send(mensaje)
+                    return
+                cabeceras = [
+                    (k, etag_codificado(v, codificacion) if k == b"etag" else v)
+                    for k, v in inicio.get("headers", []) if k.lower() != b"content-length"
+                ]
+                cabeceras = _agregar_vary(cabeceras + [(b"content-encoding", codificacion.encode("ascii"))])
+                estado["compresor"] = CODIFICACIONES[codificacion](alto)
+                estado["guardar"] = clave is not None
+                salida = await comprimir(cuerpo, final)
+                if final:
+                    cabeceras.append((b"content-length", str(len(salida)).encode("ascii")))
+                estado["inicio"] = inicio = dict(inicio, headers=cabeceras)
+                await send(inicio)
+            else:
+                salida = await comprimir(cuerpo, final)
+
+            estado["tamano"] += len(cuerpo)
+            estado["comprimido"] += len(salida)
+            if estado["guardar"]:
+                estado["partes"].append(salida)
+                if estado["comprimido"] > COMPRESION_MAX_ENTRADA:
+                    estado["guardar"], estado["partes"] = False, []
+                elif final and (alto or estado["tamano"] >= COMPRESION_MIN_ALMACEN):
+                    guardadas = [(k, v) for k, v in inicio["headers"] if k.lower() != b"content-length"]
+                    guardadas.append((b"content-length", str(estado["comprimido"]).encode("ascii")))
+                    self.almacen.guardar(clave, inicio["status"], guardadas, b"".join(estado["partes"]))
+            if salida or final:
+                await send({"type": "http.response.body", "body": salida, "more_body": not final})
+
+        await self.app(scope, receive, enviar)
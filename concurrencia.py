@@ -0,0 +1,28 @@
+# concurrencia.py
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from models import POOL_SIZE, POOL_MAX_OVERFLOW
+
+# Un hilo por conexión disponible: más hilos solo esperarían al pool
+HILOS_LECTURA = int(os.environ.get("MDP_HILOS_LECTURA", str(POOL_SIZE + POOL_MAX_OVERFLOW)))
+
+executor_lectura = ThreadPoolExecutor(max_workers=HILOS_LECTURA, thread_name_prefix="mdp-lectura")
+
+
+def en_executor(funcion):
+    """Convierte un endpoint síncrono en `async def` que corre en el executor de lectura.
+
+    El event loop queda libre mientras SQLite trabaja, y las consultas no
+    compiten con el threadpool general de Starlette. Los contextvars del
+    request se copian al hilo.
+    """
+    @functools.wraps(funcion)
+    async def envoltorio(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        contexto = contextvars.copy_context()
+        llamada = functools.partial(contexto.run, funcion, *args, **kwargs)
+        return await loop.run_in_executor(executor_lectura, llamada)
+    return envoltorio
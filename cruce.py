@@ -0,0 +1,71 @@
+# cruce.py
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import ConflictoMaceda, TierrasTitulomerced
+from filtros import filtrar_conflicto, filtrar_tierras
+
+# Clave geográfica (gid de la tabla geografia) de cada tabla para cada campo de cruce
+CAMPOS_CRUCE = {
+    "comuna": (ConflictoMaceda.comuna_gid, TierrasTitulomerced.comuna_gid),
+    "provincia": (ConflictoMaceda.provincia_gid, TierrasTitulomerced.provincia_gid),
+    "region": (ConflictoMaceda.region_gid, TierrasTitulomerced.region_gid),
+}
+
+TAMANO_LOTE = 1000
+
+
+def _indice_tierras(db: Session, campo, filtros_tierras):
+    """Tabla hash gid -> [(tierra_id, comuna_nombre)], en orden de id."""
+    columna = CAMPOS_CRUCE[campo][1]
+    query = db.query(TierrasTitulomerced.id, columna, TierrasTitulomerced.comuna_nombre)
+    query = filtrar_tierras(query, **filtros_tierras).order_by(TierrasTitulomerced.id)
+    indice = defaultdict(list)
+    for tierra_id, gid, comuna_nombre in query.yield_per(TAMANO_LOTE):
+        if gid is not None:
+            indice[gid].append((tierra_id, comuna_nombre))
+    return indice
+
+
+def cruzar(db: Session, campo, skip=0, limit=1000, filtros_conflicto=None, filtros_tierras=None):
+    """Hash join entre conflicto_maceda y tierras_titulomerced sobre `campo`.
+
+    Construye la tabla hash con el lado de tierras y recorre conflicto en lotes,
+    de modo que el costo crece con N + M + coincidencias devueltas y no con N x M.
+    """
+    indice = _indice_tierras(db, campo, filtros_tierras or {})
+    columna = CAMPOS_CRUCE[campo][0]
+    query = db.query(ConflictoMaceda.id, columna, ConflictoMaceda.comuna)
+    query = filtrar_conflicto(query, **(filtros_conflicto or {})).order_by(ConflictoMaceda.id)
+
+    resultados = []
+    query = query.filter(columna.isnot(None))
+    for conflicto_id, gid, conflicto_comuna in query.yield_per(TAMANO_LOTE):
+        tierras = indice.get(gid)
+        if not tierras:
+            continue
+        # Saltar pares completos sin materializarlos
+        if skip >= len(tierras):
+            skip -= len(tierras)
+            continue
+        for tierra_id, tierra_comuna in tierras[skip:]:
+            resultados.append({
+                "conflicto_id": conflicto_id,
+                "conflicto_comuna": conflicto_comuna,
+                "tierra_id": tierra_id,
+                "tierra_comuna": tierra_comuna
+            })
+            if len(resultados) >= limit:
+                return resultados
+        skip = 0
+    return resultados
+
+
+def contar_cruce(db: Session, campo, filtros_conflicto=None, filtros_tierras=None):
+    """Cantidad de pares del cruce, calculada con dos GROUP BY sin generar los pares."""
+    columna_conflicto, columna_tierras = CAMPOS_CRUCE[campo]
+    query = filtrar_conflicto(db.query(columna_conflicto, func.count()), **(filtros_conflicto or {}))
+    conteo_conflicto = dict(query.filter(columna_conflicto.isnot(None)).group_by(columna_conflicto).all())
+    query = filtrar_tierras(db.query(columna_tierras, func.count()), **(filtros_tierras or {}))
+    conteo_tierras = dict(query.filter(columna_tierras.isnot(None)).group_by(columna_tierras).all())
+    return sum(n * conteo_tierras.get(gid, 0) for gid, n in conteo_conflicto.items())
@@ -0,0 +1,174 @@
+# datos_sinteticos.py
+"""Genera una mdp.db sintética con la forma de ConflictoMaceda y TierrasTitulomerced.
+
+    python datos_sinteticos.py --escala 10 --salida bench_10.db
+
+La escala 1 tiene el tamaño aproximado del dataset real; 10 y 100 lo multiplican.
+Con la misma semilla el resultado es idéntico.
+"""
+import argparse
+import os
+import random
+import sys
+
+FILAS_CONFLICTO = 4000
+FILAS_TIERRAS = 3000
+TAMANO_LOTE = 10000
+
+# (región, región_id, provincia, provincia_id, comuna, comuna_id, lon, lat)
+GEOGRAFIA = [
+    ("Biobío", 8, "Arauco", 82, "Arauco", 8202, -73.32, -37.25),
+    ("Biobío", 8, "Arauco", 82, "Cañete", 8203, -73.40, -37.80),
+    ("Biobío", 8, "Arauco", 82, "Contulmo", 8204, -73.23, -38.01),
+    ("Biobío", 8, "Arauco", 82, "Los Álamos", 8206, -73.46, -37.63),
+    ("Biobío", 8, "Arauco", 82, "Tirúa", 8207, -73.50, -38.34),
+    ("Biobío", 8, "Biobío", 83, "Alto Biobío", 8314, -71.31, -37.87),
+    ("Biobío", 8, "Biobío", 83, "Mulchén", 8305, -72.24, -37.72),
+    ("Araucanía", 9, "Cautín", 91, "Temuco", 9101, -72.60, -38.74),
+    ("Araucanía", 9, "Cautín", 91, "Padre Las Casas", 9112, -72.60, -38.77),
+    ("Araucanía", 9, "Cautín", 91, "Carahue", 9102, -73.16, -38.71),
+    ("Araucanía", 9, "Cautín", 91, "Galvarino", 9106, -72.78, -38.41),
+    ("Araucanía", 9, "Cautín", 91, "Vilcún", 9120, -72.23, -38.67),
+    ("Araucanía", 9, "Cautín", 91, "Freire", 9105, -72.63, -38.95),
+    ("Araucanía", 9, "Malleco", 92, "Ercilla", 9204, -72.38, -38.06),
+    ("Araucanía", 9, "Malleco", 92, "Collipulli", 9202, -72.43, -37.95),
+    ("Araucanía", 9, "Malleco", 92, "Lumaco", 9206, -72.91, -38.16),
+    ("Araucanía", 9, "Malleco", 92, "Traiguén", 9210, -72.67, -38.25),
+    ("Araucanía", 9, "Malleco", 92, "Victoria", 9211, -72.33, -38.23),
+    ("Los Ríos", 14, "Valdivia", 141, "Panguipulli", 14108, -72.33, -39.64),
+    ("Los Lagos", 10, "Osorno", 103, "San Juan de la Costa", 10306, -73.40, -40.52),
+]
+# Las comunas del núcleo del conflicto concentran la mayoría de los eventos
+PESOS_COMUNA = [3, 6, 3, 2, 8, 4, 2, 5, 4, 3, 4, 4, 2, 9, 8, 5, 3, 4, 2, 2]
+
+TIPOS_EVENTO = ["Protesta", "Ataque", "Toma de terreno", "Incendio", "Enfrentamiento", "Acción legal"]
+PESOS_EVENTO = [30, 20, 15, 15, 10, 10]
+EVENTOS_ESPECIFICOS = ["Marcha", "Corte de ruta", "Quema de camiones", "Ocupación de fundo", "Atentado incendiario", "Desalojo"]
+ACTORES = ["Mapuche", "Carabineros", "Empresa forestal", "Agricultor", "Estado", "Desconocido"]
+ACTOR_TIPO = ["Comunidad", "Organización", "Fuerza pública", "Privado", "Gobierno"]
+SI_NO = ["Sí", "No"]
+PALABRAS = (
+    "comunidad fundo predio forestal camión maquinaria carabineros ruta lof "
+    "recuperación territorial quema desalojo lonko werken detenidos allanamiento "
+    "tierras ancestrales título merced reivindicación marcha"
+).split()
+LETRAS = ["A", "B", "C", ""]
+
+
+def _texto(rng, n):
+    return " ".join(rng.choice(PALABRAS) for _ in range(n)).capitalize()
+
+
+def _o_vacio(rng, valor, prob=0.05):
+    """Los datos reales traen celdas vacías como ''."""
+    return "" if rng.random() < prob else valor
+
+
+def fila_conflicto(rng, i):
+    region, _, provincia, _, comuna, _, _, _ = rng.choices(GEOGRAFIA, PESOS_COMUNA)[0]
+    año = rng.randint(1990, 2021)
+    mes = rng.randint(1, 12)
+    return {
+        "id_evento": i + 1,
+        "id_evento_relacionado": rng.randint(1, i + 1) if rng.random() < 0.1 else None,
+        "año": _o_vacio(rng, año, 0.01),
+        "mes": mes,
+        "trimestre": (mes - 1) // 3 + 1,
+        "fecha_reportada": f"{año}-{mes:02d}-{rng.randint(1, 28):02d}",
+        "comuna": comuna,
+        "provincia": provincia,
+        "region": region,
+        "ubicacion_tipo": rng.choice(["Urbano", "Rural", "Camino"]),
+        "rural": rng.choice(SI_NO),
+        "evento_tipo_maceda": rng.choices(TIPOS_EVENTO, PESOS_EVENTO)[0],
+        "evento_especifico": rng.choice(EVENTOS_ESPECIFICOS),
+        "actor_tipo_1": rng.choice(ACTOR_TIPO),
+        "actor_tipo_1_nombre": rng.choice(ACTORES),
+        "actor_especifico_1": _texto(rng, 3),
+        "actor_especifico_1_num": str(rng.randint(1, 200)),
+        "actor_especifico_1_armas": rng.choice(SI_NO),
+        "actor_relacionado_1": _texto(rng, 2),
+        "actor_tipo_2": rng.choice(ACTOR_TIPO),
+        "actor_tipo_2_nombre": rng.choice(ACTORES),
+        "actor_especifico_2": _texto(rng, 3),
+        "actor_especifico_2_num": str(rng.randint(1, 200)),
+        "actor_especifico_2_armas": rng.choice(SI_NO),
+        "actor_relacionado_2": _texto(rng, 2),
+        "actor_mapuche": rng.choice(SI_NO),
+        "mapuche_identificado": rng.choice(SI_NO),
+        "confrontacion": rng.choice(SI_NO),
+        "iniciador": rng.choice(ACTORES),
+        "descripcion": _texto(rng, rng.randint(8, 30)),
+        "propiedad_destruida": rng.choice(SI_NO),
+        "propiedad_dañada": rng.choice(SI_NO),
+        "propiedad_robada": rng.choice(SI_NO),
+        "perdida_estimada": round(rng.lognormvariate(13, 2), 0) if rng.random() < 0.2 else None,
+        "arrestos": _o_vacio(rng, min(int(rng.expovariate(0.5)), 80)),
+        "heridos": _o_vacio(rng, min(int(rng.expovariate(1.5)), 40)),
+        "muertos": 1 if rng.random() < 0.01 else 0,
+        "mercurio": float(rng.randint(0, 1)),
+        "mella": float(rng.randint(0, 1)),
+        "osal": float(rng.randint(0, 1)),
+        "ciudadano": rng.choice(SI_NO),
+        "biobio": rng.choice(SI_NO),
+    }
+
+
+def fila_tierras(rng, i):
+    region, region_id, provincia, provincia_id, comuna, comuna_id, lon, lat = rng.choices(GEOGRAFIA, PESOS_COMUNA)[0]
+    return {
+        "region_id": region_id,
+        "region_nombre": region,
+        "provincia_id": provincia_id,
+        "provincia_nombre": provincia,
+        "comuna_id": comuna_id,
+        "comuna_nombre": comuna,
+        "lugar": _texto(rng, 2),
+        "tdm_beneficiario": f"{rng.choice(['Cacique', 'Lonko'])} {_texto(rng, 2)}",
+        "tdm_año": rng.randint(1884, 1929),
+        "tdm_original": rng.choice(SI_NO),
+        "tdm_numero": str(i + 1),
+        "tdm_letra": rng.choice(LETRAS),
+        "tdm_area": round(rng.lognormvariate(5, 1), 2),
+        "tdm_geoarea": round(rng.lognormvariate(5, 1), 2),
+        "tdm_perim": round(rng.lognormvariate(8, 0.5), 2),
+        "longitud_W": round(lon + rng.gauss(0, 0.12), 5),
+        "latitud_S": round(lat + rng.gauss(0, 0.12), 5),
+    }
+
+
+def generar(conn, escala=1, semilla=1):
+    """Reemplaza el contenido de ambas tablas con datos sintéticos."""
+    from sqlalchemy import insert
+    from models import ConflictoMaceda, TierrasTitulomerced
+
+    rng = random.Random(semilla)
+    for modelo, filas, fabrica in (
+        (ConflictoMaceda, int(FILAS_CONFLICTO * escala), fila_conflicto),
+        (TierrasTitulomerced, int(FILAS_TIERRAS * escala), fila_tierras),
+    ):
+        conn.execute(modelo.__table__.delete())
+        for inicio in range(0, filas, TAMANO_LOTE):
+            lote = [fabrica(rng, i) for i in range(inicio, min(inicio + TAMANO_LOTE, filas))]
+            conn.execute(insert(modelo.__table__), lote)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera una mdp.db sintética")
+    parser.add_argument("--escala", type=float, default=1)
+    parser.add_argument("--salida", default="mdp_sintetica.db")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    # models.py lee la URL al importarse
+    os.environ["MDP_DATABASE_URL"] = f"sqlite:///{args.salida}"
+    from models import engine
+
+    with engine.begin() as conn:
+        generar(conn, args.escala, args.semilla)
+    print(f"{args.salida}: escala {args.escala:g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# espacial.py
+import heapq
+import math
+from sqlalchemy import MetaData, Table, Column, Integer, Float, select, func, and_
+from models import engine_lectura, TierrasTitulomerced
+from serializacion import serializador_tierras
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+
+# Índice R*Tree sobre (longitud_W, latitud_S); se mantiene con triggers
+rtree = Table(
+    "tierras_rtree", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_lon", Float), Column("max_lon", Float),
+    Column("min_lat", Float), Column("max_lat", Float),
+)
+
+_NUMERICO = "typeof({0}.longitud_W) IN ('integer', 'real') AND typeof({0}.latitud_S) IN ('integer', 'real')"
+
+DDL_ESPACIAL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tierras_rtree USING rtree(id, min_lon, max_lon, min_lat, max_lat)",
+    f"""CREATE TRIGGER IF NOT EXISTS tierras_rtree_ai AFTER INSERT ON tierras_titulomerced
+    WHEN {_NUMERICO.format('new')}
+    BEGIN
+        INSERT INTO tierras_rtree VALUES (new.id, new.longitud_W, new.longitud_W, new.latitud_S, new.latitud_S);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tierras_rtree_ad AFTER DELETE ON tierras_titulomerced
+    BEGIN
+        DELETE FROM tierras_rtree WHERE id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tierras_rtree_au AFTER UPDATE OF id, longitud_W, latitud_S ON tierras_titulomerced
+    BEGIN
+        DELETE FROM tierras_rtree WHERE id = old.id;
+        INSERT INTO tierras_rtree SELECT new.id, new.longitud_W, new.longitud_W, new.latitud_S, new.latitud_S
+        WHERE {_NUMERICO.format('new')};
+    END""",
+]
+
+
+def preparar_espacial(conn):
+    """Crea el R*Tree y sus triggers, y lo reconstruye si no coincide con la tabla."""
+    for sentencia in DDL_ESPACIAL:
+        conn.exec_driver_sql(sentencia)
+    indexadas = conn.exec_driver_sql("SELECT count(*) FROM tierras_rtree").scalar()
+    con_coordenadas = conn.exec_driver_sql(
+        f"SELECT count(*) FROM tierras_titulomerced AS t WHERE {_NUMERICO.format('t')}"
+    ).scalar()
+    if indexadas != con_coordenadas:
+        conn.exec_driver_sql("DELETE FROM tierras_rtree")
+        conn.exec_driver_sql(
+            "INSERT INTO tierras_rtree SELECT t.id, t.longitud_W, t.longitud_W, t.latitud_S, t.latitud_S "
+            f"FROM tierras_titulomerced AS t WHERE {_NUMERICO.format('t')}"
+        )
+
+
+def distancia_km(lon1, lat1, lon2, lat2):
+    """Distancia haversine en kilómetros."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def caja_de_radio(lon, lat, radio_km):
+    """Caja (lon_min, lon_max, lat_min, lat_max) que contiene el círculo."""
+    dlat = radio_km / KM_POR_GRADO
+    coseno = math.cos(math.radians(min(abs(lat) + dlat, 89.9)))
+    dlon = min(radio_km / (KM_POR_GRADO * coseno), 180.0)
+    return lon - dlon, lon + dlon, lat - dlat, lat + dlat
+
+
+def _en_caja(conn, lon_min, lon_max, lat_min, lat_max, limit=None):
+    """Filas de tierras dentro de la caja, usando el R*Tree y verificando la coordenada exacta."""
+    t = TierrasTitulomerced
+    query = (
+        select(*serializador_tierras.columnas)
+        .select_from(rtree.join(TierrasTitulomerced.__table__, t.id == rtree.c.id))
+        .where(and_(
+            rtree.c.min_lon <= lon_max, rtree.c.max_lon >= lon_min,
+            rtree.c.min_lat <= lat_max, rtree.c.max_lat >= lat_min,
+        ))
+        # El R*Tree guarda float32 redondeado hacia afuera: se confirma con el valor real
+        .where(t.longitud_W.between(lon_min, lon_max), t.latitud_S.between(lat_min, lat_max))
+        .order_by(t.id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return serializador_tierras.dicts(conn.execute(query))
+
+
+def buscar_en_caja(lon_min, lon_max, lat_min, lat_max, limit=1000):
+    with engine_lectura.connect() as conn:
+        return _en_caja(conn, lon_min, lon_max, lat_min, lat_max, limit)
+
+
+def buscar_en_radio(lon, lat, radio_km, limit=1000):
+    with engine_lectura.connect() as conn:
+        candidatos = _en_caja(conn, *caja_de_radio(lon, lat, radio_km))
+    resultados = []
+    for fila in candidatos:
+        d = distancia_km(lon, lat, fila["longitud_W"], fila["latitud_S"])
+        if d <= radio_km:
+            fila["distancia_km"] = d
+            resultados.append(fila)
+    return heapq.nsmallest(limit, resultados, key=lambda f: f["distancia_km"])
+
+
+def buscar_cercanos(lon, lat, k=10, radio_inicial_km=5.0):
+    """k títulos más cercanos: amplía el radio hasta tener k dentro del círculo."""
+    with engine_lectura.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(rtree)).scalar()
+        k = min(k, total)
+        radio = radio_inicial_km
+        while True:
+            candidatos = _en_caja(conn, *caja_de_radio(lon, lat, radio))
+            for fila in candidatos:
+                fila["distancia_km"] = distancia_km(lon, lat, fila["longitud_W"], fila["latitud_S"])
+            dentro = [f for f in candidatos if f["distancia_km"] <= radio]
+            # Fuera del círculo no puede haber nada más cerca que lo que ya está dentro
+            if len(dentro) >= k or radio >= math.pi * RADIO_TIERRA_KM:
+                return heapq.nsmallest(k, dentro if len(dentro) >= k else candidatos, key=lambda f: f["distancia_km"])
+            radio *= 4
@@ -0,0 +1,170 @@
+# estadisticas.py
+from fastapi import HTTPException
+from sqlalchemy import MetaData, Table, Column, Integer, Float, select, case, literal, nulls_last
+from sqlalchemy.orm import Session
+from models import Geografia
+from geografia import diccionario_geografico
+from series import MEDIDAS_SERIE
+
+# Una fila por región, provincia o comuna (gid de geografia) con los eventos y
+# víctimas de conflicto_maceda y los títulos y el área de tierras_titulomerced
+# de esa entidad. Se mantiene con triggers, así que su tamaño depende de la
+# cantidad de entidades y no del de las tablas.
+estadisticas_cruce = Table(
+    "estadisticas_cruce", MetaData(),
+    Column("gid", Integer, primary_key=True),
+    Column("eventos", Integer),
+    *(Column(m, Integer) for m in MEDIDAS_SERIE),
+    Column("titulos", Integer),
+    Column("area", Float),
+)
+
+NIVELES_CRUCE = ("comuna", "provincia", "region")
+_GIDS = [f"{nivel}_gid" for nivel in NIVELES_CRUCE]
+_COLUMNAS = f"gid, eventos, {', '.join(MEDIDAS_SERIE)}, titulos, area"
+_VALOR = "CASE WHEN typeof({0}.{1}) IN ('integer', 'real') THEN {0}.{1} ELSE 0 END"
+_CEROS = ", ".join("0" for _ in MEDIDAS_SERIE)
+
+
+def _sumar_evento(fila, gid):
+    medidas = ", ".join(_VALOR.format(fila, m) for m in MEDIDAS_SERIE)
+    return f"""INSERT INTO estadisticas_cruce ({_COLUMNAS})
+        SELECT {fila}.{gid}, 1, {medidas}, 0, 0 WHERE {fila}.{gid} IS NOT NULL
+        ON CONFLICT (gid) DO UPDATE SET eventos = eventos + 1, {", ".join(f"{m} = {m} + excluded.{m}" for m in MEDIDAS_SERIE)};"""
+
+
+def _restar_evento(gid):
+    medidas = ", ".join(f"{m} = {m} - " + _VALOR.format("old", m) for m in MEDIDAS_SERIE)
+    return f"UPDATE estadisticas_cruce SET eventos = eventos - 1, {medidas} WHERE gid = old.{gid};"
+
+
+def _sumar_titulo(fila, gid):
+    return f"""INSERT INTO estadisticas_cruce ({_COLUMNAS})
+        SELECT {fila}.{gid}, 0, {_CEROS}, 1, {_VALOR.format(fila, "tdm_area")} WHERE {fila}.{gid} IS NOT NULL
+        ON CONFLICT (gid) DO UPDATE SET titulos = titulos + 1, area = area + excluded.area;"""
+
+
+def _restar_titulo(gid):
+    # Sin títulos el área vuelve a 0 exacto, sin residuos de punto flotante
+    return (
+        f"UPDATE estadisticas_cruce SET titulos = titulos - 1, "
+        f"area = CASE WHEN titulos <= 1 THEN 0 ELSE area - {_VALOR.format('old', 'tdm_area')} END WHERE gid = old.{gid};"
+    )
+
+
+_VACIAS = f"DELETE FROM estadisticas_cruce WHERE gid IN ({', '.join(f'old.{g}' for g in _GIDS)}) AND eventos <= 0 AND titulos <= 0;"
+
+
+def _triggers(tabla, prefijo, columnas, sumar, restar):
+    sumar_new = "\n        ".join(sumar("new", g) for g in _GIDS)
+    restar_old = "\n        ".join(restar(g) for g in _GIDS)
+    cambio = f"({', '.join(f'old.{c}' for c in columnas)}) IS NOT ({', '.join(f'new.{c}' for c in columnas)})"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {prefijo}_ai AFTER INSERT ON {tabla}
+    BEGIN
+        {sumar_new}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefijo}_ad AFTER DELETE ON {tabla}
+    BEGIN
+        {restar_old}
+        {_VACIAS}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefijo}_au AFTER UPDATE OF {", ".join(columnas)} ON {tabla}
+    WHEN {cambio}
+    BEGIN
+        {restar_old}
+        {sumar_new}
+        {_VACIAS}
+    END""",
+    ]
+
+
+DDL_ESTADISTICAS = [
+    f"""CREATE TABLE IF NOT EXISTS estadisticas_cruce (
+        gid INTEGER PRIMARY KEY,
+        eventos INTEGER NOT NULL, {", ".join(f"{m} INTEGER NOT NULL" for m in MEDIDAS_SERIE)},
+        titulos INTEGER NOT NULL, area REAL NOT NULL
+    )""",
+    *_triggers("conflicto_maceda", "estadisticas_conflicto", _GIDS + MEDIDAS_SERIE, _sumar_evento, _restar_evento),
+    *_triggers("tierras_titulomerced", "estadisticas_tierras", _GIDS + ["tdm_area"], _sumar_titulo, _restar_titulo),
+]
+
+# Los mismos aportes que suman los triggers, calculados desde las tablas
+_MEDIDAS_C = ", ".join(_VALOR.format("c", m) + f" AS {m}" for m in MEDIDAS_SERIE)
+_AREA_T = _VALOR.format("t", "tdm_area")
+_APORTES = " UNION ALL ".join(
+    [
+        f"SELECT c.{g} AS gid, 1 AS eventos, {_MEDIDAS_C}, 0 AS titulos, 0 AS area "
+        f"FROM conflicto_maceda AS c WHERE c.{g} IS NOT NULL"
+        for g in _GIDS
+    ] + [
+        f"SELECT t.{g}, 0, {_CEROS}, 1, {_AREA_T} FROM tierras_titulomerced AS t WHERE t.{g} IS NOT NULL"
+        for g in _GIDS
+    ]
+)
+_TOTALES = f"sum(eventos), {', '.join(f'sum({m})' for m in MEDIDAS_SERIE)}, sum(titulos), total(area)"
+
+
+def _coinciden(materializado, calculado):
+    *enteros_m, area_m = materializado
+    *enteros_c, area_c = calculado
+    return [e or 0 for e in enteros_m] == [e or 0 for e in enteros_c] and abs(area_m - area_c) <= 1e-6 * max(1.0, abs(area_c))
+
+
+def preparar_estadisticas(conn):
+    """Crea la tabla y sus triggers, y la reconstruye si sus totales no coinciden con las tablas."""
+    for sentencia in DDL_ESTADISTICAS:
+        conn.exec_driver_sql(sentencia)
+    materializado = conn.exec_driver_sql(f"SELECT {_TOTALES} FROM estadisticas_cruce").one()
+    calculado = conn.exec_driver_sql(f"SELECT {_TOTALES} FROM ({_APORTES})").one()
+    if not _coinciden(materializado, calculado):
+        conn.exec_driver_sql("DELETE FROM estadisticas_cruce")
+        conn.exec_driver_sql(
+            f"INSERT INTO estadisticas_cruce ({_COLUMNAS}) "
+            f"SELECT gid, {_TOTALES} FROM ({_APORTES}) GROUP BY gid"
+        )
+
+
+_est = estadisticas_cruce.c
+VALORES_CRUCE = {
+    "eventos": _est.eventos,
+    **{m: _est[m] for m in MEDIDAS_SERIE},
+    "titulos": _est.titulos,
+    "total_area": _est.area,
+    "eventos_por_hectarea": case((_est.area > 0, _est.eventos / _est.area), else_=None),
+    "eventos_por_titulo": case((_est.titulos > 0, _est.eventos * literal(1.0) / _est.titulos), else_=None),
+}
+
+
+def estadisticas_por(
+    db: Session, nivel, lugar=None, orden="eventos", descendente=True, limit=None,
+    eventos_min=None, titulos_min=None,
+):
+    """Eventos, víctimas, títulos y área por región, provincia o comuna, con sus razones.
+
+    `lugar` restringe a esos nombres (sin importar tildes ni mayúsculas). Las
+    razones son NULL cuando la entidad no tiene área o títulos, y van al final
+    en cualquier orden.
+    """
+    if nivel not in NIVELES_CRUCE:
+        raise HTTPException(status_code=400, detail="Campo no válido")
+    if orden != nivel and orden not in VALORES_CRUCE:
+        raise HTTPException(status_code=400, detail="Orden no válido")
+
+    query = (
+        select(Geografia.nombre, *(v.label(k) for k, v in VALORES_CRUCE.items()))
+        .select_from(estadisticas_cruce.join(Geografia, Geografia.id == _est.gid))
+        .where(Geografia.nivel == nivel)
+    )
+    if lugar:
+        query = query.where(_est.gid.in_(diccionario_geografico.gids(nivel, lugar)))
+    if eventos_min is not None:
+        query = query.where(_est.eventos >= eventos_min)
+    if titulos_min is not None:
+        query = query.where(_est.titulos >= titulos_min)
+
+    columna = Geografia.nombre if orden == nivel else VALORES_CRUCE[orden]
+    query = query.order_by(nulls_last(columna.desc() if descendente else columna.asc()), Geografia.nombre)
+    if limit is not None:
+        query = query.limit(limit)
+    return [{nivel: fila[0], **dict(zip(VALORES_CRUCE, fila[1:]))} for fila in db.execute(query)]
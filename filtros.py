@@ -0,0 +1,132 @@
+# filtros.py
+from sqlalchemy import select, union, func
+from models import ConflictoMaceda, TierrasTitulomerced
+from geografia import diccionario_geografico
+
+
+def _valores(valor):
+    """Un valor o una lista de valores (parámetro repetido) como lista sin vacíos."""
+    if valor is None:
+        return []
+    if not isinstance(valor, (list, tuple, set)):
+        valor = [valor]
+    return [v for v in dict.fromkeys(valor) if v is not None and v != ""]
+
+
+def _igual(query, columna, valor):
+    """`columna = valor`, o `columna IN (...)` si vienen varios valores."""
+    valores = _valores(valor)
+    if len(valores) == 1:
+        return query.filter(columna == valores[0])
+    if valores:
+        return query.filter(columna.in_(valores))
+    return query
+
+
+def _lugar(query, columna, nivel, valor):
+    """Filtro geográfico sobre la columna *_gid; los nombres se comparan sin tildes ni mayúsculas."""
+    valores = _valores(valor)
+    if not valores:
+        return query
+    gids = diccionario_geografico.gids(nivel, valores)
+    if len(gids) == 1:
+        return query.filter(columna == gids[0])
+    # Sin gids (nombres desconocidos) IN () no devuelve filas
+    return query.filter(columna.in_(gids))
+
+
+def _rango(query, columna, minimo=None, maximo=None):
+    """Rango cerrado sobre una columna numérica que puede guardar '' u otro texto.
+
+    SQLite ordena el texto después de cualquier número, así que sin la
+    condición de tipo `columna >= minimo` incluiría las celdas vacías.
+    """
+    if minimo is None and maximo is None:
+        return query
+    if minimo is not None:
+        query = query.filter(columna >= minimo)
+    if maximo is not None:
+        query = query.filter(columna <= maximo)
+    return query.filter(func.typeof(columna).in_(("integer", "real")))
+
+
+def ids_por_actor(actor):
+    """ids con el actor (o alguno de los actores) en cualquiera de los dos lados.
+
+    Se escribe como UNION de dos búsquedas por índice en lugar de un OR
+    entre columnas, que SQLite no siempre resuelve con índices.
+    """
+    actores = _valores(actor)
+    return union(
+        select(ConflictoMaceda.id).where(ConflictoMaceda.actor_tipo_1_nombre.in_(actores)),
+        select(ConflictoMaceda.id).where(ConflictoMaceda.actor_tipo_2_nombre.in_(actores)),
+    )
+
+
+def filtrar_conflicto(
+    query,
+    año=None,
+    comuna=None,
+    provincia=None,
+    region=None,
+    tipo_evento=None,
+    actor=None,
+    propiedad_dañada=None,
+    actor_tipo_1=None,
+    actor_tipo_2=None,
+    actor_mapuche=None,
+    mapuche_identificado=None,
+    año_min=None,
+    año_max=None,
+    heridos_min=None,
+    heridos_max=None,
+    muertos_min=None,
+    muertos_max=None,
+    arrestos_min=None,
+    arrestos_max=None,
+):
+    """Cada filtro admite un valor o una lista (IN); los *_min/*_max son rangos cerrados."""
+    query = _igual(query, ConflictoMaceda.año, año)
+    query = _lugar(query, ConflictoMaceda.comuna_gid, "comuna", comuna)
+    query = _lugar(query, ConflictoMaceda.provincia_gid, "provincia", provincia)
+    query = _lugar(query, ConflictoMaceda.region_gid, "region", region)
+    query = _igual(query, ConflictoMaceda.evento_tipo_maceda, tipo_evento)
+    if _valores(actor):
+        query = query.filter(ConflictoMaceda.id.in_(ids_por_actor(actor)))
+    query = _igual(query, ConflictoMaceda.propiedad_dañada, propiedad_dañada)
+    query = _igual(query, ConflictoMaceda.actor_tipo_1, actor_tipo_1)
+    query = _igual(query, ConflictoMaceda.actor_tipo_2, actor_tipo_2)
+    query = _igual(query, ConflictoMaceda.actor_mapuche, actor_mapuche)
+    query = _igual(query, ConflictoMaceda.mapuche_identificado, mapuche_identificado)
+    query = _rango(query, ConflictoMaceda.año, año_min, año_max)
+    query = _rango(query, ConflictoMaceda.heridos, heridos_min, heridos_max)
+    query = _rango(query, ConflictoMaceda.muertos, muertos_min, muertos_max)
+    query = _rango(query, ConflictoMaceda.arrestos, arrestos_min, arrestos_max)
+    return query
+
+
+def filtrar_tierras(
+    query,
+    region=None,
+    provincia=None,
+    comuna=None,
+    beneficiario=None,
+    año=None,
+    area_min=None,
+    area_max=None,
+    tdm_numero=None,
+    tdm_letra=None,
+    año_min=None,
+    año_max=None,
+):
+    """Cada filtro admite un valor o una lista (IN); los *_min/*_max son rangos cerrados."""
+    query = _lugar(query, TierrasTitulomerced.region_gid, "region", region)
+    query = _lugar(query, TierrasTitulomerced.provincia_gid, "provincia", provincia)
+    query = _lugar(query, TierrasTitulomerced.comuna_gid, "comuna", comuna)
+    query = _igual(query, TierrasTitulomerced.tdm_beneficiario, beneficiario)
+    query = _igual(query, TierrasTitulomerced.tdm_año, año)
+    query = _rango(query, TierrasTitulomerced.tdm_area, area_min, area_max)
+    query = _igual(query, TierrasTitulomerced.tdm_numero, tdm_numero)
+    query = _igual(query, TierrasTitulomerced.tdm_letra, tdm_letra)
+    query = _rango(query, TierrasTitulomerced.tdm_año, año_min, año_max)
+    return query
@@ -0,0 +1,182 @@
+# geografia.py
+"""Dimensión geográfica compartida por conflicto_maceda y tierras_titulomerced.
+
+Cada región, provincia y comuna tiene una fila en `geografia`, identificada
+por (nivel, clave), con clave = normalizar_clave(nombre). Las dos tablas de
+hechos guardan el id en region_gid, provincia_gid y comuna_gid, de modo que
+"Ercilla", "ERCILLA" y "Ercilla " son la misma comuna y los filtros, GROUP BY
+y cruces se hacen sobre enteros indexados.
+
+Los gid se asignan al iniciar (filas que aún no lo tienen) y en carga.py para
+las filas insertadas o actualizadas.
+"""
+import threading
+import unicodedata
+from collections import Counter
+from sqlalchemy import select, insert, update, bindparam, func, null, or_
+from models import engine_lectura, Geografia, ConflictoMaceda, TierrasTitulomerced
+from version import version_datos
+
+TAMANO_IN = 500
+
+# nivel -> (columna de nombre, columna gid, columna de código o None)
+COLUMNAS_GEO = {
+    ConflictoMaceda: {
+        "region": (ConflictoMaceda.region, ConflictoMaceda.region_gid, None),
+        "provincia": (ConflictoMaceda.provincia, ConflictoMaceda.provincia_gid, None),
+        "comuna": (ConflictoMaceda.comuna, ConflictoMaceda.comuna_gid, None),
+    },
+    TierrasTitulomerced: {
+        "region": (TierrasTitulomerced.region_nombre, TierrasTitulomerced.region_gid, TierrasTitulomerced.region_id),
+        "provincia": (TierrasTitulomerced.provincia_nombre, TierrasTitulomerced.provincia_gid, TierrasTitulomerced.provincia_id),
+        "comuna": (TierrasTitulomerced.comuna_nombre, TierrasTitulomerced.comuna_gid, TierrasTitulomerced.comuna_id),
+    },
+}
+
+
+def normalizar_clave(valor):
+    """Clave canónica: sin tildes, sin mayúsculas y con espacios colapsados."""
+    if valor is None:
+        return None
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = " ".join(texto.split()).casefold()
+    return texto or None
+
+
+def _resolver(conn, nivel, conteos):
+    """gid de cada nombre crudo; crea en `geografia` las entidades nuevas.
+
+    `conteos` es un Counter de (nombre, código) -> filas. El nombre canónico de
+    una entidad nueva es su grafía más frecuente, y el código el más frecuente
+    entre los no nulos.
+    """
+    gids = {
+        clave: gid for gid, clave in
+        conn.execute(select(Geografia.id, Geografia.clave).where(Geografia.nivel == nivel))
+    }
+    grafias, codigos = {}, {}
+    for (nombre, codigo), n in conteos.items():
+        clave = normalizar_clave(nombre)
+        if clave is None:
+            continue
+        grafias.setdefault(clave, Counter())[" ".join(str(nombre).split())] += n
+        if isinstance(codigo, int):
+            codigos.setdefault(clave, Counter())[codigo] += n
+
+    nuevas = [c for c in grafias if c not in gids]
+    if nuevas:
+        conn.execute(insert(Geografia), [
+            {"nivel": nivel, "clave": c, "nombre": grafias[c].most_common(1)[0][0],
+             "codigo": codigos[c].most_common(1)[0][0] if c in codigos else None}
+            for c in nuevas
+        ])
+        gids.update(conn.execute(
+            select(Geografia.clave, Geografia.id).where(Geografia.nivel == nivel, Geografia.clave.in_(nuevas))
+        ).all())
+    completar = [{"_gid": gids[c], "_codigo": codigos[c].most_common(1)[0][0]} for c in codigos if c not in nuevas]
+    if completar:
+        conn.execute(
+            update(Geografia).where(Geografia.id == bindparam("_gid"), Geografia.codigo.is_(None))
+            .values(codigo=bindparam("_codigo")),
+            completar,
+        )
+    return {nombre: gids.get(normalizar_clave(nombre)) for nombre, _ in conteos}
+
+
+def asignar_geografia(conn, modelo, ids=None):
+    """Completa los *_gid de `modelo`: de toda la tabla o solo de las filas `ids`."""
+    tabla = modelo.__table__
+    niveles = COLUMNAS_GEO[modelo]
+    if ids is None:
+        for nivel, (nombre, gid, codigo) in niveles.items():
+            agrupar = [nombre] if codigo is None else [nombre, codigo]
+            query = select(nombre, codigo if codigo is not None else null(), func.count()).group_by(*agrupar)
+            conteos = Counter({(n, c): total for n, c, total in conn.execute(query)})
+            gids = _resolver(conn, nivel, conteos)
+            por_nombre = {n: g for n, g in gids.items() if n is not None}
+            if por_nombre:
+                conn.execute(
+                    update(tabla).where(nombre == bindparam("_nombre")).values({gid.key: bindparam("_gid")}),
+                    [{"_nombre": n, "_gid": g} for n, g in por_nombre.items()],
+                )
+            conn.execute(update(tabla).where(nombre.is_(None)).values({gid.key: None}))
+        return
+
+    for inicio in range(0, len(ids), TAMANO_IN):
+        bloque = ids[inicio:inicio + TAMANO_IN]
+        columnas = [c for nombre, _, codigo in niveles.values() for c in (nombre, codigo)]
+        filas = conn.execute(
+            select(tabla.c.id, *(c if c is not None else null() for c in columnas)).where(tabla.c.id.in_(bloque))
+        ).all()
+        cambios = {fila[0]: {"_id": fila[0]} for fila in filas}
+        for i, (nivel, (_, gid, _)) in enumerate(niveles.items()):
+            conteos = Counter((fila[1 + 2 * i], fila[2 + 2 * i]) for fila in filas)
+            gids = _resolver(conn, nivel, conteos)
+            for fila in filas:
+                cambios[fila[0]][gid.key] = gids.get(fila[1 + 2 * i])
+        if cambios:
+            conn.execute(update(tabla).where(tabla.c.id == bindparam("_id")), list(cambios.values()))
+
+
+def preparar_geografia(conn):
+    """Asigna gid a las filas que tienen nombre geográfico pero todavía no su clave."""
+    for modelo, niveles in COLUMNAS_GEO.items():
+        pendientes = or_(*(gid.is_(None) & (func.trim(nombre) != "") for nombre, gid, _ in niveles.values()))
+        hay = conn.execute(select(func.count()).select_from(modelo).where(pendientes)).scalar()
+        if hay:
+            asignar_geografia(conn, modelo)
+            # Las estadísticas de los índices *_gid se tomaron cuando estaban vacíos
+            conn.exec_driver_sql(f'ANALYZE "{modelo.__tablename__}"')
+
+
+class DiccionarioGeografico:
+    """gid <-> nombre en memoria, recargado cuando cambia la versión del dataset."""
+
+    def __init__(self):
+        self.version = None
+        self.nombres = {}
+        self.por_clave = {}
+        self._lock = threading.Lock()
+
+    def _actual(self):
+        version = version_datos()
+        if self.version != version:
+            with self._lock:
+                if self.version != version:
+                    with engine_lectura.connect() as conn:
+                        filas = conn.execute(select(Geografia.id, Geografia.nivel, Geografia.clave, Geografia.nombre)).all()
+                    self.nombres = {gid: nombre for gid, _, _, nombre in filas}
+                    self.por_clave = {(nivel, clave): gid for gid, nivel, clave, _ in filas}
+                    self.version = version
+        return self
+
+    def nombre(self, gid):
+        return self._actual().nombres.get(gid)
+
+    def gids(self, nivel, valores):
+        """gid de cada nombre en `valores` (sin importar tildes ni mayúsculas); omite los desconocidos."""
+        por_clave = self._actual().por_clave
+        encontrados = (por_clave.get((nivel, normalizar_clave(v))) for v in valores)
+        return [gid for gid in encontrados if gid is not None]
+
+    def nombrar(self, filas):
+        """Filas (gid, valor...) -> (nombre, valor...), ordenadas por nombre con NULL primero."""
+        nombres = self._actual().nombres
+        return sorted(((nombres.get(f[0]),) + tuple(f[1:]) for f in filas), key=lambda f: (f[0] is not None, f[0] or ""))
+
+    def nombrar_columnas(self, filas, columnas):
+        """Reemplaza, en cada dict de `filas`, el gid de `columnas` por su nombre."""
+        nombres = self._actual().nombres
+        for fila in filas:
+            for columna in columnas:
+                fila[columna] = nombres.get(fila[columna])
+        return filas
+
+
+diccionario_geografico = DiccionarioGeografico()
+
+
+def nivel_de(columna):
+    """'comuna' para comuna_gid, etc.; None si la columna no es una clave geográfica."""
+    return columna.key[:-len("_gid")] if columna.key.endswith("_gid") else None
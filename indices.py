@@ -0,0 +1,99 @@
+# indices.py
+"""Crea los índices declarados en models.py y verifica con EXPLAIN QUERY PLAN que se usen.
+
+    python indices.py            # crea los índices faltantes y muestra los planes
+"""
+import sys
+from sqlalchemy import func
+from models import engine, crear_indices, SessionLocal, ConflictoMaceda, TierrasTitulomerced
+from filtros import filtrar_conflicto, filtrar_tierras
+from paginacion import ORDEN_CONFLICTO, ORDEN_TIERRAS
+
+TABLAS = (ConflictoMaceda.__tablename__, TierrasTitulomerced.__tablename__)
+
+
+def plan_de_consulta(conn, query):
+    """Líneas de EXPLAIN QUERY PLAN para una consulta ORM o Core."""
+    stmt = getattr(query, "statement", query)
+    compilado = stmt.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    parametros = tuple(compilado.params[nombre] for nombre in compilado.positiontup)
+    filas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compilado), parametros)
+    return [fila[-1] for fila in filas]
+
+
+def usa_indice(plan):
+    """Falso si alguna tabla base se recorre completa sin índice o se ordena aparte."""
+    for linea in plan:
+        if linea.startswith("SCAN") and any(t in linea for t in TABLAS) and "USING" not in linea:
+            return False
+        if linea.startswith("USE TEMP B-TREE") and "ORDER BY" in linea:
+            return False
+    return True
+
+
+def consultas_de_referencia(db):
+    """Consultas representativas de cada endpoint con filtros o agrupaciones."""
+    conflicto = db.query(ConflictoMaceda)
+    tierras = db.query(TierrasTitulomerced)
+    consultas = {
+        "/conflicto/?año": filtrar_conflicto(conflicto, año=2010),
+        "/conflicto/?comuna": filtrar_conflicto(conflicto, comuna="Ercilla"),
+        "/conflicto/?comuna&comuna": filtrar_conflicto(conflicto, comuna=["Ercilla", "Tirúa", "Cañete"]),
+        "/conflicto/?año_min&año_max": filtrar_conflicto(conflicto, año_min=2005, año_max=2010),
+        "/conflicto/?provincia": filtrar_conflicto(conflicto, provincia="Malleco"),
+        "/conflicto/?region&año": filtrar_conflicto(conflicto, region="Araucanía", año=2010),
+        "/conflicto/?tipo_evento": filtrar_conflicto(conflicto, tipo_evento="Protesta"),
+        "/conflicto/?actor": filtrar_conflicto(conflicto, actor="Carabineros"),
+        "/conflicto/?propiedad_dañada": filtrar_conflicto(conflicto, propiedad_dañada="Sí"),
+        "/conflicto/?actor_tipo_1": filtrar_conflicto(conflicto, actor_tipo_1="Estado"),
+        "/conflicto/?actor_tipo_2": filtrar_conflicto(conflicto, actor_tipo_2="Estado"),
+        "/conflicto/?actor_mapuche": filtrar_conflicto(conflicto, actor_mapuche="Sí"),
+        "/conflicto/?mapuche_identificado": filtrar_conflicto(conflicto, mapuche_identificado="Sí"),
+        "/tierras/?region": filtrar_tierras(tierras, region="Araucanía"),
+        "/tierras/?provincia": filtrar_tierras(tierras, provincia="Malleco"),
+        "/tierras/?comuna": filtrar_tierras(tierras, comuna="Ercilla"),
+        "/tierras/?beneficiario": filtrar_tierras(tierras, beneficiario="Juan"),
+        "/tierras/?año": filtrar_tierras(tierras, año=1890),
+        "/tierras/?año_min&año_max": filtrar_tierras(tierras, año_min=1890, año_max=1900),
+        "/tierras/?area_min&area_max": filtrar_tierras(tierras, area_min=10, area_max=100),
+        "/tierras/?tdm_numero&tdm_letra": filtrar_tierras(tierras, tdm_numero="1", tdm_letra="A"),
+    }
+    for columna in (ConflictoMaceda.año, ConflictoMaceda.evento_tipo_maceda, ConflictoMaceda.region_gid):
+        consultas[f"/conflicto/count_by/{columna.key}"] = db.query(columna, func.count(ConflictoMaceda.id)).group_by(columna)
+    for columna in (TierrasTitulomerced.region_gid, TierrasTitulomerced.provincia_gid, TierrasTitulomerced.comuna_gid):
+        consultas[f"/tierras/area_by/{columna.key}"] = db.query(columna, func.sum(TierrasTitulomerced.tdm_area)).group_by(columna)
+    # Primera página de cada orden de la paginación por cursor
+    for ruta, query, modelo, ordenes in (
+        ("/conflicto/", conflicto, ConflictoMaceda, ORDEN_CONFLICTO),
+        ("/tierras/", tierras, TierrasTitulomerced, ORDEN_TIERRAS),
+    ):
+        for orden, columna in ordenes.items():
+            if columna is not modelo.id:
+                consultas[f"{ruta}?orden={orden}"] = query.order_by(columna, modelo.id).limit(100)
+    return consultas
+
+
+def verificar_planes():
+    """Muestra el plan de cada consulta de referencia; devuelve las que no usan índices."""
+    db = SessionLocal()
+    sin_indice = []
+    try:
+        with engine.connect() as conn:
+            for nombre, query in consultas_de_referencia(db).items():
+                plan = plan_de_consulta(conn, query)
+                estado = "ok" if usa_indice(plan) else "SIN ÍNDICE"
+                print(f"{estado:11} {nombre}")
+                for linea in plan:
+                    print(f"{'':11}   {linea}")
+                if estado != "ok":
+                    sin_indice.append(nombre)
+    finally:
+        db.close()
+    return sin_indice
+
+
+if __name__ == "__main__":
+    with engine.begin() as conn:
+        for nombre in crear_indices(conn):
+            print(f"índice creado: {nombre}")
+    sys.exit(1 if verificar_planes() else 0)
@@ -0,0 +1,36 @@
+# lote.py
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+# Por debajo del límite de variables de SQLite y con planes de IN cortos
+TAMANO_IN = 500
+MAX_IDS_LOTE = 10000
+
+
+def parsear_ids(texto):
+    """'1,2,3' -> [1, 2, 3]."""
+    try:
+        return [int(p) for p in (texto or "").split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids no válidos")
+
+
+def buscar_por_ids(db: Session, serializador, ids):
+    """Filas de `ids` en el orden pedido, con None para los que no existen.
+
+    Devuelve (items, faltantes). Los ids repetidos se resuelven una vez y
+    aparecen en cada posición en que se pidieron.
+    """
+    if len(ids) > MAX_IDS_LOTE:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_IDS_LOTE} ids por lote")
+    modelo_id = serializador.modelo.id
+    unicos = list(dict.fromkeys(ids))
+    encontrados = {}
+    for inicio in range(0, len(unicos), TAMANO_IN):
+        bloque = unicos[inicio:inicio + TAMANO_IN]
+        filas = db.query(*serializador.columnas, modelo_id).filter(modelo_id.in_(bloque)).all()
+        for fila, datos in zip(filas, serializador.dicts(filas)):
+            encontrados[fila[-1]] = datos
+    items = [encontrados.get(i) for i in ids]
+    faltantes = [i for i in unicos if i not in encontrados]
+    return items, faltantes
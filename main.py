@@ -1,11 +1,84 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from models import SessionLocal, ConflictoMaceda as ConflictoMacedaModel, TierrasTitulomerced as TierrasTitulomercedModel
-from schemas import ConflictoMaceda, TierrasTitulomerced, ConflictoFiltroOpciones, TierrasFiltroOpciones
-from typing import List, Dict, Any
+from models import engine, consolidar_wal, SessionLocal, ConflictoMaceda as ConflictoMacedaModel, TierrasTitulomerced as TierrasTitulomercedModel
+from schemas import ConflictoMaceda, TierrasTitulomerced, ConflictoFiltroOpciones, TierrasFiltroOpciones, LoteIds
+from typing import List, Dict, Any, Union
 from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from admision import AdmisionHTTP, MAX_LIMIT, MAX_PARES, RETRY_AFTER, consulta_interrumpida
+from cache import CacheHTTP
+from compresion import CompresionHTTP
+from metricas import MetricasHTTP, registro
+from agregado import agregar_conflicto, agregar_tierras
+from busqueda import preparar_busqueda, buscar_conflictos
+from concurrencia import en_executor
+from columnar import motor_conflicto, motor_tierras
+from cruce import CAMPOS_CRUCE, cruzar, contar_cruce
+from espacial import preparar_espacial, buscar_en_caja, buscar_en_radio, buscar_cercanos
+from estadisticas import preparar_estadisticas, estadisticas_por
+from filtros import filtrar_conflicto, filtrar_tierras
+from geografia import preparar_geografia, diccionario_geografico, nivel_de
+from lote import parsear_ids, buscar_por_ids
+from opciones import cache_conflicto, cache_tierras
+from series import AÑO_MIN, AÑO_MAX, preparar_series, serie_conflictos
+from serializacion import serializador_conflicto, serializador_tierras, exportar, codificar_json
+from paginacion import ORDEN_CONFLICTO, ORDEN_TIERRAS, CABECERA_CURSOR, CABECERA_TOTAL, paginar
 
 app = FastAPI()
+# Debajo de la caché: las respuestas ya guardadas no ocupan lugar en las compuertas
+app.add_middleware(AdmisionHTTP)
+app.add_middleware(CacheHTTP)
+# Sobre la caché, que guarda las respuestas sin comprimir y resuelve los ETag base
+app.add_middleware(CompresionHTTP)
+# Afuera de la caché, para medir también las respuestas servidas desde ella
+app.add_middleware(MetricasHTTP)
+
+CAMPOS_CONTEO = {
+    "año": ConflictoMacedaModel.año,
+    "tipo_evento": ConflictoMacedaModel.evento_tipo_maceda,
+    "region": ConflictoMacedaModel.region_gid,
+}
+CAMPOS_AREA = {
+    "region": TierrasTitulomercedModel.region_gid,
+    "provincia": TierrasTitulomercedModel.provincia_gid,
+    "comuna": TierrasTitulomercedModel.comuna_gid,
+}
+CAMPOS_RESUMEN = {
+    "año": (ConflictoMacedaModel.año, TierrasTitulomercedModel.tdm_año),
+    "comuna": (ConflictoMacedaModel.comuna_gid, TierrasTitulomercedModel.comuna_gid),
+    "region": (ConflictoMacedaModel.region_gid, TierrasTitulomercedModel.region_gid),
+}
+
+@app.on_event("startup")
+def iniciar():
+    with engine.begin() as conn:
+        preparar_geografia(conn)
+        preparar_espacial(conn)
+        preparar_busqueda(conn)
+        preparar_series(conn)
+        preparar_estadisticas(conn)
+    # Antes de la primera lectura: las conexiones immutable no leen el WAL
+    consolidar_wal()
+    if motor_conflicto.activo:
+        motor_conflicto.cargar()
+        motor_tierras.cargar()
+
+@app.exception_handler(OperationalError)
+async def consulta_vencida(request: Request, error: OperationalError):
+    if not consulta_interrumpida(error):
+        raise error
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "La consulta excedió el tiempo máximo"},
+        headers={"Retry-After": str(RETRY_AFTER)},
+    )
+
+def con_nombres(columna, filas):
+    """Traduce el gid de la primera columna a su nombre cuando `columna` es geográfica."""
+    if nivel_de(columna):
+        return diccionario_geografico.nombrar(filas)
+    return filas
 
 def get_db():
     db = SessionLocal()
@@ -15,139 +88,360 @@ def get_db():
         db.close()
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=registro.exportar(), media_type="text/plain; version=0.0.4")
+
 @app.get("/conflicto/all", response_model=List[ConflictoMaceda])
-def read_all_conflicto(db: Session = Depends(get_db)):
-    items = db.query(ConflictoMacedaModel).all()
-    return [ConflictoMaceda.from_orm(item) for item in items]
+@en_executor
+def read_all_conflicto(formato: str = "json", fields: str = None):
+    return exportar(serializador_conflicto.proyectar(fields), formato, nombre="conflicto")
 
 @app.get("/tierras/all", response_model=List[TierrasTitulomerced])
-def read_all_tierras(db: Session = Depends(get_db)):
-    items = db.query(TierrasTitulomercedModel).all()
-    return [TierrasTitulomerced.from_orm(item) for item in items]
+@en_executor
+def read_all_tierras(formato: str = "json", fields: str = None):
+    return exportar(serializador_tierras.proyectar(fields), formato, nombre="tierras")
 
 @app.get("/conflicto/", response_model=List[ConflictoMaceda])
+@en_executor
 def read_conflicto(
-    skip: int = 0, 
-    limit: int = 100, 
-    año: int = None, 
-    comuna: str = None, 
-    provincia: str = None, 
-    region: str = None, 
-    tipo_evento: str = None, 
-    actor: str = None, 
-    propiedad_dañada: str = None, 
-    actor_tipo_1: str = None,
-    actor_tipo_2: str = None,
-    actor_mapuche: str = None,
-    mapuche_identificado: str = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    año: List[int] = Query(None), 
+    comuna: List[str] = Query(None), 
+    provincia: List[str] = Query(None), 
+    region: List[str] = Query(None), 
+    tipo_evento: List[str] = Query(None), 
+    actor: List[str] = Query(None), 
+    propiedad_dañada: List[str] = Query(None), 
+    actor_tipo_1: List[str] = Query(None),
+    actor_tipo_2: List[str] = Query(None),
+    actor_mapuche: List[str] = Query(None),
+    mapuche_identificado: List[str] = Query(None),
+    año_min: int = None,
+    año_max: int = None,
+    heridos_min: int = None,
+    heridos_max: int = None,
+    muertos_min: int = None,
+    muertos_max: int = None,
+    arrestos_min: int = None,
+    arrestos_max: int = None,
+    cursor: str = None,
+    orden: str = "id",
+    fields: str = None,
+    total: bool = False,
+    db: Session = Depends(get_db)
+):
+    serializador = serializador_conflicto.proyectar(fields)
+    query = filtrar_conflicto(
+        db.query(*serializador.columnas, ConflictoMacedaModel.id, ORDEN_CONFLICTO.get(orden, ConflictoMacedaModel.id)),
+        año=año,
+        comuna=comuna,
+        provincia=provincia,
+        region=region,
+        tipo_evento=tipo_evento,
+        actor=actor,
+        propiedad_dañada=propiedad_dañada,
+        actor_tipo_1=actor_tipo_1,
+        actor_tipo_2=actor_tipo_2,
+        actor_mapuche=actor_mapuche,
+        mapuche_identificado=mapuche_identificado,
+        año_min=año_min,
+        año_max=año_max,
+        heridos_min=heridos_min,
+        heridos_max=heridos_max,
+        muertos_min=muertos_min,
+        muertos_max=muertos_max,
+        arrestos_min=arrestos_min,
+        arrestos_max=arrestos_max
+    )
+    items, siguiente, cuenta = paginar(query, ConflictoMacedaModel, ORDEN_CONFLICTO, orden, cursor, limit, skip, contar=total)
+    headers = {}
+    if siguiente:
+        headers[CABECERA_CURSOR] = siguiente
+    if cuenta is not None:
+        headers[CABECERA_TOTAL] = str(cuenta)
+    return Response(content=serializador.a_json(items), media_type="application/json", headers=headers)
+
+@app.get("/conflicto/buscar", response_model=List[Dict[str, Any]])
+@en_executor
+def search_conflicto(
+    q: str,
+    avanzada: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    año: int = None,
+    region: str = None,
+    tipo_evento: str = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(ConflictoMacedaModel)
-    if año:
-        query = query.filter(ConflictoMacedaModel.año == año)
-    if comuna:
-        query = query.filter(ConflictoMacedaModel.comuna == comuna)
-    if provincia:
-        query = query.filter(ConflictoMacedaModel.provincia == provincia)
-    if region:
-        query = query.filter(ConflictoMacedaModel.region == region)
-    if tipo_evento:
-        query = query.filter(ConflictoMacedaModel.evento_tipo_maceda == tipo_evento)
-    if actor:
-        query = query.filter((ConflictoMacedaModel.actor_tipo_1_nombre == actor) | (ConflictoMacedaModel.actor_tipo_2_nombre == actor))
-    if propiedad_dañada:
-        query = query.filter(ConflictoMacedaModel.propiedad_dañada == propiedad_dañada)
-    if actor_tipo_1:
-        query = query.filter(ConflictoMacedaModel.actor_tipo_1 == actor_tipo_1)
-    if actor_tipo_2:
-        query = query.filter(ConflictoMacedaModel.actor_tipo_2 == actor_tipo_2)
-    if actor_mapuche:
-        query = query.filter(ConflictoMacedaModel.actor_mapuche == actor_mapuche)
-    if mapuche_identificado:
-        query = query.filter(ConflictoMacedaModel.mapuche_identificado == mapuche_identificado)
-    
-    items = query.offset(skip).limit(limit).all()
-    return [ConflictoMaceda.from_orm(item) for item in items]
+    return buscar_conflictos(db, q, avanzada, skip, limit, año=año, region=region, tipo_evento=tipo_evento)
+
+@app.get("/conflicto/agregado", response_model=List[Dict[str, Any]])
+@en_executor
+def aggregate_conflicto(
+    por: str = None,
+    metricas: str = "count",
+    limit: int = Query(None, ge=1, le=MAX_LIMIT),
+    año: List[int] = Query(None),
+    comuna: List[str] = Query(None),
+    provincia: List[str] = Query(None),
+    region: List[str] = Query(None),
+    tipo_evento: List[str] = Query(None),
+    actor: List[str] = Query(None),
+    propiedad_dañada: List[str] = Query(None),
+    actor_tipo_1: List[str] = Query(None),
+    actor_tipo_2: List[str] = Query(None),
+    actor_mapuche: List[str] = Query(None),
+    mapuche_identificado: List[str] = Query(None),
+    año_min: int = None,
+    año_max: int = None,
+    heridos_min: int = None,
+    heridos_max: int = None,
+    muertos_min: int = None,
+    muertos_max: int = None,
+    arrestos_min: int = None,
+    arrestos_max: int = None,
+    db: Session = Depends(get_db)
+):
+    return agregar_conflicto(
+        db, por, metricas, limit,
+        año=año,
+        comuna=comuna,
+        provincia=provincia,
+        region=region,
+        tipo_evento=tipo_evento,
+        actor=actor,
+        propiedad_dañada=propiedad_dañada,
+        actor_tipo_1=actor_tipo_1,
+        actor_tipo_2=actor_tipo_2,
+        actor_mapuche=actor_mapuche,
+        mapuche_identificado=mapuche_identificado,
+        año_min=año_min,
+        año_max=año_max,
+        heridos_min=heridos_min,
+        heridos_max=heridos_max,
+        muertos_min=muertos_min,
+        muertos_max=muertos_max,
+        arrestos_min=arrestos_min,
+        arrestos_max=arrestos_max
+    )
+
+@app.get("/conflicto/serie/{periodo}", response_model=List[Dict[str, Any]])
+@en_executor
+def serie_conflicto(
+    periodo: str,
+    por: str = None,
+    ventana: int = None,
+    acumulado: bool = False,
+    desde: int = Query(None, ge=AÑO_MIN, le=AÑO_MAX),
+    hasta: int = Query(None, ge=AÑO_MIN, le=AÑO_MAX),
+    region: str = None,
+    tipo_evento: str = None,
+    db: Session = Depends(get_db)
+):
+    serie = serie_conflictos(db, periodo, por, ventana, acumulado, desde, hasta, region=region, tipo_evento=tipo_evento)
+    # Una serie mensual por grupo tiene miles de puntos: se codifica sin pasar por pydantic
+    return Response(content=codificar_json(serie), media_type="application/json")
 
 @app.get("/tierras/", response_model=List[TierrasTitulomerced])
+@en_executor
 def read_tierras(
-    skip: int = 0, 
-    limit: int = 100, 
-    region: str = None, 
-    provincia: str = None, 
-    comuna: str = None, 
-    beneficiario: str = None, 
-    año: int = None, 
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    region: List[str] = Query(None), 
+    provincia: List[str] = Query(None), 
+    comuna: List[str] = Query(None), 
+    beneficiario: List[str] = Query(None), 
+    año: List[int] = Query(None), 
     area_min: float = None, 
     area_max: float = None, 
-    tdm_numero: str = None,
-    tdm_letra: str = None,
+    tdm_numero: List[str] = Query(None),
+    tdm_letra: List[str] = Query(None),
+    año_min: int = None,
+    año_max: int = None,
+    cursor: str = None,
+    orden: str = "id",
+    fields: str = None,
+    total: bool = False,
     db: Session = Depends(get_db)
 ):
-    query = db.query(TierrasTitulomercedModel)
-    if region:
-        query = query.filter(TierrasTitulomercedModel.region_nombre == region)
-    if provincia:
-        query = query.filter(TierrasTitulomercedModel.provincia_nombre == provincia)
-    if comuna:
-        query = query.filter(TierrasTitulomercedModel.comuna_nombre == comuna)
-    if beneficiario:
-        query = query.filter(TierrasTitulomercedModel.tdm_beneficiario == beneficiario)
-    if año:
-        query = query.filter(TierrasTitulomercedModel.tdm_año == año)
-    if area_min:
-        query = query.filter(TierrasTitulomercedModel.tdm_area >= area_min)
-    if area_max:
-        query = query.filter(TierrasTitulomercedModel.tdm_area <= area_max)
-    if tdm_numero:
-        query = query.filter(TierrasTitulomercedModel.tdm_numero == tdm_numero)
-    if tdm_letra:
-        query = query.filter(TierrasTitulomercedModel.tdm_letra == tdm_letra)
-    
-    items = query.offset(skip).limit(limit).all()
-    return [TierrasTitulomerced.from_orm(item) for item in items]
-
-@app.get("/conflicto/count_by/{campo}", response_model=List[Dict[str, int]])
+    serializador = serializador_tierras.proyectar(fields)
+    query = filtrar_tierras(
+        db.query(*serializador.columnas, TierrasTitulomercedModel.id, ORDEN_TIERRAS.get(orden, TierrasTitulomercedModel.id)),
+        region=region,
+        provincia=provincia,
+        comuna=comuna,
+        beneficiario=beneficiario,
+        año=año,
+        area_min=area_min,
+        area_max=area_max,
+        tdm_numero=tdm_numero,
+        tdm_letra=tdm_letra,
+        año_min=año_min,
+        año_max=año_max
+    )
+    items, siguiente, cuenta = paginar(query, TierrasTitulomercedModel, ORDEN_TIERRAS, orden, cursor, limit, skip, contar=total)
+    headers = {}
+    if siguiente:
+        headers[CABECERA_CURSOR] = siguiente
+    if cuenta is not None:
+        headers[CABECERA_TOTAL] = str(cuenta)
+    return Response(content=serializador.a_json(items), media_type="application/json", headers=headers)
+
+@app.get("/tierras/agregado", response_model=List[Dict[str, Any]])
+@en_executor
+def aggregate_tierras(
+    por: str = None,
+    metricas: str = "count",
+    limit: int = Query(None, ge=1, le=MAX_LIMIT),
+    region: List[str] = Query(None),
+    provincia: List[str] = Query(None),
+    comuna: List[str] = Query(None),
+    beneficiario: List[str] = Query(None),
+    año: List[int] = Query(None),
+    area_min: float = None,
+    area_max: float = None,
+    tdm_numero: List[str] = Query(None),
+    tdm_letra: List[str] = Query(None),
+    año_min: int = None,
+    año_max: int = None,
+    db: Session = Depends(get_db)
+):
+    return agregar_tierras(
+        db, por, metricas, limit,
+        region=region,
+        provincia=provincia,
+        comuna=comuna,
+        beneficiario=beneficiario,
+        año=año,
+        area_min=area_min,
+        area_max=area_max,
+        tdm_numero=tdm_numero,
+        tdm_letra=tdm_letra,
+        año_min=año_min,
+        año_max=año_max
+    )
+
+@app.get("/tierras/bbox", response_model=List[Dict[str, Any]])
+@en_executor
+def read_tierras_bbox(
+    lon_min: float,
+    lon_max: float,
+    lat_min: float,
+    lat_max: float,
+    limit: int = Query(1000, ge=1, le=MAX_LIMIT)
+):
+    if lon_min > lon_max or lat_min > lat_max:
+        raise HTTPException(status_code=400, detail="Caja no válida")
+    return buscar_en_caja(lon_min, lon_max, lat_min, lat_max, limit)
+
+@app.get("/tierras/radio", response_model=List[Dict[str, Any]])
+@en_executor
+def read_tierras_radio(lon: float, lat: float, radio_km: float, limit: int = Query(1000, ge=1, le=MAX_LIMIT)):
+    if radio_km <= 0:
+        raise HTTPException(status_code=400, detail="Radio no válido")
+    return buscar_en_radio(lon, lat, radio_km, limit)
+
+@app.get("/tierras/cercanos", response_model=List[Dict[str, Any]])
+@en_executor
+def read_tierras_cercanos(lon: float, lat: float, k: int = Query(10, ge=1, le=MAX_LIMIT)):
+    return buscar_cercanos(lon, lat, k)
+
+@app.get("/conflicto/count_by/{campo}", response_model=List[Dict[str, Any]])
+@en_executor
 def count_conflicto_by(campo: str, db: Session = Depends(get_db)):
-    if campo not in ["año", "tipo_evento", "region"]:
+    if campo not in CAMPOS_CONTEO:
         raise HTTPException(status_code=400, detail="Campo no válido")
-    results = db.query(getattr(ConflictoMacedaModel, campo), func.count(ConflictoMacedaModel.id).label('count')).group_by(getattr(ConflictoMacedaModel, campo)).all()
+    results = con_nombres(CAMPOS_CONTEO[campo], motor_conflicto.contar_por(db, CAMPOS_CONTEO[campo]))
     return [{campo: r[0], 'count': r[1]} for r in results]
 
-@app.get("/tierras/area_by/{campo}", response_model=List[Dict[str, float]])
+@app.get("/tierras/area_by/{campo}", response_model=List[Dict[str, Any]])
+@en_executor
 def area_tierras_by(campo: str, db: Session = Depends(get_db)):
-    if campo not in ["region", "provincia", "comuna"]:
+    if campo not in CAMPOS_AREA:
         raise HTTPException(status_code=400, detail="Campo no válido")
-    results = db.query(getattr(TierrasTitulomercedModel, campo), func.sum(TierrasTitulomercedModel.tdm_area).label('total_area')).group_by(getattr(TierrasTitulomercedModel, campo)).all()
+    results = con_nombres(CAMPOS_AREA[campo], motor_tierras.sumar_por(db, CAMPOS_AREA[campo], TierrasTitulomercedModel.tdm_area))
     return [{campo: r[0], 'total_area': r[1]} for r in results]
 
-@app.get("/cross_data/by/{campo}", response_model=List[Dict[str, Any]])
-def read_cross_data_by(campo: str, db: Session = Depends(get_db)):
-    if campo not in ["comuna", "provincia", "region"]:
+@app.get("/cross_data/by/{campo}", response_model=Union[List[Dict[str, Any]], Dict[str, int]])
+@en_executor
+def read_cross_data_by(
+    campo: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=MAX_PARES),
+    año: int = None,
+    tipo_evento: str = None,
+    tdm_año: int = None,
+    area_min: float = None,
+    area_max: float = None,
+    solo_conteo: bool = False,
+    db: Session = Depends(get_db)
+):
+    if campo not in CAMPOS_CRUCE:
         raise HTTPException(status_code=400, detail="Campo no válido")
-    conflicto_data = db.query(ConflictoMacedaModel).all()
-    tierras_data = db.query(TierrasTitulomercedModel).all()
-    cross_data = []
-    for conflicto in conflicto_data:
-        for tierra in tierras_data:
-            if getattr(conflicto, campo) == getattr(tierra, f"{campo}_nombre"):
-                cross_data.append({
-                    "conflicto_id": conflicto.id,
-                    "conflicto_comuna": conflicto.comuna,
-                    "tierra_id": tierra.id,
-                    "tierra_comuna": tierra.comuna_nombre
-                })
-    return cross_data
+    filtros_conflicto = {"año": año, "tipo_evento": tipo_evento}
+    filtros_tierras = {"año": tdm_año, "area_min": area_min, "area_max": area_max}
+    if solo_conteo:
+        return {"total": contar_cruce(db, campo, filtros_conflicto, filtros_tierras)}
+    # Se codifica en el hilo del executor: validar miles de pares con pydantic bloquearía el event loop
+    pares = cruzar(db, campo, skip, limit, filtros_conflicto, filtros_tierras)
+    return Response(content=codificar_json(pares), media_type="application/json")
 
 @app.get("/summary/by/{campo}", response_model=Dict[str, Any])
+@en_executor
 def summary_by(campo: str, db: Session = Depends(get_db)):
-    if campo not in ["año", "comuna", "region"]:
+    if campo not in CAMPOS_RESUMEN:
         raise HTTPException(status_code=400, detail="Campo no válido")
-    conflicto_count = db.query(func.count(ConflictoMacedaModel.id)).group_by(getattr(ConflictoMacedaModel, campo)).all()
-    tierras_area = db.query(func.sum(TierrasTitulomercedModel.tdm_area)).group_by(getattr(TierrasTitulomercedModel, campo)).all()
-    return {'conflicto_count': conflicto_count, 'total_area': tierras_area}
+    columna_conflicto, columna_tierras = CAMPOS_RESUMEN[campo]
+    conflicto_count = con_nombres(columna_conflicto, motor_conflicto.contar_por(db, columna_conflicto))
+    tierras_area = con_nombres(columna_tierras, motor_tierras.sumar_por(db, columna_tierras, TierrasTitulomercedModel.tdm_area))
+    return {
+        'conflicto_count': [{campo: r[0], 'count': r[1]} for r in conflicto_count],
+        'total_area': [{campo: r[0], 'total_area': r[1]} for r in tierras_area]
+    }
+
+@app.get("/estadisticas/by/{campo}", response_model=List[Dict[str, Any]])
+@en_executor
+def estadisticas_by(
+    campo: str,
+    lugar: List[str] = Query(None),
+    orden: str = "eventos",
+    descendente: bool = True,
+    limit: int = Query(None, ge=1),
+    eventos_min: int = None,
+    titulos_min: int = None,
+    db: Session = Depends(get_db)
+):
+    filas = estadisticas_por(db, campo, lugar, orden, descendente, limit, eventos_min=eventos_min, titulos_min=titulos_min)
+    return Response(content=codificar_json(filas), media_type="application/json")
+
+def respuesta_lote(db, serializador, ids, fields):
+    items, faltantes = buscar_por_ids(db, serializador.proyectar(fields), ids)
+    return Response(content=codificar_json({"items": items, "faltantes": faltantes}), media_type="application/json")
+
+@app.get("/conflicto/lote", response_model=Dict[str, Any])
+@en_executor
+def read_conflicto_lote(ids: str, fields: str = None, db: Session = Depends(get_db)):
+    return respuesta_lote(db, serializador_conflicto, parsear_ids(ids), fields)
+
+@app.post("/conflicto/lote", response_model=Dict[str, Any])
+@en_executor
+def read_conflicto_lote_post(lote: LoteIds, fields: str = None, db: Session = Depends(get_db)):
+    return respuesta_lote(db, serializador_conflicto, lote.ids, fields)
+
+@app.get("/tierras/lote", response_model=Dict[str, Any])
+@en_executor
+def read_tierras_lote(ids: str, fields: str = None, db: Session = Depends(get_db)):
+    return respuesta_lote(db, serializador_tierras, parsear_ids(ids), fields)
+
+@app.post("/tierras/lote", response_model=Dict[str, Any])
+@en_executor
+def read_tierras_lote_post(lote: LoteIds, fields: str = None, db: Session = Depends(get_db)):
+    return respuesta_lote(db, serializador_tierras, lote.ids, fields)
 
 @app.get("/conflicto/{conflicto_id}", response_model=ConflictoMaceda)
+@en_executor
 def read_conflicto_by_id(conflicto_id: int, db: Session = Depends(get_db)):
     conflicto = db.query(ConflictoMacedaModel).filter(ConflictoMacedaModel.id == conflicto_id).first()
     if not conflicto:
@@ -155,6 +449,7 @@ def read_conflicto_by_id(conflicto_id: int, db: Session = Depends(get_db)):
     return ConflictoMaceda.from_orm(conflicto)
 
 @app.get("/tierras/{tierra_id}", response_model=TierrasTitulomerced)
+@en_executor
 def read_tierras_by_id(tierra_id: int, db: Session = Depends(get_db)):
     tierra = db.query(TierrasTitulomercedModel).filter(TierrasTitulomercedModel.id == tierra_id).first()
     if not tierra:
@@ -162,183 +457,26 @@ def read_tierras_by_id(tierra_id: int, db: Session = Depends(get_db)):
     return TierrasTitulomerced.from_orm(tierra)
 
 @app.get("/filtro_opciones/conflicto", response_model=ConflictoFiltroOpciones, response_model_exclude_unset=True)
-def get_conflicto_filtro_opciones(db: Session = Depends(get_db)):
-    años = db.query(ConflictoMacedaModel.año).distinct().all()
-    comunas = db.query(ConflictoMacedaModel.comuna).distinct().all()
-    provincias = db.query(ConflictoMacedaModel.provincia).distinct().all()
-    regiones = db.query(ConflictoMacedaModel.region).distinct().all()
-    tipos_evento = db.query(ConflictoMacedaModel.evento_tipo_maceda).distinct().all()
-    actores_1 = db.query(ConflictoMacedaModel.actor_tipo_1_nombre).distinct().all()
-    actores_2 = db.query(ConflictoMacedaModel.actor_tipo_2_nombre).distinct().all()
-    actor_tipo_1 = db.query(ConflictoMacedaModel.actor_tipo_1).distinct().all()
-    actor_tipo_2 = db.query(ConflictoMacedaModel.actor_tipo_2).distinct().all()
-    actor_mapuche = db.query(ConflictoMacedaModel.actor_mapuche).distinct().all()
-    mapuche_identificado = db.query(ConflictoMacedaModel.mapuche_identificado).distinct().all()
-    ubicacion_tipo = db.query(ConflictoMacedaModel.ubicacion_tipo).distinct().all()
-    rural = db.query(ConflictoMacedaModel.rural).distinct().all()
-    evento_especifico = db.query(ConflictoMacedaModel.evento_especifico).distinct().all()
-    actor_especifico_1 = db.query(ConflictoMacedaModel.actor_especifico_1).distinct().all()
-    actor_especifico_1_num = db.query(ConflictoMacedaModel.actor_especifico_1_num).distinct().all()
-    actor_especifico_1_armas = db.query(ConflictoMacedaModel.actor_especifico_1_armas).distinct().all()
-    actor_relacionado_1 = db.query(ConflictoMacedaModel.actor_relacionado_1).distinct().all()
-    actor_especifico_2 = db.query(ConflictoMacedaModel.actor_especifico_2).distinct().all()
-    actor_especifico_2_num = db.query(ConflictoMacedaModel.actor_especifico_2_num).distinct().all()
-    actor_especifico_2_armas = db.query(ConflictoMacedaModel.actor_especifico_2_armas).distinct().all()
-    actor_relacionado_2 = db.query(ConflictoMacedaModel.actor_relacionado_2).distinct().all()
-    confrontacion = db.query(ConflictoMacedaModel.confrontacion).distinct().all()
-    iniciador = db.query(ConflictoMacedaModel.iniciador).distinct().all()
-    descripcion = db.query(ConflictoMacedaModel.descripcion).distinct().all()
-    propiedad_destruida = db.query(ConflictoMacedaModel.propiedad_destruida).distinct().all()
-    propiedad_dañada = db.query(ConflictoMacedaModel.propiedad_dañada).distinct().all()
-    propiedad_robada = db.query(ConflictoMacedaModel.propiedad_robada).distinct().all()
-    perdida_estimada = db.query(ConflictoMacedaModel.perdida_estimada).distinct().all()
-    arrestos = db.query(ConflictoMacedaModel.arrestos).distinct().all()
-    heridos = db.query(ConflictoMacedaModel.heridos).distinct().all()
-    muertos = db.query(ConflictoMacedaModel.muertos).distinct().all()
-    
-    # Convertir los resultados a listas simples y asegurarse de que los valores sean válidos
-    def convertir_a_int(valor):
-        try:
-            return int(valor)
-        except (TypeError, ValueError):
-            return None
-
-    def convertir_a_float(valor):
-        try:
-            return float(valor)
-        except (TypeError, ValueError):
-            return None
-
-    años = [convertir_a_int(item[0]) for item in años if item[0] is not None and item[0] != '']
-    comunas = [item[0] for item in comunas if item[0] is not None]
-    provincias = [item[0] for item in provincias if item[0] is not None]
-    regiones = [item[0] for item in regiones if item[0] is not None]
-    tipos_evento = [item[0] for item in tipos_evento if item[0] is not None]
-    actores = list(set([item[0] for item in actores_1 if item[0] is not None] + [item[0] for item in actores_2 if item[0] is not None]))
-    actor_tipo_1 = [item[0] for item in actor_tipo_1 if item[0] is not None]
-    actor_tipo_2 = [item[0] for item in actor_tipo_2 if item[0] is not None]
-    actor_mapuche = [item[0] for item in actor_mapuche if item[0] is not None]
-    mapuche_identificado = [item[0] for item in mapuche_identificado if item[0] is not None]
-    ubicacion_tipo = [item[0] for item in ubicacion_tipo if item[0] is not None]
-    rural = [item[0] for item in rural if item[0] is not None]
-    evento_especifico = [item[0] for item in evento_especifico if item[0] is not None]
-    actor_especifico_1 = [item[0] for item in actor_especifico_1 if item[0] is not None]
-    actor_especifico_1_num = [item[0] for item in actor_especifico_1_num if item[0] is not None]
-    actor_especifico_1_armas = [item[0] for item in actor_especifico_1_armas if item[0] is not None]
-    actor_relacionado_1 = [item[0] for item in actor_relacionado_1 if item[0] is not None]
-    actor_especifico_2 = [item[0] for item in actor_especifico_2 if item[0] is not None]
-    actor_especifico_2_num = [item[0] for item in actor_especifico_2_num if item[0] is not None]
-    actor_especifico_2_armas = [item[0] for item in actor_especifico_2_armas if item[0] is not None]
-    actor_relacionado_2 = [item[0] for item in actor_relacionado_2 if item[0] is not None]
-    confrontacion = [item[0] for item in confrontacion if item[0] is not None]
-    iniciador = [item[0] for item in iniciador if item[0] is not None]
-    descripcion = [item[0] for item in descripcion if item[0] is not None]
-    propiedad_destruida = [item[0] for item in propiedad_destruida if item[0] is not None]
-    propiedad_dañada = [item[0] for item in propiedad_dañada if item[0] is not None]
-    propiedad_robada = [item[0] for item in propiedad_robada if item[0] is not None]
-    perdida_estimada = [convertir_a_float(item[0]) for item in perdida_estimada if item[0] is not None and item[0] != '' and convertir_a_float(item[0]) is not None]
-    arrestos = [convertir_a_int(item[0]) for item in arrestos if item[0] is not None and item[0] != '' and convertir_a_int(item[0]) is not None]
-    heridos = [convertir_a_int(item[0]) for item in heridos if item[0] is not None and item[0] != '' and convertir_a_int(item[0]) is not None]
-    muertos = [convertir_a_int(item[0]) for item in muertos if item[0] is not None and item[0] != '' and convertir_a_int(item[0]) is not None]
-    
-    return ConflictoFiltroOpciones(
-        años=años,
-        comunas=comunas,
-        provincias=provincias,
-        regiones=regiones,
-        tipos_evento=tipos_evento,
-        actores=actores,
-        actor_tipo_1=actor_tipo_1,
-        actor_tipo_2=actor_tipo_2,
-        actor_mapuche=actor_mapuche,
-        mapuche_identificado=mapuche_identificado,
-        ubicacion_tipo=ubicacion_tipo,
-        rural=rural,
-        evento_especifico=evento_especifico,
-        actor_especifico_1=actor_especifico_1,
-        actor_especifico_1_num=actor_especifico_1_num,
-        actor_especifico_1_armas=actor_especifico_1_armas,
-        actor_relacionado_1=actor_relacionado_1,
-        actor_especifico_2=actor_especifico_2,
-        actor_especifico_2_num=actor_especifico_2_num,
-        actor_especifico_2_armas=actor_especifico_2_armas,
-        actor_relacionado_2=actor_relacionado_2,
-        confrontacion=confrontacion,
-        iniciador=iniciador,
-        descripcion=descripcion,
-        propiedad_destruida=propiedad_destruida,
-        propiedad_dañada=propiedad_dañada,
-        propiedad_robada=propiedad_robada,
-        perdida_estimada=perdida_estimada,
-        arrestos=arrestos,
-        heridos=heridos,
-        muertos=muertos
-    )
+@en_executor
+def get_conflicto_filtro_opciones(completo: bool = False):
+    return Response(content=cache_conflicto.obtener(completo), media_type="application/json")
 
 @app.get("/filtro_opciones/tierras", response_model=TierrasFiltroOpciones, response_model_exclude_unset=True)
-def get_tierras_filtro_opciones(db: Session = Depends(get_db)):
-    regiones = db.query(TierrasTitulomercedModel.region_nombre).distinct().all()
-    provincias = db.query(TierrasTitulomercedModel.provincia_nombre).distinct().all()
-    comunas = db.query(TierrasTitulomercedModel.comuna_nombre).distinct().all()
-    beneficiarios = db.query(TierrasTitulomercedModel.tdm_beneficiario).distinct().all()
-    años = db.query(TierrasTitulomercedModel.tdm_año).distinct().all()
-    numeros = db.query(TierrasTitulomercedModel.tdm_numero).distinct().all()
-    letras = db.query(TierrasTitulomercedModel.tdm_letra).distinct().all()
-    areas = db.query(TierrasTitulomercedModel.tdm_area).distinct().all()
-    geoareas = db.query(TierrasTitulomercedModel.tdm_geoarea).distinct().all()
-    perimetros = db.query(TierrasTitulomercedModel.tdm_perim).distinct().all()
-    lugar = db.query(TierrasTitulomercedModel.lugar).distinct().all()
-    provincia_id = db.query(TierrasTitulomercedModel.provincia_id).distinct().all()
-    comuna_id = db.query(TierrasTitulomercedModel.comuna_id).distinct().all()
-    tdm_original = db.query(TierrasTitulomercedModel.tdm_original).distinct().all()
-    longitud_W = db.query(TierrasTitulomercedModel.longitud_W).distinct().all()
-    latitud_S = db.query(TierrasTitulomercedModel.latitud_S).distinct().all()
-    
-    # Convertir los resultados a listas simples y asegurarse de que los valores sean válidos
-    def convertir_a_int(valor):
-        try:
-            return int(valor)
-        except (TypeError, ValueError):
-            return None
-
-    def convertir_a_float(valor):
-        try:
-            return float(valor)
-        except (TypeError, ValueError):
-            return None
-
-    regiones = [item[0] for item in regiones if item[0] is not None]
-    provincias = [item[0] for item in provincias if item[0] is not None]
-    comunas = [item[0] for item in comunas if item[0] is not None]
-    beneficiarios = [item[0] for item in beneficiarios if item[0] is not None]
-    años = [convertir_a_int(item[0]) for item in años if item[0] is not None and item[0] != '']
-    numeros = [item[0] for item in numeros if item[0] is not None]
-    letras = [item[0] for item in letras if item[0] is not None]
-    areas = [convertir_a_float(item[0]) for item in areas if item[0] is not None and item[0] != '' and convertir_a_float(item[0]) is not None]
-    geoareas = [convertir_a_float(item[0]) for item in geoareas if item[0] is not None and item[0] != '' and convertir_a_float(item[0]) is not None]
-    perimetros = [convertir_a_float(item[0]) for item in perimetros if item[0] is not None and item[0] != '' and convertir_a_float(item[0]) is not None]
-    lugar = [item[0] for item in lugar if item[0] is not None]
-    provincia_id = [convertir_a_int(item[0]) for item in provincia_id if item[0] is not None and item[0] != '']
-    comuna_id = [convertir_a_int(item[0]) for item in comuna_id if item[0] is not None and item[0] != '']
-    tdm_original = [item[0] for item in tdm_original if item[0] is not None]
-    longitud_W = [convertir_a_float(item[0]) for item in longitud_W if item[0] is not None and item[0] != '' and convertir_a_float(item[0]) is not None]
-    latitud_S = [convertir_a_float(item[0]) for item in latitud_S if item[0] is not None and item[0] != '' and convertir_a_float(item[0]) is not None]
-    
-    return TierrasFiltroOpciones(
-        regiones=regiones,
-        provincias=provincias,
-        comunas=comunas,
-        beneficiarios=beneficiarios,
-        años=años,
-        numeros=numeros,
-        letras=letras,
-        areas=areas,
-        geoareas=geoareas,
-        perimetros=perimetros,
-        lugar=lugar,
-        provincia_id=provincia_id,
-        comuna_id=comuna_id,
-        tdm_original=tdm_original,
-        longitud_W=longitud_W,
-        latitud_S=latitud_S
-    )
\ No newline at end of file
+@en_executor
+def get_tierras_filtro_opciones(completo: bool = False):
+    return Response(content=cache_tierras.obtener(completo), media_type="application/json")
+
+def sugerencias(cache, field, prefix, limit):
+    if field not in cache.sugerencias:
+        raise HTTPException(status_code=400, detail="Campo no válido")
+    return cache.sugerir(field, prefix, limit)
+
+@app.get("/filtro_opciones/conflicto/sugerencias", response_model=List[Dict[str, Any]])
+@en_executor
+def get_conflicto_sugerencias(field: str, prefix: str = "", limit: int = Query(10, ge=1, le=100)):
+    return sugerencias(cache_conflicto, field, prefix, limit)
+
+@app.get("/filtro_opciones/tierras/sugerencias", response_model=List[Dict[str, Any]])
+@en_executor
+def get_tierras_sugerencias(field: str, prefix: str = "", limit: int = Query(10, ge=1, le=100)):
+    return sugerencias(cache_tierras, field, prefix, limit)
@@ -0,0 +1,241 @@
+# metricas.py
+"""Instrumentación por ruta: latencia, tamaño de respuesta y trabajo en SQLite.
+
+MetricasHTTP resuelve la plantilla de la ruta (/conflicto/{conflicto_id}, no
+/conflicto/17) y deja una Medicion en un contextvar; en_executor lo copia al
+hilo que ejecuta el endpoint. Las conexiones de models.py usan CursorMedido,
+que suma sentencias, tiempo y filas leídas en esa Medicion. /metrics expone
+los acumulados en formato de texto de Prometheus.
+
+Con MDP_SLOW_QUERY_MS, cada consulta que tarda más que ese umbral (ejecución
+más lectura de filas) se registra en el logger "mdp.consultas_lentas" junto
+con su EXPLAIN QUERY PLAN.
+"""
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from starlette.routing import Match
+
+SLOW_QUERY_MS = float(os.environ.get("MDP_SLOW_QUERY_MS", "0"))
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+logger_lentas = logging.getLogger("mdp.consultas_lentas")
+
+
+class Medicion:
+    """Trabajo de SQLite hecho por un request."""
+
+    __slots__ = ("ruta", "sentencias", "segundos_sql", "filas")
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.sentencias = 0
+        self.segundos_sql = 0.0
+        self.filas = 0
+
+
+medicion_actual = contextvars.ContextVar("medicion_actual", default=None)
+
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que mide ejecución y lectura de filas y las suma a la Medicion actual."""
+
+    _sql = None
+    _parametros = ()
+    _segundos = 0.0
+
+    def _sumar(self, inicio, filas=0, sentencias=0):
+        segundos = time.perf_counter() - inicio
+        self._segundos += segundos
+        medicion = medicion_actual.get()
+        if medicion is not None:
+            medicion.sentencias += sentencias
+            medicion.segundos_sql += segundos
+            medicion.filas += filas
+
+    def execute(self, sql, parametros=()):
+        self._registrar_lenta()
+        self._sql, self._parametros, self._segundos = sql, parametros, 0.0
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            self._sumar(inicio, sentencias=1)
+
+    def executemany(self, sql, secuencia):
+        self._registrar_lenta()
+        self._sql, self._parametros, self._segundos = None, (), 0.0
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, secuencia)
+        finally:
+            self._sumar(inicio, sentencias=1)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._sumar(inicio, 0 if fila is None else 1)
+        return fila
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._sumar(inicio, len(filas))
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._sumar(inicio, len(filas))
+        return filas
+
+    def close(self):
+        self._registrar_lenta()
+        super().close()
+
+    def _registrar_lenta(self):
+        if not SLOW_QUERY_MS or self._sql is None or self._segundos * 1000 < SLOW_QUERY_MS:
+            return
+        sql, parametros, milisegundos = self._sql, self._parametros, self._segundos * 1000
+        self._sql = None
+        try:
+            # Cursor sin instrumentar para no contar el EXPLAIN como trabajo del request
+            plan = sqlite3.Cursor(self.connection).execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+            plan = "; ".join(fila[-1] for fila in plan)
+        except sqlite3.Error as error:
+            plan = f"(sin plan: {error})"
+        medicion = medicion_actual.get()
+        logger_lentas.warning(
+            "%.1f ms en %s: %s | plan: %s",
+            milisegundos, medicion.ruta if medicion else "-", " ".join(sql.split()), plan,
+        )
+
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexión cuyos cursores son CursorMedido; se pasa como `factory` en connect_args."""
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    """Acumulados por ruta, protegidos por un lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencia = {}
+        self.tamano = {}
+        self.respuestas = {}
+        self.sentencias = {}
+        self.segundos_sql = {}
+        self.filas = {}
+
+    def registrar(self, medicion, status, segundos, tamano):
+        ruta = medicion.ruta
+        with self.lock:
+            if ruta not in self.latencia:
+                self.latencia[ruta] = Histograma(BUCKETS_SEGUNDOS)
+                self.tamano[ruta] = Histograma(BUCKETS_BYTES)
+            self.latencia[ruta].observar(segundos)
+            self.tamano[ruta].observar(tamano)
+            self.respuestas[(ruta, status)] = self.respuestas.get((ruta, status), 0) + 1
+            self.sentencias[ruta] = self.sentencias.get(ruta, 0) + medicion.sentencias
+            self.segundos_sql[ruta] = self.segundos_sql.get(ruta, 0.0) + medicion.segundos_sql
+            self.filas[ruta] = self.filas.get(ruta, 0) + medicion.filas
+
+    def exportar(self):
+        """Texto en formato de exposición de Prometheus 0.0.4."""
+        lineas = []
+
+        def histograma(nombre, ayuda, histogramas):
+            lineas.extend([f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"])
+            for ruta, h in sorted(histogramas.items()):
+                acumulado = 0
+                for limite, cuenta in zip(h.limites + ("+Inf",), h.cuentas):
+                    acumulado += cuenta
+                    lineas.append(f'{nombre}_bucket{{ruta="{_escapar(ruta)}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{nombre}_sum{{ruta="{_escapar(ruta)}"}} {h.suma}')
+                lineas.append(f'{nombre}_count{{ruta="{_escapar(ruta)}"}} {h.total}')
+
+        def contador(nombre, ayuda, valores):
+            lineas.extend([f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"])
+            for ruta, valor in sorted(valores.items()):
+                lineas.append(f'{nombre}{{ruta="{_escapar(ruta)}"}} {valor}')
+
+        with self.lock:
+            histograma("mdp_http_request_duration_seconds", "Latencia de respuesta por ruta.", self.latencia)
+            histograma("mdp_http_response_size_bytes", "Tamaño del cuerpo de la respuesta por ruta.", self.tamano)
+            lineas.extend(["# HELP mdp_http_requests_total Respuestas por ruta y status.", "# TYPE mdp_http_requests_total counter"])
+            for (ruta, status), valor in sorted(self.respuestas.items()):
+                lineas.append(f'mdp_http_requests_total{{ruta="{_escapar(ruta)}",status="{status}"}} {valor}')
+            contador("mdp_sql_statements_total", "Sentencias SQL ejecutadas por ruta.", self.sentencias)
+            contador("mdp_sql_seconds_total", "Tiempo en SQLite (ejecución y lectura) por ruta.", self.segundos_sql)
+            contador("mdp_sql_rows_total", "Filas leídas de SQLite por ruta.", self.filas)
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro = RegistroMetricas()
+
+
+def plantilla_ruta(scope):
+    """Path de la ruta que atiende el request, sin los parámetros de path."""
+    app = scope.get("app")
+    for ruta in getattr(app, "routes", ()):
+        coincidencia, _ = ruta.matches(scope)
+        if coincidencia == Match.FULL:
+            return ruta.path
+    return "(sin ruta)"
+
+
+class MetricasHTTP:
+    """Middleware ASGI que mide cada request HTTP y lo suma al registro."""
+
+    def __init__(self, app, registro=registro):
+        self.app = app
+        self.registro = registro
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = Medicion(plantilla_ruta(scope))
+        token = medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        respuesta = {"status": 500, "tamano": 0}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["status"] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                respuesta["tamano"] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            medicion_actual.reset(token)
+            self.registro.registrar(medicion, respuesta["status"], time.perf_counter() - inicio, respuesta["tamano"])
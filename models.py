@@ -1,9 +1,14 @@
 # models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
 from typing import List
+from metricas import ConexionMedida
+from admision import limitar_duracion
+import os
 
 Base = declarative_base()
 
@@ -11,38 +16,39 @@ Base = declarative_base()
 class ConflictoMaceda(Base):
     __tablename__ = 'conflicto_maceda'
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    id_evento = Column(Integer, nullable=True)
+    id_evento = Column(Integer, nullable=True, index=True)
     id_evento_relacionado = Column(Integer, nullable=True)
-    año = Column(Integer, nullable=True)
+    año = Column(Integer, nullable=True, index=True)
     mes = Column(Integer, nullable=True)
     trimestre = Column(Integer, nullable=True)
     fecha_reportada = Column(String, nullable=True)
-    comuna = Column(String, nullable=True)
-    provincia = Column(String, nullable=True)
-    region = Column(String, nullable=True)
+    # Los filtros usan los *_gid; estos índices sirven el orden=comuna|provincia|region de /conflicto/
+    comuna = Column(String, nullable=True, index=True)
+    provincia = Column(String, nullable=True, index=True)
+    region = Column(String, nullable=True, index=True)
     ubicacion_tipo = Column(String, nullable=True)
     rural = Column(String, nullable=True)
-    evento_tipo_maceda = Column(String, nullable=True)
+    evento_tipo_maceda = Column(String, nullable=True, index=True)
     evento_especifico = Column(String, nullable=True)
-    actor_tipo_1 = Column(String, nullable=True)
-    actor_tipo_1_nombre = Column(String, nullable=True)
+    actor_tipo_1 = Column(String, nullable=True, index=True)
+    actor_tipo_1_nombre = Column(String, nullable=True, index=True)
     actor_especifico_1 = Column(String, nullable=True)
     actor_especifico_1_num = Column(String, nullable=True)
     actor_especifico_1_armas = Column(String, nullable=True)
     actor_relacionado_1 = Column(String, nullable=True)
-    actor_tipo_2 = Column(String, nullable=True)
-    actor_tipo_2_nombre = Column(String, nullable=True)
+    actor_tipo_2 = Column(String, nullable=True, index=True)
+    actor_tipo_2_nombre = Column(String, nullable=True, index=True)
     actor_especifico_2 = Column(String, nullable=True)
     actor_especifico_2_num = Column(String, nullable=True)
     actor_especifico_2_armas = Column(String, nullable=True)
     actor_relacionado_2 = Column(String, nullable=True)
-    actor_mapuche = Column(String, nullable=True)
-    mapuche_identificado = Column(String, nullable=True)
+    actor_mapuche = Column(String, nullable=True, index=True)
+    mapuche_identificado = Column(String, nullable=True, index=True)
     confrontacion = Column(String, nullable=True)
     iniciador = Column(String, nullable=True)
     descripcion = Column(String, nullable=True)
     propiedad_destruida = Column(String, nullable=True)
-    propiedad_dañada = Column(String, nullable=True)
+    propiedad_dañada = Column(String, nullable=True, index=True)
     propiedad_robada = Column(String, nullable=True)
     perdida_estimada = Column(Float, nullable=True)
     arrestos = Column(Integer, nullable=True)
@@ -53,32 +59,163 @@ class ConflictoMaceda(Base):
     osal = Column(Float, nullable=True)
     ciudadano = Column(String, nullable=True)
     biobio = Column(String, nullable=True)
+    # Claves de la tabla geografia para comuna/provincia/region (ver geografia.py)
+    comuna_gid = Column(Integer, ForeignKey('geografia.id'), nullable=True, index=True)
+    provincia_gid = Column(Integer, ForeignKey('geografia.id'), nullable=True, index=True)
+    region_gid = Column(Integer, ForeignKey('geografia.id'), nullable=True, index=True)
+
+    __table_args__ = (
+        Index('ix_conflicto_maceda_evento_tipo_maceda_año', 'evento_tipo_maceda', 'año'),
+        Index('ix_conflicto_maceda_region_gid_año', 'region_gid', 'año'),
+    )
 
 class TierrasTitulomerced(Base):
     __tablename__ = 'tierras_titulomerced'
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     region_id = Column(Integer)
-    region_nombre = Column(String)
+    # Como en conflicto_maceda, los índices de los nombres son para el orden de /tierras/
+    region_nombre = Column(String, index=True)
     provincia_id = Column(Integer)
-    provincia_nombre = Column(String)
+    provincia_nombre = Column(String, index=True)
     comuna_id = Column(Integer)
-    comuna_nombre = Column(String)
+    comuna_nombre = Column(String, index=True)
     lugar = Column(String)
-    tdm_beneficiario = Column(String)
-    tdm_año = Column(Integer)
+    tdm_beneficiario = Column(String, index=True)
+    tdm_año = Column(Integer, index=True)
     tdm_original = Column(String)
     tdm_numero = Column(String)
     tdm_letra = Column(String)
-    tdm_area = Column(Float)
+    tdm_area = Column(Float, index=True)
     tdm_geoarea = Column(Float)
     tdm_perim = Column(Float)
     longitud_W = Column(Float)
     latitud_S = Column(Float)
+    comuna_gid = Column(Integer, ForeignKey('geografia.id'))
+    provincia_gid = Column(Integer, ForeignKey('geografia.id'))
+    region_gid = Column(Integer, ForeignKey('geografia.id'))
+
+    # Índices de cobertura para filtrar y para sumar tdm_area agrupando por nivel geográfico
+    __table_args__ = (
+        Index('ix_tierras_titulomerced_tdm_numero_tdm_letra', 'tdm_numero', 'tdm_letra'),
+        Index('ix_tierras_titulomerced_region_gid_tdm_area', 'region_gid', 'tdm_area'),
+        Index('ix_tierras_titulomerced_provincia_gid_tdm_area', 'provincia_gid', 'tdm_area'),
+        Index('ix_tierras_titulomerced_comuna_gid_tdm_area', 'comuna_gid', 'tdm_area'),
+    )
+
+
+class Geografia(Base):
+    """Dimensión geográfica: una fila por región, provincia o comuna con nombre canónico."""
+    __tablename__ = 'geografia'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nivel = Column(String, nullable=False)
+    nombre = Column(String, nullable=False)
+    # Nombre sin tildes, mayúsculas ni espacios repetidos: identifica la entidad
+    clave = Column(String, nullable=False)
+    # Código oficial cuando viene en los datos (region_id, provincia_id, comuna_id de tierras)
+    codigo = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index('ix_geografia_nivel_clave', 'nivel', 'clave', unique=True),
+    )
 
 # Configuración de la base de datos
-DATABASE_URL = "sqlite:///./mdp.db"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DATABASE_URL = os.environ.get("MDP_DATABASE_URL", "sqlite:///./mdp.db")
+POOL_SIZE = int(os.environ.get("MDP_POOL_SIZE", "8"))
+POOL_MAX_OVERFLOW = int(os.environ.get("MDP_POOL_MAX_OVERFLOW", "8"))
+# Con MDP_INMUTABLE=1 SQLite no toma locks al leer; solo si mdp.db no cambia mientras corre el servicio
+INMUTABLE = os.environ.get("MDP_INMUTABLE", "0") == "1"
+
+PRAGMAS_LECTURA = {
+    "mmap_size": int(os.environ.get("MDP_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.environ.get("MDP_CACHE_SIZE", str(-64 * 1024))),  # negativo = KiB
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+}
+PRAGMAS_ESCRITURA = dict(PRAGMAS_LECTURA, journal_mode="WAL", synchronous="NORMAL")
+
+
+def _aplicar_pragmas(pragmas):
+    def al_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+        cursor.close()
+    return al_conectar
+
+
+def _crear_engine(url, pragmas, **kwargs):
+    nuevo = create_engine(
+        url,
+        # ConexionMedida cuenta sentencias, tiempo y filas para /metrics
+        connect_args={"check_same_thread": False, "factory": ConexionMedida},
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        **kwargs
+    )
+    event.listen(nuevo, "connect", _aplicar_pragmas(pragmas))
+    # Corta las sentencias de un request cuyo plazo venció (ver admision.py)
+    event.listen(nuevo, "connect", limitar_duracion)
+    return nuevo
+
+
+def _url_solo_lectura(url):
+    """URL de SQLite en modo ro (o immutable) para el mismo archivo, o None si no aplica."""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    parametros = "mode=ro&immutable=1" if INMUTABLE else "mode=ro"
+    ruta = os.path.abspath(url.database)
+    return f"sqlite:///file:{ruta}?{parametros}&uri=true"
+
+
+# engine escribe (esquema, índices, cargas); engine_lectura atiende la API
+engine = _crear_engine(DATABASE_URL, PRAGMAS_ESCRITURA)
+
+def agregar_columnas(bind):
+    """Agrega a una base existente las columnas declaradas que aún no existen."""
+    agregadas = []
+    for tabla in Base.metadata.sorted_tables:
+        existentes = {fila[1] for fila in bind.exec_driver_sql(f'PRAGMA table_info("{tabla.name}")')}
+        for columna in tabla.columns:
+            if columna.name not in existentes:
+                tipo = columna.type.compile(dialect=bind.dialect)
+                bind.exec_driver_sql(f'ALTER TABLE "{tabla.name}" ADD COLUMN "{columna.name}" {tipo}')
+                agregadas.append(f"{tabla.name}.{columna.name}")
+    return agregadas
+
+def crear_indices(bind):
+    """Crea en una base existente los índices declarados que aún no existen."""
+    creados = []
+    for tabla in Base.metadata.sorted_tables:
+        existentes = {fila[1] for fila in bind.exec_driver_sql(f'PRAGMA index_list("{tabla.name}")')}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                indice.create(bind=bind)
+                creados.append(indice.name)
+    if creados:
+        bind.exec_driver_sql("ANALYZE")
+    return creados
 
 # Crear las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+Base.metadata.create_all(bind=engine)
+with engine.begin() as conn:
+    agregar_columnas(conn)
+    crear_indices(conn)
+
+
+def consolidar_wal():
+    """Pasa el WAL al archivo principal; con MDP_INMUTABLE las lecturas no lo ven.
+
+    Se llama al final del inicio, después de todas las escrituras de preparación.
+    """
+    if INMUTABLE:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+_url_lectura = _url_solo_lectura(DATABASE_URL)
+if _url_lectura:
+    engine_lectura = _crear_engine(_url_lectura, dict(PRAGMAS_LECTURA, query_only=1))
+else:
+    engine_lectura = engine
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine_lectura)
\ No newline at end of file
@@ -0,0 +1,179 @@
+# opciones.py
+import heapq
+import json
+import threading
+from bisect import bisect_left
+from collections import Counter
+from sqlalchemy import select
+from models import engine_lectura, ConflictoMaceda, TierrasTitulomerced
+from schemas import ConflictoFiltroOpciones, TierrasFiltroOpciones, convertir_a_int, convertir_a_float
+from version import version_datos
+from geografia import normalizar_clave
+
+TAMANO_LOTE = 5000
+
+
+# Campo de la respuesta -> (columnas de origen, conversión)
+OPCIONES_CONFLICTO = {
+    "años": ([ConflictoMaceda.año], convertir_a_int),
+    "comunas": ([ConflictoMaceda.comuna], None),
+    "provincias": ([ConflictoMaceda.provincia], None),
+    "regiones": ([ConflictoMaceda.region], None),
+    "tipos_evento": ([ConflictoMaceda.evento_tipo_maceda], None),
+    "actores": ([ConflictoMaceda.actor_tipo_1_nombre, ConflictoMaceda.actor_tipo_2_nombre], None),
+    "actor_tipo_1": ([ConflictoMaceda.actor_tipo_1], None),
+    "actor_tipo_2": ([ConflictoMaceda.actor_tipo_2], None),
+    "actor_mapuche": ([ConflictoMaceda.actor_mapuche], None),
+    "mapuche_identificado": ([ConflictoMaceda.mapuche_identificado], None),
+    "ubicacion_tipo": ([ConflictoMaceda.ubicacion_tipo], None),
+    "rural": ([ConflictoMaceda.rural], None),
+    "evento_especifico": ([ConflictoMaceda.evento_especifico], None),
+    "actor_especifico_1": ([ConflictoMaceda.actor_especifico_1], None),
+    "actor_especifico_1_num": ([ConflictoMaceda.actor_especifico_1_num], None),
+    "actor_especifico_1_armas": ([ConflictoMaceda.actor_especifico_1_armas], None),
+    "actor_relacionado_1": ([ConflictoMaceda.actor_relacionado_1], None),
+    "actor_especifico_2": ([ConflictoMaceda.actor_especifico_2], None),
+    "actor_especifico_2_num": ([ConflictoMaceda.actor_especifico_2_num], None),
+    "actor_especifico_2_armas": ([ConflictoMaceda.actor_especifico_2_armas], None),
+    "actor_relacionado_2": ([ConflictoMaceda.actor_relacionado_2], None),
+    "confrontacion": ([ConflictoMaceda.confrontacion], None),
+    "iniciador": ([ConflictoMaceda.iniciador], None),
+    "descripcion": ([ConflictoMaceda.descripcion], None),
+    "propiedad_destruida": ([ConflictoMaceda.propiedad_destruida], None),
+    "propiedad_dañada": ([ConflictoMaceda.propiedad_dañada], None),
+    "propiedad_robada": ([ConflictoMaceda.propiedad_robada], None),
+    "perdida_estimada": ([ConflictoMaceda.perdida_estimada], convertir_a_float),
+    "arrestos": ([ConflictoMaceda.arrestos], convertir_a_int),
+    "heridos": ([ConflictoMaceda.heridos], convertir_a_int),
+    "muertos": ([ConflictoMaceda.muertos], convertir_a_int),
+}
+
+OPCIONES_TIERRAS = {
+    "regiones": ([TierrasTitulomerced.region_nombre], None),
+    "provincias": ([TierrasTitulomerced.provincia_nombre], None),
+    "comunas": ([TierrasTitulomerced.comuna_nombre], None),
+    "beneficiarios": ([TierrasTitulomerced.tdm_beneficiario], None),
+    "años": ([TierrasTitulomerced.tdm_año], convertir_a_int),
+    "numeros": ([TierrasTitulomerced.tdm_numero], None),
+    "letras": ([TierrasTitulomerced.tdm_letra], None),
+    "areas": ([TierrasTitulomerced.tdm_area], convertir_a_float),
+    "geoareas": ([TierrasTitulomerced.tdm_geoarea], convertir_a_float),
+    "perimetros": ([TierrasTitulomerced.tdm_perim], convertir_a_float),
+    "lugar": ([TierrasTitulomerced.lugar], None),
+    "provincia_id": ([TierrasTitulomerced.provincia_id], convertir_a_int),
+    "comuna_id": ([TierrasTitulomerced.comuna_id], convertir_a_int),
+    "tdm_original": ([TierrasTitulomerced.tdm_original], None),
+    "longitud_W": ([TierrasTitulomerced.longitud_W], convertir_a_float),
+    "latitud_S": ([TierrasTitulomerced.latitud_S], convertir_a_float),
+}
+
+# Campos de texto libre con miles de valores: se consultan por prefijo
+# (/filtro_opciones/*/sugerencias) y solo se listan completos con ?completo=true
+SUGERENCIAS_CONFLICTO = ["descripcion", "actor_especifico_1", "actor_relacionado_1", "actor_especifico_2", "actor_relacionado_2"]
+SUGERENCIAS_TIERRAS = ["beneficiarios", "lugar"]
+
+
+def contar_valores(opciones):
+    """Frecuencia de cada valor distinto por columna, en un solo recorrido de la tabla."""
+    columnas = list(dict.fromkeys(c for origen, _ in opciones.values() for c in origen))
+    contadores = {c.key: Counter() for c in columnas}
+    with engine_lectura.connect() as conn:
+        resultado = conn.execution_options(stream_results=True).execute(select(*columnas))
+        for lote in resultado.partitions(TAMANO_LOTE):
+            for columna, valores in zip(columnas, zip(*lote)):
+                contadores[columna.key].update(valores)
+    return contadores
+
+
+def construir_opciones(opciones, contadores):
+    resultado = {}
+    for campo, (origen, conversion) in opciones.items():
+        valores = {}
+        for columna in origen:
+            for valor in contadores[columna.key]:
+                if conversion is not None:
+                    valor = conversion(valor)
+                if valor is not None:
+                    valores[valor] = None
+        resultado[campo] = list(valores)
+    return resultado
+
+
+class IndicePrefijos:
+    """Valores de un campo ordenados por clave sin tildes ni mayúsculas, para buscar por prefijo.
+
+    Las grafías con la misma clave se juntan: se muestra la más frecuente y la
+    frecuencia es la suma de todas.
+    """
+
+    def __init__(self, conteo):
+        grupos = {}
+        for valor, n in conteo.items():
+            clave = normalizar_clave(valor)
+            if clave is not None:
+                grupos.setdefault(clave, Counter())[str(valor)] += n
+        self.claves = sorted(grupos)
+        self.valores = [grupos[c].most_common(1)[0][0] for c in self.claves]
+        self.frecuencias = [sum(grupos[c].values()) for c in self.claves]
+
+    def _ranking(self, i):
+        return (-self.frecuencias[i], self.claves[i])
+
+    def buscar(self, prefijo, limit):
+        """Los `limit` valores más frecuentes que empiezan con `prefijo`."""
+        clave = normalizar_clave(prefijo) or ""
+        inicio = bisect_left(self.claves, clave)
+        fin = bisect_left(self.claves, clave + "\U0010ffff", inicio)
+        indices = heapq.nsmallest(limit, range(inicio, fin), key=self._ranking)
+        return [{"valor": self.valores[i], "frecuencia": self.frecuencias[i]} for i in indices]
+
+
+class CacheOpciones:
+    """Opciones de filtro precalculadas y serializadas, válidas para una versión del dataset.
+
+    Del mismo recorrido de la tabla salen la respuesta sin los campos de
+    `sugerencias`, la respuesta completa y un índice de prefijos por cada uno
+    de esos campos.
+    """
+
+    def __init__(self, opciones, schema, sugerencias=()):
+        self.opciones = opciones
+        self.schema = schema
+        self.sugerencias = list(sugerencias)
+        self.version = None
+        self.contenido = None
+        self.contenido_completo = None
+        self.indices = {}
+        self._lock = threading.Lock()
+
+    def _actualizar(self):
+        version = version_datos()
+        if self.version != version:
+            with self._lock:
+                if self.version != version:
+                    contadores = contar_valores(self.opciones)
+                    datos = self.schema(**construir_opciones(self.opciones, contadores)).dict()
+                    self.contenido_completo = json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                    for campo in self.sugerencias:
+                        datos.pop(campo)
+                    self.contenido = json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                    indices = {}
+                    for campo in self.sugerencias:
+                        conteo = Counter()
+                        for columna in self.opciones[campo][0]:
+                            conteo.update(contadores[columna.key])
+                        indices[campo] = IndicePrefijos(conteo)
+                    self.indices = indices
+                    self.version = version
+
+    def obtener(self, completo=False):
+        self._actualizar()
+        return self.contenido_completo if completo else self.contenido
+
+    def sugerir(self, campo, prefijo, limit):
+        self._actualizar()
+        return self.indices[campo].buscar(prefijo, limit)
+
+
+cache_conflicto = CacheOpciones(OPCIONES_CONFLICTO, ConflictoFiltroOpciones, SUGERENCIAS_CONFLICTO)
+cache_tierras = CacheOpciones(OPCIONES_TIERRAS, TierrasFiltroOpciones, SUGERENCIAS_TIERRAS)
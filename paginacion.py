@@ -0,0 +1,91 @@
+# paginacion.py
+import base64
+import json
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_, func, select
+from models import ConflictoMaceda, TierrasTitulomerced
+
+# Claves de orden admitidas para la paginación por cursor
+ORDEN_CONFLICTO = {
+    "id": ConflictoMaceda.id,
+    "año": ConflictoMaceda.año,
+    "comuna": ConflictoMaceda.comuna,
+    "provincia": ConflictoMaceda.provincia,
+    "region": ConflictoMaceda.region,
+    "tipo_evento": ConflictoMaceda.evento_tipo_maceda,
+}
+
+ORDEN_TIERRAS = {
+    "id": TierrasTitulomerced.id,
+    "año": TierrasTitulomerced.tdm_año,
+    "area": TierrasTitulomerced.tdm_area,
+    "comuna": TierrasTitulomerced.comuna_nombre,
+    "provincia": TierrasTitulomerced.provincia_nombre,
+    "region": TierrasTitulomerced.region_nombre,
+}
+
+CABECERA_CURSOR = "X-Next-Cursor"
+CABECERA_TOTAL = "X-Total-Count"
+
+
+def codificar_cursor(orden, valor, ultimo_id):
+    datos = json.dumps([orden, valor, ultimo_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor, orden):
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        orden_cursor, valor, ultimo_id = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+    if orden_cursor != orden or not isinstance(ultimo_id, int):
+        raise HTTPException(status_code=400, detail="Cursor no válido para este orden")
+    return valor, ultimo_id
+
+
+def paginar(query, modelo, ordenes, orden, cursor, limit, skip=0, contar=False):
+    """Página ordenada por (orden, id) que continúa después de `cursor`.
+
+    Usa una condición de keyset en vez de OFFSET, así que cada página cuesta
+    lo mismo sin importar cuán profunda sea. `skip` se mantiene por compatibilidad
+    y solo se aplica cuando no hay cursor. Devuelve (filas, siguiente_cursor, total).
+
+    Con `contar`, total son las filas que cumplen los filtros, sin importar el
+    cursor ni `skip`: sale de una subconsulta escalar en la misma consulta, así
+    que es el mismo en todas las páginas. Sin `contar`, total es None.
+    """
+    if orden not in ordenes:
+        raise HTTPException(status_code=400, detail="Orden no válido")
+    columna = ordenes[orden]
+    # Antes de la condición de keyset: el total no depende de la página. Se
+    # cuenta sobre la consulta filtrada como subconsulta, que siempre tiene FROM
+    conteo = select(func.count()).select_from(query.order_by(None).subquery())
+    if cursor:
+        valor, ultimo_id = decodificar_cursor(cursor, orden)
+        if columna is modelo.id:
+            query = query.filter(modelo.id > ultimo_id)
+        elif valor is None:
+            # SQLite ordena los NULL primero
+            query = query.filter(or_(and_(columna.is_(None), modelo.id > ultimo_id), columna.isnot(None)))
+        else:
+            query = query.filter(tuple_(columna, modelo.id) > tuple_(valor, ultimo_id))
+    if columna is modelo.id:
+        query = query.order_by(modelo.id)
+    else:
+        query = query.order_by(columna, modelo.id)
+    if contar:
+        # Sin correlate(None) la subconsulta se correlacionaría con la tabla de afuera
+        query = query.add_columns(conteo.scalar_subquery().correlate(None).label("total_filas"))
+    if skip and not cursor:
+        query = query.offset(skip)
+    items = query.limit(limit).all()
+    siguiente = None
+    if items and len(items) == limit:
+        ultimo = items[-1]
+        siguiente = codificar_cursor(orden, getattr(ultimo, columna.key), ultimo.id)
+    total = None
+    if contar:
+        # Una página vacía no tiene filas de las que leer el total
+        total = items[0].total_filas if items else query.session.execute(conteo).scalar()
+    return items, siguiente, total
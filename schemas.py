@@ -3,6 +3,24 @@ from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 
+# Reglas de conversión de los validadores; también las usan la carga, las
+# opciones de filtro y la serialización sin pydantic
+def convertir_a_int(valor):
+    if valor == '' or valor is None:
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+def convertir_a_float(valor):
+    if valor == '' or valor is None:
+        return None
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
 class ConflictoMacedaBase(BaseModel):
     id_evento_relacionado: Optional[int] = Field(default=None)
     año: Optional[int] = Field(default=None)
@@ -48,21 +66,11 @@ class ConflictoMacedaBase(BaseModel):
 
     @validator('id_evento_relacionado', 'año', 'mes', 'trimestre', 'arrestos', 'heridos', 'muertos', pre=True, always=True)
     def parse_int(cls, v):
-        if v == '' or v is None:
-            return None
-        try:
-            return int(v)
-        except ValueError:
-            return None
+        return convertir_a_int(v)
 
     @validator('perdida_estimada', 'mercurio', 'mella', 'osal', pre=True, always=True)
     def parse_float(cls, v):
-        if v == '' or v is None:
-            return None
-        try:
-            return float(v)
-        except ValueError:
-            return None
+        return convertir_a_float(v)
 
 class ConflictoMaceda(ConflictoMacedaBase):
     id: int
@@ -92,21 +100,11 @@ class TierrasTitulomercedBase(BaseModel):
 
     @validator('provincia_id', 'comuna_id', 'tdm_año', 'region_id', pre=True, always=True)
     def parse_int(cls, v):
-        if v == '' or v is None:
-            return None
-        try:
-            return int(v)
-        except ValueError:
-            return None
+        return convertir_a_int(v)
 
     @validator('longitud_W', 'latitud_S', 'tdm_area', 'tdm_geoarea', 'tdm_perim', pre=True, always=True)
     def parse_float(cls, v):
-        if v == '' or v is None:
-            return None
-        try:
-            return float(v)
-        except ValueError:
-            return None
+        return convertir_a_float(v)
 
 class TierrasTitulomerced(TierrasTitulomercedBase):
     id: int
@@ -129,17 +127,17 @@ class ConflictoFiltroOpciones(BaseModel):
     ubicacion_tipo: List[str]
     rural: List[str]
     evento_especifico: List[str]
-    actor_especifico_1: List[str]
+    actor_especifico_1: Optional[List[str]] = None
     actor_especifico_1_num: List[str]
     actor_especifico_1_armas: List[str]
-    actor_relacionado_1: List[str]
-    actor_especifico_2: List[str]
+    actor_relacionado_1: Optional[List[str]] = None
+    actor_especifico_2: Optional[List[str]] = None
     actor_especifico_2_num: List[str]
     actor_especifico_2_armas: List[str]
-    actor_relacionado_2: List[str]
+    actor_relacionado_2: Optional[List[str]] = None
     confrontacion: List[str]
     iniciador: List[str]
-    descripcion: List[str]
+    descripcion: Optional[List[str]] = None
     propiedad_destruida: List[str]
     propiedad_dañada: List[str]
     propiedad_robada: List[str]
@@ -152,16 +150,19 @@ class TierrasFiltroOpciones(BaseModel):
     regiones: List[str]
     provincias: List[str]
     comunas: List[str]
-    beneficiarios: List[str]
+    beneficiarios: Optional[List[str]] = None
     años: List[int]
     numeros: List[str]
     letras: List[str]
     areas: List[str]
     geoareas: List[str]
     perimetros: List[str]
-    lugar: List[str]
+    lugar: Optional[List[str]] = None
     provincia_id: List[int]
     comuna_id: List[int]
     tdm_original: List[str]
     longitud_W: List[float]
-    latitud_S: List[float]
\ No newline at end of file
+    latitud_S: List[float]
+
+class LoteIds(BaseModel):
+    ids: List[int]
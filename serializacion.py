@@ -0,0 +1,178 @@
+# serializacion.py
+import csv
+import io
+import json
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from models import engine_lectura, ConflictoMaceda as ConflictoMacedaModel, TierrasTitulomerced as TierrasTitulomercedModel
+from schemas import ConflictoMaceda, TierrasTitulomerced, convertir_a_int, convertir_a_float
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el módulo json estándar
+    orjson = None
+
+try:
+    import pyarrow
+except ImportError:  # Arrow es opcional
+    pyarrow = None
+
+TAMANO_LOTE = 2000
+
+FORMATOS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _a_str(v):
+    if v is None or isinstance(v, str):
+        return v
+    return str(v)
+
+
+def _float_a_str(v):
+    v = convertir_a_float(v)
+    return None if v is None else str(v)
+
+
+def codificar_json(datos):
+    """JSON compacto en bytes, con orjson si está disponible."""
+    if orjson is not None:
+        return orjson.dumps(datos)
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _identidad(v):
+    return v
+
+
+def _coercion(campo):
+    """Reproduce los validadores de schemas.py y la conversión de tipo de pydantic."""
+    validadores = set(campo.class_validators or ())
+    if "parse_int" in validadores:
+        return convertir_a_int
+    if "parse_float" in validadores:
+        return _float_a_str if campo.type_ is str else convertir_a_float
+    if campo.type_ is str:
+        return _a_str
+    return _identidad
+
+
+class Serializador:
+    """Convierte filas de la tabla a dicts con la misma forma que el schema, sin pydantic.
+
+    Con `campos` solo se leen y convierten esas columnas (proyección).
+    """
+
+    def __init__(self, modelo, schema, campos=None):
+        self.modelo = modelo
+        self.schema = schema
+        self.campos = list(campos or schema.__fields__)
+        self.tipos = [schema.__fields__[c].type_ for c in self.campos]
+        self.coerciones = [_coercion(schema.__fields__[c]) for c in self.campos]
+        self.columnas = [getattr(modelo, c) for c in self.campos]
+        self._proyecciones = {}
+
+    def proyectar(self, fields):
+        """Serializador para `fields` ("a,b,c"); el mismo si no se pide proyección."""
+        if not fields:
+            return self
+        campos = tuple(dict.fromkeys(c.strip() for c in fields.split(",") if c.strip()))
+        invalidos = [c for c in campos if c not in self.schema.__fields__]
+        if invalidos or not campos:
+            raise HTTPException(status_code=400, detail=f"Campo no válido: {', '.join(invalidos)}")
+        if campos not in self._proyecciones:
+            self._proyecciones[campos] = Serializador(self.modelo, self.schema, campos)
+        return self._proyecciones[campos]
+
+    def a_json(self, lote):
+        return codificar_json(self.dicts(lote))
+
+    def filas(self, lote):
+        coerciones = self.coerciones
+        return [tuple(f(v) for f, v in zip(coerciones, fila)) for fila in lote]
+
+    def dicts(self, lote):
+        campos = self.campos
+        return [dict(zip(campos, fila)) for fila in self.filas(lote)]
+
+    def lotes(self, query=None):
+        """Filas en lotes de TAMANO_LOTE, leídas con yield_per."""
+        if query is None:
+            query = select(*self.columnas).order_by(self.modelo.id)
+        with engine_lectura.connect() as conn:
+            resultado = conn.execution_options(yield_per=TAMANO_LOTE).execute(query)
+            for lote in resultado.partitions():
+                yield lote
+
+
+serializador_conflicto = Serializador(ConflictoMacedaModel, ConflictoMaceda)
+serializador_tierras = Serializador(TierrasTitulomercedModel, TierrasTitulomerced)
+
+
+def _json(serializador, lotes):
+    yield b"["
+    primero = True
+    for lote in lotes:
+        if not lote:
+            continue
+        # Se quitan los corchetes del arreglo del lote para concatenar
+        texto = serializador.a_json(lote)[1:-1]
+        yield texto if primero else b"," + texto
+        primero = False
+    yield b"]"
+
+
+def _ndjson(serializador, lotes):
+    for lote in lotes:
+        if lote:
+            yield b"".join(codificar_json(d) + b"\n" for d in serializador.dicts(lote))
+
+
+def _csv(serializador, lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(serializador.campos)
+    for lote in lotes:
+        escritor.writerows(serializador.filas(lote))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow(serializador, lotes):
+    tipos = {int: pyarrow.int64(), float: pyarrow.float64(), str: pyarrow.string()}
+    esquema = pyarrow.schema([(c, tipos.get(t, pyarrow.string())) for c, t in zip(serializador.campos, serializador.tipos)])
+    buffer = io.BytesIO()
+    with pyarrow.ipc.new_stream(buffer, esquema) as escritor:
+        for lote in lotes:
+            columnas = list(zip(*serializador.filas(lote)))
+            if not columnas:
+                continue
+            escritor.write_batch(pyarrow.record_batch([list(c) for c in columnas], schema=esquema))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+ESCRITORES = {"json": _json, "ndjson": _ndjson, "csv": _csv, "arrow": _arrow}
+
+
+def exportar(serializador, formato="json", query=None, nombre="datos"):
+    """Respuesta en streaming con memoria acotada por TAMANO_LOTE."""
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato no válido")
+    if formato == "arrow" and pyarrow is None:
+        raise HTTPException(status_code=501, detail="Formato arrow no disponible: falta pyarrow")
+    cuerpo = ESCRITORES[formato](serializador, serializador.lotes(query))
+    headers = {}
+    if formato != "json":
+        headers["Content-Disposition"] = f'attachment; filename="{nombre}.{formato}"'
+    return StreamingResponse(cuerpo, media_type=FORMATOS[formato], headers=headers)
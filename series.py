@@ -0,0 +1,184 @@
+# series.py
+from fastapi import HTTPException
+from sqlalchemy import MetaData, Table, Column, Integer, String, select, func
+from sqlalchemy.orm import Session
+from geografia import diccionario_geografico
+
+MEDIDAS_SERIE = ["heridos", "muertos", "arrestos"]
+# Años admitidos en desde/hasta y máximo de años por consulta
+AÑO_MIN = 1800
+AÑO_MAX = 2100
+MAX_AÑOS = 200
+
+# Rollup de conflicto_maceda por (año, mes, trimestre, region_gid, tipo de
+# evento); se mantiene con triggers. Mes, trimestre y región desconocidos se
+# guardan como 0 y el evento vacío como '' para que la clave sea única.
+conflicto_serie = Table(
+    "conflicto_serie", MetaData(),
+    Column("año", Integer), Column("mes", Integer), Column("trimestre", Integer),
+    Column("region_gid", Integer), Column("evento_tipo_maceda", String),
+    Column("eventos", Integer),
+    *(Column(m, Integer) for m in MEDIDAS_SERIE),
+)
+
+_CLAVE = "año, mes, trimestre, region_gid, evento_tipo_maceda"
+_MES = "CASE WHEN typeof({0}.mes) = 'integer' AND {0}.mes BETWEEN 1 AND 12 THEN {0}.mes ELSE 0 END"
+_TRIMESTRE = (
+    "CASE WHEN typeof({0}.trimestre) = 'integer' AND {0}.trimestre BETWEEN 1 AND 4 THEN {0}.trimestre "
+    "WHEN typeof({0}.mes) = 'integer' AND {0}.mes BETWEEN 1 AND 12 THEN ({0}.mes + 2) / 3 ELSE 0 END"
+)
+_MEDIDA = "CASE WHEN typeof({0}.{1}) IN ('integer', 'real') THEN {0}.{1} ELSE 0 END"
+_CON_AÑO = "typeof({0}.año) = 'integer'"
+
+
+_SUMAR = f"""INSERT INTO conflicto_serie ({_CLAVE}, eventos, {", ".join(MEDIDAS_SERIE)})
+        SELECT {{clave}}, 1, {{medidas}} WHERE true
+        ON CONFLICT ({_CLAVE}) DO UPDATE SET eventos = eventos + 1, {", ".join(f"{m} = {m} + excluded.{m}" for m in MEDIDAS_SERIE)};"""
+_RESTAR = f"""UPDATE conflicto_serie SET eventos = eventos - 1, {", ".join(f"{m} = {m} - " + _MEDIDA.format("old", m) for m in MEDIDAS_SERIE)}
+        WHERE ({_CLAVE}) = (old.año, {_MES.format("old")}, {_TRIMESTRE.format("old")}, coalesce(old.region_gid, 0), coalesce(old.evento_tipo_maceda, ''));
+        DELETE FROM conflicto_serie WHERE eventos <= 0;"""
+
+
+def _sumar(fila):
+    clave = f"{fila}.año, {_MES.format(fila)}, {_TRIMESTRE.format(fila)}, coalesce({fila}.region_gid, 0), coalesce({fila}.evento_tipo_maceda, '')"
+    return _SUMAR.format(clave=clave, medidas=", ".join(_MEDIDA.format(fila, m) for m in MEDIDAS_SERIE))
+
+
+DDL_SERIES = [
+    f"""CREATE TABLE IF NOT EXISTS conflicto_serie (
+        año INTEGER NOT NULL, mes INTEGER NOT NULL, trimestre INTEGER NOT NULL,
+        region_gid INTEGER NOT NULL, evento_tipo_maceda TEXT NOT NULL,
+        eventos INTEGER NOT NULL, {", ".join(f"{m} INTEGER NOT NULL" for m in MEDIDAS_SERIE)},
+        PRIMARY KEY ({_CLAVE})
+    ) WITHOUT ROWID""",
+    f"""CREATE TRIGGER IF NOT EXISTS conflicto_serie_ai AFTER INSERT ON conflicto_maceda
+    WHEN {_CON_AÑO.format('new')}
+    BEGIN
+        {_sumar('new')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conflicto_serie_ad AFTER DELETE ON conflicto_maceda
+    WHEN {_CON_AÑO.format('old')}
+    BEGIN
+        {_RESTAR}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conflicto_serie_au_old AFTER UPDATE OF año, mes, trimestre, region_gid, evento_tipo_maceda, {", ".join(MEDIDAS_SERIE)} ON conflicto_maceda
+    WHEN {_CON_AÑO.format('old')}
+    BEGIN
+        {_RESTAR}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conflicto_serie_au_new AFTER UPDATE OF año, mes, trimestre, region_gid, evento_tipo_maceda, {", ".join(MEDIDAS_SERIE)} ON conflicto_maceda
+    WHEN {_CON_AÑO.format('new')}
+    BEGIN
+        {_sumar('new')}
+    END""",
+]
+
+
+def preparar_series(conn):
+    """Crea el rollup y sus triggers, y lo reconstruye si no coincide con la tabla."""
+    for sentencia in DDL_SERIES:
+        conn.exec_driver_sql(sentencia)
+    en_serie = conn.exec_driver_sql("SELECT coalesce(sum(eventos), 0) FROM conflicto_serie").scalar()
+    con_año = conn.exec_driver_sql(f"SELECT count(*) FROM conflicto_maceda AS c WHERE {_CON_AÑO.format('c')}").scalar()
+    if en_serie != con_año:
+        conn.exec_driver_sql("DELETE FROM conflicto_serie")
+        medidas = ", ".join(f"sum({_MEDIDA.format('c', m)})" for m in MEDIDAS_SERIE)
+        conn.exec_driver_sql(
+            f"INSERT INTO conflicto_serie ({_CLAVE}, eventos, {', '.join(MEDIDAS_SERIE)}) "
+            f"SELECT c.año, {_MES.format('c')}, {_TRIMESTRE.format('c')}, coalesce(c.region_gid, 0), "
+            f"coalesce(c.evento_tipo_maceda, ''), count(*), {medidas} "
+            f"FROM conflicto_maceda AS c WHERE {_CON_AÑO.format('c')} GROUP BY 1, 2, 3, 4, 5"
+        )
+
+
+_serie = conflicto_serie.c
+# periodo -> (columna del subperíodo o None, subperíodos por año)
+PERIODOS = {"año": (None, 1), "trimestre": (_serie.trimestre, 4), "mes": (_serie.mes, 12)}
+GRUPOS_SERIE = {"region": _serie.region_gid, "tipo_evento": _serie.evento_tipo_maceda}
+VALORES_SERIE = ["eventos"] + MEDIDAS_SERIE
+
+
+def serie_conflictos(
+    db: Session, periodo, por=None, ventana=None, acumulado=False,
+    desde=None, hasta=None, region=None, tipo_evento=None,
+):
+    """Eventos y víctimas por período, sin huecos, opcionalmente por grupo.
+
+    Con `ventana` cada valor es la suma de los últimos `ventana` períodos; con
+    `acumulado`, la suma desde el primer período. `desde` y `hasta` solo
+    recortan el resultado, así que no cambian esas sumas.
+    """
+    if periodo not in PERIODOS:
+        raise HTTPException(status_code=400, detail="Período no válido")
+    if por is not None and por not in GRUPOS_SERIE:
+        raise HTTPException(status_code=400, detail="Grupo no válido")
+    if ventana is not None and (ventana < 1 or acumulado):
+        raise HTTPException(status_code=400, detail="Ventana no válida")
+    if desde is not None and hasta is not None and not 0 <= hasta - desde < MAX_AÑOS:
+        raise HTTPException(status_code=400, detail="Rango de años no válido")
+    subperiodo, por_año = PERIODOS[periodo]
+
+    claves = [_serie.año] + ([subperiodo] if subperiodo is not None else [])
+    grupo = [GRUPOS_SERIE[por]] if por else []
+    query = (
+        select(*grupo, *claves, *(func.sum(_serie[v]) for v in VALORES_SERIE))
+        .group_by(*grupo, *claves)
+        .order_by(*grupo, *claves)
+    )
+    if subperiodo is not None:
+        query = query.where(subperiodo > 0)
+    # La ventana y el acumulado dependen de los períodos fuera del rango: se
+    # calculan sobre todo el rollup filtrado y el resultado se recorta después
+    if not (ventana or acumulado):
+        if desde is not None:
+            query = query.where(_serie.año >= desde)
+        if hasta is not None:
+            query = query.where(_serie.año <= hasta)
+    if region is not None:
+        query = query.where(_serie.region_gid.in_(diccionario_geografico.gids("region", [region])))
+    if tipo_evento is not None:
+        query = query.where(_serie.evento_tipo_maceda == tipo_evento)
+
+    # Índice lineal del período: año * subperíodos + (subperíodo - 1)
+    series = {}
+    for fila in db.execute(query).all():
+        nombre = fila[0] if por else None
+        año, sub = fila[len(grupo)], fila[len(grupo) + 1] if subperiodo is not None else 1
+        series.setdefault(nombre, {})[año * por_año + sub - 1] = fila[len(grupo) + len(claves):]
+    if not series:
+        return []
+    if por == "region":
+        # El rollup agrupa por gid: se nombra y ordena con la dimensión, NULL primero
+        series = dict(sorted(
+            ((diccionario_geografico.nombre(gid), valores) for gid, valores in series.items()),
+            key=lambda par: (par[0] is not None, par[0] or ""),
+        ))
+    # Los huecos se rellenan solo entre el primer y el último período con datos
+    indices = [i for valores in series.values() for i in valores]
+    inicio, fin = min(indices), max(indices)
+    primero = inicio if desde is None else max(inicio, desde * por_año)
+    ultimo = fin if hasta is None else min(fin, hasta * por_año + por_año - 1)
+
+    resultado = []
+    ceros = (0,) * len(VALORES_SERIE)
+    for nombre, valores in series.items():
+        # Sumas prefijas: la ventana es la diferencia entre dos de ellas
+        prefijos = [ceros]
+        for indice in range(inicio, ultimo + 1):
+            actual = valores.get(indice, ceros)
+            prefijos.append(tuple(a + b for a, b in zip(prefijos[-1], actual)))
+            if indice < primero:
+                continue
+            if ventana:
+                totales = [a - b for a, b in zip(prefijos[-1], prefijos[max(0, len(prefijos) - 1 - ventana)])]
+            elif acumulado:
+                totales = prefijos[-1]
+            else:
+                totales = actual
+            punto = {por: nombre or None} if por else {}
+            punto["año"] = indice // por_año
+            if subperiodo is not None:
+                punto[periodo] = indice % por_año + 1
+            punto.update(zip(VALORES_SERIE, totales))
+            resultado.append(punto)
+    return resultado
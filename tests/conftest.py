@@ -0,0 +1,30 @@
+# tests/conftest.py
+"""Base sintética temporal compartida por toda la sesión.
+
+models.py y cache.py leen la configuración al importarse, así que las
+variables de entorno se fijan antes de importar cualquier módulo de la app.
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+DIRECTORIO = tempfile.mkdtemp(prefix="mdp_tests_")
+os.environ["MDP_DATABASE_URL"] = f"sqlite:///{os.path.join(DIRECTORIO, 'mdp.db')}"
+os.environ["MDP_CACHE_BYTES"] = "0"
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    from fastapi.testclient import TestClient
+    import datos_sinteticos
+    from models import engine
+    import main
+
+    with engine.begin() as conn:
+        datos_sinteticos.generar(conn, 0.5)
+    with TestClient(main.app) as cliente:
+        yield cliente
@@ -0,0 +1,55 @@
+# tests/test_admision.py
+import asyncio
+import admision
+from admision import Compuerta, MAX_LIMIT
+
+
+def test_busqueda_con_plazo_vencido_responde_503(cliente, monkeypatch):
+    # Presupuesto negativo: el plazo ya venció cuando empieza la consulta
+    monkeypatch.setitem(admision.LIMITES_RUTA, "/conflicto/buscar", (4, 8, -1))
+    respuesta = cliente.get("/conflicto/buscar", params={"q": "comunidad OR fundo OR predio", "avanzada": "true"})
+    assert respuesta.status_code == 503
+    assert respuesta.headers["Retry-After"] == str(admision.RETRY_AFTER)
+
+
+def test_agregado_con_plazo_vencido_responde_503(cliente, monkeypatch):
+    monkeypatch.setitem(admision.LIMITES_RUTA, "/conflicto/agregado", (4, 8, -1))
+    respuesta = cliente.get("/conflicto/agregado", params={"por": "comuna,año"})
+    assert respuesta.status_code == 503
+    assert "Retry-After" in respuesta.headers
+
+
+def test_sintaxis_fts_invalida_sigue_siendo_400(cliente):
+    for q in ['"abierta', "fundo AND", "columna:fundo"]:
+        respuesta = cliente.get("/conflicto/buscar", params={"q": q, "avanzada": "true"})
+        assert respuesta.status_code == 400, q
+
+
+def test_busqueda_normal(cliente):
+    respuesta = cliente.get("/conflicto/buscar", params={"q": "fundo"})
+    assert respuesta.status_code == 200
+    assert respuesta.json()
+
+
+def test_limit_acotado(cliente):
+    assert cliente.get("/conflicto/", params={"limit": MAX_LIMIT + 1}).status_code == 422
+    assert cliente.get("/tierras/", params={"limit": 0}).status_code == 422
+    assert cliente.get("/conflicto/", params={"skip": -1}).status_code == 422
+
+
+def test_compuerta_cola_llena_y_espera_vencida(monkeypatch):
+    monkeypatch.setattr(admision, "ESPERA_MAX", 0.01)
+
+    async def probar():
+        sin_cola = Compuerta(1, 0)
+        assert await sin_cola.entrar() == "ok"
+        assert await sin_cola.entrar() == "cola_llena"
+        sin_cola.salir()
+        assert await sin_cola.entrar() == "ok"
+
+        con_cola = Compuerta(1, 1)
+        assert await con_cola.entrar() == "ok"
+        assert await con_cola.entrar() == "espera_vencida"
+        assert con_cola.esperando == 0
+
+    asyncio.run(probar())
@@ -0,0 +1,22 @@
+# tests/test_agregado.py
+import pytest
+from admision import MAX_LIMIT
+
+
+@pytest.mark.parametrize("ruta, por", [
+    ("/conflicto/agregado", "region"),
+    ("/conflicto/agregado", "año"),
+    ("/tierras/agregado", "comuna"),
+    ("/tierras/agregado", "año"),
+])
+def test_limit_corta_los_primeros_grupos(cliente, ruta, por):
+    todos = cliente.get(ruta, params={"por": por}).json()
+    assert len(todos) > 2
+    assert cliente.get(ruta, params={"por": por, "limit": 2}).json() == todos[:2]
+    assert cliente.get(ruta, params={"por": por, "limit": MAX_LIMIT}).json() == todos
+
+
+@pytest.mark.parametrize("ruta", ["/conflicto/agregado", "/tierras/agregado"])
+@pytest.mark.parametrize("limit", [-1, 0, MAX_LIMIT + 1])
+def test_limit_fuera_de_rango(cliente, ruta, limit):
+    assert cliente.get(ruta, params={"por": "region", "limit": limit}).status_code == 422
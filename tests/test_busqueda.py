@@ -0,0 +1,58 @@
+# tests/test_busqueda.py
+import re
+import unicodedata
+from sqlalchemy import create_engine, select
+from models import Base, SessionLocal, ConflictoMaceda
+from admision import MAX_LIMIT
+from busqueda import COLUMNAS_TEXTO, preparar_busqueda
+
+
+def _palabras(texto):
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return re.findall(r"\w+", texto)
+
+
+def test_busqueda_igual_a_recorrer_la_tabla(cliente):
+    columnas = [getattr(ConflictoMaceda, c) for c in COLUMNAS_TEXTO]
+    with SessionLocal() as db:
+        filas = db.execute(select(ConflictoMaceda.id, *columnas)).all()
+    esperados = {
+        fila[0] for fila in filas
+        if any(p.startswith("fundo") for texto in fila[1:] for p in _palabras(texto))
+    }
+    assert 0 < len(esperados) <= MAX_LIMIT
+    respuesta = cliente.get("/conflicto/buscar", params={"q": "Fundo", "limit": MAX_LIMIT}).json()
+    assert {f["id"] for f in respuesta} == esperados
+    assert [f["puntaje"] for f in respuesta] == sorted(f["puntaje"] for f in respuesta)
+
+
+def test_consulta_avanzada_no_valida(cliente):
+    assert cliente.get("/conflicto/buscar", params={"q": "fundo AND", "avanzada": "true"}).status_code == 400
+
+
+def test_paginas_de_busqueda_acotadas(cliente):
+    todas = cliente.get("/conflicto/buscar", params={"q": "fundo", "limit": 30}).json()
+    assert cliente.get("/conflicto/buscar", params={"q": "fundo", "skip": 10, "limit": 5}).json() == todas[10:15]
+    for params in [{"skip": -1}, {"limit": 0}, {"limit": -1}, {"limit": MAX_LIMIT + 1}]:
+        assert cliente.get("/conflicto/buscar", params=dict(params, q="fundo")).status_code == 422, params
+
+
+def _cambios(conn):
+    return conn.exec_driver_sql("SELECT total_changes()").scalar()
+
+
+def test_update_sin_texto_no_toca_el_indice():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        preparar_busqueda(conn)
+        conn.exec_driver_sql("INSERT INTO conflicto_maceda (descripcion, comuna) VALUES ('quema de fundo', 'Ercilla')")
+        antes = _cambios(conn)
+        conn.exec_driver_sql("UPDATE conflicto_maceda SET comuna = 'Temuco', heridos = 1")
+        # Solo la fila de conflicto_maceda: el trigger FTS no corrió
+        assert _cambios(conn) - antes == 1
+
+        conn.exec_driver_sql("UPDATE conflicto_maceda SET descripcion = 'marcha pacífica'")
+        assert conn.exec_driver_sql("SELECT rowid FROM conflicto_fts WHERE conflicto_fts MATCH 'marcha'").all() == [(1,)]
+        assert conn.exec_driver_sql("SELECT rowid FROM conflicto_fts WHERE conflicto_fts MATCH 'quema'").all() == []
@@ -0,0 +1,51 @@
+# tests/test_cache.py
+import version
+from cache import CacheLRU
+
+RUTA = "/conflicto/"
+
+
+def test_etag_y_304(cliente):
+    respuesta = cliente.get(RUTA, params={"año": 2000, "limit": 5})
+    etag = respuesta.headers["etag"]
+    assert respuesta.status_code == 200
+    assert "must-revalidate" in respuesta.headers["cache-control"]
+
+    no_modificado = cliente.get(RUTA, params={"año": 2000, "limit": 5}, headers={"If-None-Match": etag})
+    assert no_modificado.status_code == 304
+    assert no_modificado.content == b""
+    assert no_modificado.headers["etag"] == etag
+    assert cliente.get(RUTA, params={"año": 2000, "limit": 5}, headers={"If-None-Match": f'"otro", W/{etag}'}).status_code == 304
+    assert cliente.get(RUTA, params={"año": 2000, "limit": 5}, headers={"If-None-Match": '"otro"'}).status_code == 200
+
+
+
+def test_asterisco_llega_a_la_app(cliente):
+    assert cliente.get("/conflicto/99999999", headers={"If-None-Match": "*"}).status_code == 404
+    assert cliente.get(RUTA, params={"limit": 5}, headers={"If-None-Match": "*"}).status_code == 200
+
+
+def test_etag_por_query_normalizada(cliente):
+    a = cliente.get(f"{RUTA}?año=2000&limit=5").headers["etag"]
+    b = cliente.get(f"{RUTA}?limit=5&año=2000").headers["etag"]
+    c = cliente.get(f"{RUTA}?limit=6&año=2000").headers["etag"]
+    assert a == b != c
+
+
+def test_etag_cambia_con_la_version(cliente):
+    etag = cliente.get(RUTA, params={"limit": 5}).headers["etag"]
+    version.incrementar_version()
+    respuesta = cliente.get(RUTA, params={"limit": 5}, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+
+
+def test_lru_acotado_por_bytes():
+    cache = CacheLRU(10)
+    cache.guardar("a", 200, [], b"1234")
+    cache.guardar("b", 200, [], b"1234")
+    assert cache.obtener("a") is not None  # "b" pasa a ser la más antigua
+    cache.guardar("c", 200, [], b"1234")
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") is not None and cache.obtener("c") is not None
+    assert cache.bytes == 8
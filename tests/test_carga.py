@@ -0,0 +1,55 @@
+# tests/test_carga.py
+import io
+import pytest
+from sqlalchemy import create_engine, insert, select
+from models import Base, TierrasTitulomerced, ConflictoMaceda
+from carga import cargar
+
+CSV_TIERRAS = """tdm_numero,tdm_letra,comuna_nombre,tdm_area
+9001,,Ercilla,10.5
+9002,A,Temuco,3
+9003, ,Tirúa,1
+"""
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        yield conn
+
+
+def filas_tierras(conn):
+    t = TierrasTitulomerced
+    return sorted(conn.execute(select(t.tdm_numero, t.tdm_letra, t.tdm_area)).all())
+
+
+def test_recargar_el_mismo_archivo_no_duplica(conn):
+    primera = cargar(conn, "tierras", io.StringIO(CSV_TIERRAS))
+    segunda = cargar(conn, "tierras", io.StringIO(CSV_TIERRAS))
+    assert (primera.insertados, primera.actualizados) == (3, 0)
+    assert (segunda.insertados, segunda.actualizados) == (0, 3)
+    assert [f[:2] for f in filas_tierras(conn)] == [("9001", None), ("9002", "A"), ("9003", None)]
+
+
+def test_letra_vacia_guardada_como_cadena_coincide(conn):
+    conn.execute(insert(TierrasTitulomerced), [{"tdm_numero": "9001", "tdm_letra": "", "tdm_area": 1.0}])
+    resumen = cargar(conn, "tierras", io.StringIO(CSV_TIERRAS))
+    assert (resumen.insertados, resumen.actualizados) == (2, 1)
+    assert ("9001", None, 10.5) in filas_tierras(conn)
+    assert len(filas_tierras(conn)) == 3
+
+
+def test_repetida_en_el_archivo_gana_la_ultima(conn):
+    cargar(conn, "tierras", io.StringIO(CSV_TIERRAS + "9001,,Ercilla,99\n"))
+    assert [f for f in filas_tierras(conn) if f[0] == "9001"] == [("9001", None, 99.0)]
+
+
+def test_conflicto_por_id_evento(conn):
+    archivo = "id_evento,comuna,heridos\n1,Ercilla,2\n2,Tirúa,0\n,Temuco,1\n"
+    cargar(conn, "conflicto", io.StringIO(archivo))
+    resumen = cargar(conn, "conflicto", io.StringIO(archivo.replace("Ercilla,2", "Ercilla,5")))
+    assert (resumen.insertados, resumen.actualizados) == (1, 2)
+    eventos = dict(conn.execute(select(ConflictoMaceda.id_evento, ConflictoMaceda.heridos).where(ConflictoMaceda.id_evento.isnot(None))).all())
+    assert eventos == {1: 5, 2: 0}
@@ -0,0 +1,80 @@
+# tests/test_compresion.py
+import gzip
+import pytest
+import version
+from compresion import CODIFICACIONES, CompresionHTTP, negociar
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DESCOMPRESORES = {"gzip": gzip.decompress}
+if brotli is not None:
+    DESCOMPRESORES["br"] = brotli.decompress
+if zstandard is not None:
+    DESCOMPRESORES["zstd"] = lambda datos: zstandard.ZstdDecompressor().decompressobj().decompress(datos)
+
+
+def pedir(cliente, ruta, codificacion, **kwargs):
+    """(respuesta, cuerpo tal como viaja, sin decodificar)."""
+    headers = dict(kwargs.pop("headers", {}), **{"Accept-Encoding": codificacion})
+    respuesta = cliente.get(ruta, headers=headers, stream=True, **kwargs)
+    return respuesta, respuesta.raw.read(decode_content=False)
+
+
+def almacen(cliente):
+    capa = cliente.app.middleware_stack
+    while not isinstance(capa, CompresionHTTP):
+        capa = capa.app
+    return capa.almacen
+
+
+def test_negociacion():
+    preferida = next(iter(CODIFICACIONES))
+    assert negociar(b"gzip") == "gzip"
+    assert negociar(b"gzip;q=0.5, " + ", ".join(CODIFICACIONES).encode()) == preferida
+    assert negociar(b"*") == preferida
+    assert negociar(b"identity") is None
+    assert negociar(b"gzip;q=0") is None
+    assert negociar(b"") is None
+
+
+@pytest.mark.parametrize("codificacion", list(CODIFICACIONES))
+def test_cuerpo_comprimido_igual_al_original(cliente, codificacion):
+    ruta, params = "/conflicto/", {"limit": 300}
+    original, plano = pedir(cliente, ruta, "identity", params=params)
+    assert "content-encoding" not in original.headers
+    respuesta, cuerpo = pedir(cliente, ruta, codificacion, params=params)
+    assert respuesta.headers["content-encoding"] == codificacion
+    assert "Accept-Encoding" in respuesta.headers["vary"]
+    assert respuesta.headers["etag"] == original.headers["etag"][:-1] + f'-{codificacion}"'
+    assert len(cuerpo) < len(plano)
+    assert DESCOMPRESORES[codificacion](cuerpo) == plano
+
+
+def test_respuesta_chica_sin_comprimir(cliente):
+    respuesta, _ = pedir(cliente, "/conflicto/", "gzip", params={"limit": 1, "fields": "id"})
+    assert "content-encoding" not in respuesta.headers
+
+
+def test_descarga_guardada_comprimida(cliente):
+    guardadas = almacen(cliente)
+    primera, cuerpo = pedir(cliente, "/tierras/all", "gzip")
+    claves = [c for c in guardadas.entradas if c[0] == "/tierras/all" and c[3] == "gzip"]
+    assert len(claves) == 1
+    assert guardadas.entradas[claves[0]][2] == cuerpo
+
+    segunda, repetido = pedir(cliente, "/tierras/all", "gzip")
+    assert repetido == cuerpo and segunda.headers["etag"] == primera.headers["etag"]
+    no_modificado, _ = pedir(cliente, "/tierras/all", "gzip", headers={"If-None-Match": primera.headers["etag"]})
+    assert no_modificado.status_code == 304
+
+    version.incrementar_version()
+    pedir(cliente, "/tierras/all", "gzip")
+    assert claves[0] not in guardadas.entradas
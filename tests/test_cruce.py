@@ -0,0 +1,53 @@
+# tests/test_cruce.py
+import unicodedata
+from sqlalchemy import select
+from models import SessionLocal, ConflictoMaceda, TierrasTitulomerced
+
+FILTROS = {"año": 2000}
+
+
+def _clave(valor):
+    if valor is None:
+        return None
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.split()).casefold() or None
+
+
+def pares_esperados():
+    """Cruce por comuna con el doble bucle original, en orden (conflicto.id, tierra.id)."""
+    with SessionLocal() as db:
+        conflictos = db.execute(
+            select(ConflictoMaceda.id, ConflictoMaceda.comuna).where(ConflictoMaceda.año == FILTROS["año"]).order_by(ConflictoMaceda.id)
+        ).all()
+        tierras = db.execute(select(TierrasTitulomerced.id, TierrasTitulomerced.comuna_nombre).order_by(TierrasTitulomerced.id)).all()
+    return [
+        {"conflicto_id": c_id, "conflicto_comuna": c_comuna, "tierra_id": t_id, "tierra_comuna": t_comuna}
+        for c_id, c_comuna in conflictos
+        for t_id, t_comuna in tierras
+        if _clave(c_comuna) is not None and _clave(c_comuna) == _clave(t_comuna)
+    ]
+
+
+def test_cruce_igual_al_doble_bucle(cliente):
+    esperados = pares_esperados()
+    assert esperados
+    respuesta = cliente.get("/cross_data/by/comuna", params=dict(FILTROS, limit=len(esperados) + 10))
+    assert respuesta.status_code == 200
+    assert respuesta.json() == esperados
+
+
+def test_paginas_del_cruce(cliente):
+    esperados = pares_esperados()
+    for skip, limit in [(0, 10), (7, 25), (len(esperados) - 5, 20), (len(esperados) + 1, 10)]:
+        pagina = cliente.get("/cross_data/by/comuna", params=dict(FILTROS, skip=skip, limit=limit)).json()
+        assert pagina == esperados[skip:skip + limit], (skip, limit)
+
+
+def test_conteo_del_cruce(cliente):
+    conteo = cliente.get("/cross_data/by/comuna", params=dict(FILTROS, solo_conteo="true")).json()
+    assert conteo == {"total": len(pares_esperados())}
+
+
+def test_campo_no_valido(cliente):
+    assert cliente.get("/cross_data/by/lugar").status_code == 400
@@ -0,0 +1,64 @@
+# tests/test_espacial.py
+import math
+import pytest
+from sqlalchemy import select
+from models import SessionLocal, TierrasTitulomerced
+from admision import MAX_LIMIT
+
+CENTRO = (-72.4, -38.1)
+
+
+def puntos():
+    t = TierrasTitulomerced
+    with SessionLocal() as db:
+        return db.execute(select(t.id, t.longitud_W, t.latitud_S).order_by(t.id)).all()
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(a))
+
+
+def distancias():
+    return sorted((haversine(*CENTRO, lon, lat), i) for i, lon, lat in puntos() if lon is not None and lat is not None)
+
+
+def test_bbox_igual_a_recorrer_la_tabla(cliente):
+    caja = {"lon_min": -72.6, "lon_max": -72.2, "lat_min": -38.3, "lat_max": -37.9}
+    esperados = [
+        i for i, lon, lat in puntos()
+        if lon is not None and lat is not None
+        and caja["lon_min"] <= lon <= caja["lon_max"] and caja["lat_min"] <= lat <= caja["lat_max"]
+    ]
+    assert esperados
+    assert [f["id"] for f in cliente.get("/tierras/bbox", params=caja).json()] == esperados
+    assert [f["id"] for f in cliente.get("/tierras/bbox", params=dict(caja, limit=5)).json()] == esperados[:5]
+
+
+@pytest.mark.parametrize("radio_km", [3, 15, 60])
+def test_radio_igual_a_recorrer_la_tabla(cliente, radio_km):
+    esperados = [(d, i) for d, i in distancias() if d <= radio_km]
+    filas = cliente.get("/tierras/radio", params={"lon": CENTRO[0], "lat": CENTRO[1], "radio_km": radio_km}).json()
+    assert sorted(f["id"] for f in filas) == sorted(i for _, i in esperados)
+    assert [f["distancia_km"] for f in filas] == pytest.approx([d for d, _ in esperados])
+
+
+@pytest.mark.parametrize("k", [1, 10, 500])
+def test_cercanos_igual_a_ordenar_la_tabla(cliente, k):
+    esperados = distancias()[:k]
+    filas = cliente.get("/tierras/cercanos", params={"lon": CENTRO[0], "lat": CENTRO[1], "k": k}).json()
+    assert len(filas) == len(esperados)
+    assert [f["distancia_km"] for f in filas] == pytest.approx([d for d, _ in esperados])
+
+
+def test_parametros_espaciales_no_validos(cliente):
+    assert cliente.get("/tierras/bbox", params={"lon_min": 1, "lon_max": 0, "lat_min": 0, "lat_max": 1}).status_code == 400
+    assert cliente.get("/tierras/radio", params={"lon": 0, "lat": 0, "radio_km": 0}).status_code == 400
+    for ruta, params in [
+        ("/tierras/bbox", {"lon_min": 0, "lon_max": 1, "lat_min": 0, "lat_max": 1, "limit": -1}),
+        ("/tierras/radio", {"lon": 0, "lat": 0, "radio_km": 1, "limit": 0}),
+        ("/tierras/cercanos", {"lon": 0, "lat": 0, "k": 0}),
+        ("/tierras/cercanos", {"lon": 0, "lat": 0, "k": MAX_LIMIT + 1}),
+    ]:
+        assert cliente.get(ruta, params=params).status_code == 422, (ruta, params)
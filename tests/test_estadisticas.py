@@ -0,0 +1,64 @@
+# tests/test_estadisticas.py
+from collections import defaultdict
+from sqlalchemy import create_engine
+from models import Base
+from estadisticas import preparar_estadisticas
+
+
+def _recontar(conn):
+    """Las mismas sumas que mantienen los triggers, recorriendo ambas tablas en Python."""
+    totales = defaultdict(lambda: [0, 0, 0, 0, 0, 0.0])
+    for nivel in ("comuna_gid", "provincia_gid", "region_gid"):
+        for gid, *medidas in conn.exec_driver_sql(f"SELECT {nivel}, heridos, muertos, arrestos FROM conflicto_maceda WHERE {nivel} IS NOT NULL"):
+            fila = totales[gid]
+            fila[0] += 1
+            for i, valor in enumerate(medidas, 1):
+                fila[i] += valor if isinstance(valor, (int, float)) else 0
+        for gid, area in conn.exec_driver_sql(f"SELECT {nivel}, tdm_area FROM tierras_titulomerced WHERE {nivel} IS NOT NULL"):
+            totales[gid][4] += 1
+            totales[gid][5] += area if isinstance(area, (int, float)) else 0
+    return {gid: tuple(fila) for gid, fila in totales.items()}
+
+
+def _materializado(conn):
+    filas = conn.exec_driver_sql("SELECT gid, eventos, heridos, muertos, arrestos, titulos, area FROM estadisticas_cruce")
+    return {f[0]: tuple(f[1:]) for f in filas}
+
+
+def test_triggers_mantienen_la_tabla():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO conflicto_maceda (comuna_gid, region_gid, heridos, arrestos) VALUES (1, 10, 2, 'x'), (1, 10, 1, 3), (2, 10, NULL, 1)")
+        conn.exec_driver_sql("INSERT INTO tierras_titulomerced (comuna_gid, region_gid, tdm_area) VALUES (1, 10, 5.5), (3, 10, 'abc')")
+        preparar_estadisticas(conn)
+        assert _materializado(conn) == _recontar(conn)
+
+        conn.exec_driver_sql("INSERT INTO conflicto_maceda (comuna_gid, region_gid, muertos) VALUES (3, 10, 1)")
+        conn.exec_driver_sql("UPDATE conflicto_maceda SET comuna_gid = 2 WHERE id = 1")
+        conn.exec_driver_sql("UPDATE tierras_titulomerced SET tdm_area = 7 WHERE id = 1")
+        conn.exec_driver_sql("DELETE FROM tierras_titulomerced WHERE id = 2")
+        conn.exec_driver_sql("DELETE FROM conflicto_maceda WHERE comuna_gid = 3")
+        assert _materializado(conn) == _recontar(conn)
+        # Sin eventos ni títulos la entidad deja de tener fila
+        assert 3 not in _materializado(conn)
+
+
+def test_endpoint_filtra_y_ordena(cliente):
+    filas = cliente.get("/estadisticas/by/comuna", params={"orden": "eventos_por_titulo", "titulos_min": 1}).json()
+    razones = [f["eventos_por_titulo"] for f in filas]
+    assert razones == sorted(razones, reverse=True)
+    assert all(f["titulos"] >= 1 for f in filas)
+    ercilla = cliente.get("/estadisticas/by/comuna", params={"lugar": "ERCILLA"}).json()
+    assert [f["comuna"] for f in ercilla] == ["Ercilla"]
+    assert ercilla[0]["eventos_por_titulo"] == ercilla[0]["eventos"] / ercilla[0]["titulos"]
+    assert cliente.get("/estadisticas/by/pais").status_code == 400
+    assert cliente.get("/estadisticas/by/region", params={"orden": "comuna"}).status_code == 400
+
+
+def test_endpoint_coincide_con_cross_data(cliente):
+    region = cliente.get("/estadisticas/by/region", params={"lugar": "Araucanía"}).json()[0]
+    conteo = {f["region"]: f["count"] for f in cliente.get("/conflicto/count_by/region").json()}
+    area = {f["region"]: f["total_area"] for f in cliente.get("/tierras/area_by/region").json()}
+    assert region["eventos"] == conteo["Araucanía"]
+    assert abs(region["total_area"] - area["Araucanía"]) < 1e-6
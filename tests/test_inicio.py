@@ -0,0 +1,41 @@
+# tests/test_inicio.py
+import json
+import os
+import subprocess
+import sys
+from conftest import RAIZ
+
+SCRIPT = """
+import json
+from fastapi.testclient import TestClient
+import main
+
+with TestClient(main.app) as c:
+    lista = c.get("/conflicto/", params={"comuna": "Ercilla", "total": "true"})
+    print(json.dumps({
+        "lista": len(lista.json()),
+        "total": lista.headers.get("X-Total-Count"),
+        "serie": c.get("/conflicto/serie/año").status_code,
+        "estadisticas": c.get("/estadisticas/by/region").status_code,
+        "regiones": [f["region"] for f in c.get("/conflicto/count_by/region").json()],
+    }))
+"""
+
+
+def test_inmutable_lee_lo_escrito_al_iniciar(tmp_path):
+    base = tmp_path / "mdp.db"
+    entorno = dict(os.environ, MDP_DATABASE_URL=f"sqlite:///{base}", MDP_CACHE_BYTES="0")
+    subprocess.run(
+        [sys.executable, "datos_sinteticos.py", "--escala", "0.2", "--salida", str(base)],
+        cwd=RAIZ, env=entorno, check=True, capture_output=True,
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=RAIZ, env=dict(entorno, MDP_INMUTABLE="1"),
+        check=True, capture_output=True, text=True,
+    )
+    resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+    assert resultado["lista"] > 0
+    assert int(resultado["total"]) > 0
+    assert resultado["serie"] == 200
+    assert resultado["estadisticas"] == 200
+    assert None not in resultado["regiones"]
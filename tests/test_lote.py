@@ -0,0 +1,28 @@
+# tests/test_lote.py
+from lote import MAX_IDS_LOTE, TAMANO_IN
+
+FALTANTES = [99999991, 99999992]
+
+
+def test_lote_en_el_orden_pedido(cliente):
+    ids = [5, 3, 99999991, 5, 1, 99999992, 99999991, 2]
+    respuesta = cliente.get("/conflicto/lote", params={"ids": ",".join(map(str, ids))}).json()
+    assert respuesta["faltantes"] == FALTANTES
+    assert respuesta["items"] == [
+        None if i in FALTANTES else cliente.get(f"/conflicto/{i}").json() for i in ids
+    ]
+
+
+def test_lote_por_post_y_en_varios_bloques(cliente):
+    ids = list(range(2 * TAMANO_IN + 7, 0, -1))
+    por_get = cliente.get("/tierras/lote", params={"ids": ",".join(map(str, ids)), "fields": "id,tdm_area"}).json()
+    por_post = cliente.post("/tierras/lote", params={"fields": "id,tdm_area"}, json={"ids": ids}).json()
+    assert por_post == por_get
+    assert [f["id"] for f in por_get["items"]] == ids
+    assert por_get["faltantes"] == []
+
+
+def test_lote_no_valido(cliente):
+    assert cliente.get("/conflicto/lote", params={"ids": "1,dos"}).status_code == 400
+    demasiados = {"ids": list(range(1, MAX_IDS_LOTE + 2))}
+    assert cliente.post("/conflicto/lote", json=demasiados).status_code == 400
@@ -0,0 +1,42 @@
+# tests/test_opciones.py
+from collections import Counter
+from sqlalchemy import select
+from models import SessionLocal, TierrasTitulomerced
+from geografia import normalizar_clave
+from opciones import SUGERENCIAS_CONFLICTO, SUGERENCIAS_TIERRAS
+
+
+def sugerencias_esperadas(prefijo, limit):
+    """Beneficiarios agrupados por clave y ordenados por frecuencia, recorriendo la tabla."""
+    with SessionLocal() as db:
+        valores = db.scalars(select(TierrasTitulomerced.tdm_beneficiario)).all()
+    grupos = {}
+    for valor in valores:
+        clave = normalizar_clave(valor)
+        if clave is not None and clave.startswith(normalizar_clave(prefijo) or ""):
+            grupos.setdefault(clave, Counter())[valor] += 1
+    orden = sorted(grupos, key=lambda c: (-sum(grupos[c].values()), c))[:limit]
+    return [{"valor": grupos[c].most_common(1)[0][0], "frecuencia": sum(grupos[c].values())} for c in orden]
+
+
+def test_sugerencias_por_prefijo(cliente):
+    ruta = "/filtro_opciones/tierras/sugerencias"
+    assert sugerencias_esperadas("lonko", 10)
+    for prefijo, limit in [("", 5), ("lonko", 10), ("LÓNKO  C", 3), ("zzzz", 10)]:
+        respuesta = cliente.get(ruta, params={"field": "beneficiarios", "prefix": prefijo, "limit": limit})
+        assert respuesta.json() == sugerencias_esperadas(prefijo, limit), prefijo
+
+
+def test_campos_de_texto_libre_solo_con_completo(cliente):
+    resumido = cliente.get("/filtro_opciones/conflicto").json()
+    completo = cliente.get("/filtro_opciones/conflicto", params={"completo": "true"}).json()
+    assert not set(SUGERENCIAS_CONFLICTO) & set(resumido)
+    assert set(SUGERENCIAS_CONFLICTO) <= set(completo)
+    assert {k: v for k, v in completo.items() if k in resumido} == resumido
+    assert set(SUGERENCIAS_TIERRAS) <= set(cliente.get("/filtro_opciones/tierras", params={"completo": "true"}).json())
+
+
+def test_sugerencias_no_validas(cliente):
+    ruta = "/filtro_opciones/conflicto/sugerencias"
+    assert cliente.get(ruta, params={"field": "comunas"}).status_code == 400
+    assert cliente.get(ruta, params={"field": "descripcion", "limit": 0}).status_code == 422
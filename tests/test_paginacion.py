@@ -0,0 +1,89 @@
+# tests/test_paginacion.py
+import pytest
+from sqlalchemy import func, select
+from models import SessionLocal, ConflictoMaceda, TierrasTitulomerced
+from paginacion import ORDEN_CONFLICTO, ORDEN_TIERRAS, CABECERA_CURSOR, CABECERA_TOTAL
+
+FILTROS = {"region": "Araucanía", "total": "true", "limit": 100}
+
+
+def paginas(cliente, ruta, parametros):
+    """Respuestas de todas las páginas siguiendo X-Next-Cursor."""
+    cursor = None
+    while True:
+        respuesta = cliente.get(ruta, params=dict(parametros, **({"cursor": cursor} if cursor else {})))
+        assert respuesta.status_code == 200
+        yield respuesta
+        cursor = respuesta.headers.get(CABECERA_CURSOR)
+        if not cursor:
+            return
+
+
+def recorrer(cliente, ruta, **params):
+    return [fila["id"] for respuesta in paginas(cliente, ruta, params) for fila in respuesta.json()]
+
+
+def ids_ordenados(modelo, columna, *condiciones):
+    with SessionLocal() as db:
+        return db.scalars(select(modelo.id).where(*condiciones).order_by(columna, modelo.id)).all()
+
+
+@pytest.mark.parametrize("orden", ["id", "año", "comuna", "tipo_evento"])
+def test_cursor_recorre_conflicto_sin_saltos(cliente, orden):
+    ids = recorrer(cliente, "/conflicto/", orden=orden, limit=97, region="Araucanía")
+    esperados = ids_ordenados(ConflictoMaceda, ORDEN_CONFLICTO[orden], ConflictoMaceda.region == "Araucanía")
+    assert len(esperados) > 97
+    assert ids == esperados
+
+
+@pytest.mark.parametrize("orden", ["id", "año", "area", "comuna"])
+def test_cursor_recorre_tierras_sin_saltos(cliente, orden):
+    ids = recorrer(cliente, "/tierras/", orden=orden, limit=250)
+    assert len(ids) == len(set(ids))
+    assert ids == ids_ordenados(TierrasTitulomerced, ORDEN_TIERRAS[orden])
+
+
+def test_skip_sin_cursor(cliente):
+    todos = ids_ordenados(ConflictoMaceda, ConflictoMaceda.año)
+    pagina = cliente.get("/conflicto/", params={"orden": "año", "skip": 30, "limit": 20}).json()
+    assert [fila["id"] for fila in pagina] == todos[30:50]
+
+
+def test_cursor_de_otro_orden(cliente):
+    cursor = cliente.get("/conflicto/", params={"orden": "año", "limit": 5}).headers[CABECERA_CURSOR]
+    assert cliente.get("/conflicto/", params={"orden": "comuna", "cursor": cursor}).status_code == 400
+    assert cliente.get("/conflicto/", params={"cursor": "no-es-un-cursor"}).status_code == 400
+
+
+@pytest.mark.parametrize("orden", ["id", "año", "comuna"])
+def test_total_estable_entre_paginas(cliente, orden):
+    respuestas = list(paginas(cliente, "/conflicto/", dict(FILTROS, orden=orden)))
+    totales = {int(r.headers[CABECERA_TOTAL]) for r in respuestas}
+    filas = sum(len(r.json()) for r in respuestas)
+    assert len(respuestas) > 2
+    assert totales == {filas}
+
+
+def test_total_con_skip_igual_al_del_cursor(cliente):
+    primera = cliente.get("/conflicto/", params=FILTROS)
+    por_cursor = cliente.get("/conflicto/", params=dict(FILTROS, cursor=primera.headers[CABECERA_CURSOR]))
+    por_skip = cliente.get("/conflicto/", params=dict(FILTROS, skip=100))
+    assert por_cursor.json() == por_skip.json()
+    assert por_cursor.headers[CABECERA_TOTAL] == por_skip.headers[CABECERA_TOTAL] == primera.headers[CABECERA_TOTAL]
+
+
+def test_total_en_pagina_vacia(cliente):
+    primera = cliente.get("/tierras/", params={"comuna": "Ercilla", "total": "true", "limit": 5})
+    fuera = cliente.get("/tierras/", params={"comuna": "Ercilla", "total": "true", "limit": 5, "skip": 100000})
+    assert fuera.json() == []
+    assert fuera.headers[CABECERA_TOTAL] == primera.headers[CABECERA_TOTAL] != "0"
+
+
+@pytest.mark.parametrize("ruta, modelo", [("/conflicto/", ConflictoMaceda), ("/tierras/", TierrasTitulomerced)])
+def test_total_sin_filtros(cliente, ruta, modelo):
+    with SessionLocal() as db:
+        filas = db.scalar(select(func.count()).select_from(modelo))
+    primera = cliente.get(ruta, params={"total": "true", "limit": 10})
+    assert int(primera.headers[CABECERA_TOTAL]) == filas
+    vacia = cliente.get(ruta, params={"total": "true", "limit": 10, "skip": filas})
+    assert vacia.json() == [] and int(vacia.headers[CABECERA_TOTAL]) == filas
@@ -0,0 +1,76 @@
+# tests/test_serializacion.py
+import csv
+import io
+import json
+import pytest
+from models import SessionLocal, ConflictoMaceda as ConflictoModel, TierrasTitulomerced as TierrasModel
+from schemas import ConflictoMaceda, TierrasTitulomerced
+
+TABLAS = [("/conflicto/all", ConflictoModel, ConflictoMaceda), ("/tierras/all", TierrasModel, TierrasTitulomerced)]
+
+
+def esperado(modelo, schema):
+    """Lo que devolvía el endpoint validando cada fila con pydantic."""
+    with SessionLocal() as db:
+        return [json.loads(schema.from_orm(fila).json()) for fila in db.query(modelo).order_by(modelo.id)]
+
+
+@pytest.mark.parametrize("ruta, modelo, schema", TABLAS)
+def test_exportar_json(cliente, ruta, modelo, schema):
+    respuesta = cliente.get(ruta)
+    assert respuesta.headers["content-type"].startswith("application/json")
+    assert respuesta.json() == esperado(modelo, schema)
+
+
+@pytest.mark.parametrize("ruta, modelo, schema", TABLAS)
+def test_exportar_ndjson(cliente, ruta, modelo, schema):
+    respuesta = cliente.get(ruta, params={"formato": "ndjson"})
+    assert respuesta.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(linea) for linea in respuesta.text.splitlines()] == esperado(modelo, schema)
+
+
+@pytest.mark.parametrize("ruta, modelo, schema", TABLAS)
+def test_exportar_csv(cliente, ruta, modelo, schema):
+    respuesta = cliente.get(ruta, params={"formato": "csv"})
+    assert respuesta.headers["content-type"].startswith("text/csv")
+    filas = list(csv.reader(io.StringIO(respuesta.text)))
+    filas_esperadas = esperado(modelo, schema)
+    assert filas[0] == list(schema.__fields__)
+    assert filas[1:] == [["" if v is None else str(v) for v in d.values()] for d in filas_esperadas]
+
+
+def test_formato_no_valido(cliente):
+    assert cliente.get("/conflicto/all", params={"formato": "xml"}).status_code == 400
+
+
+def test_proyeccion_en_listado(cliente):
+    params = {"region": "Araucanía", "orden": "año", "limit": 50}
+    completas = cliente.get("/conflicto/", params=params).json()
+    proyectadas = cliente.get("/conflicto/", params=dict(params, fields="comuna, año,comuna")).json()
+    assert proyectadas == [{"comuna": f["comuna"], "año": f["año"]} for f in completas]
+
+
+def test_proyeccion_sigue_el_cursor(cliente):
+    params = {"orden": "area", "limit": 40}
+    primera = cliente.get("/tierras/", params=dict(params, fields="tdm_beneficiario"))
+    cursor = primera.headers["X-Next-Cursor"]
+    assert cliente.get("/tierras/", params=dict(params, cursor=cursor, fields="id")).json() == [
+        {"id": f["id"]} for f in cliente.get("/tierras/", params=dict(params, cursor=cursor)).json()
+    ]
+
+
+@pytest.mark.parametrize("formato", ["json", "csv"])
+def test_proyeccion_en_exportacion(cliente, formato):
+    campos = ["id", "tdm_area", "comuna_nombre"]
+    filas = [{c: d[c] for c in campos} for d in esperado(TierrasModel, TierrasTitulomerced)]
+    respuesta = cliente.get("/tierras/all", params={"formato": formato, "fields": ",".join(campos)})
+    if formato == "json":
+        assert respuesta.json() == filas
+    else:
+        lineas = list(csv.reader(io.StringIO(respuesta.text)))
+        assert lineas[0] == campos
+        assert lineas[1:] == [["" if v is None else str(v) for v in d.values()] for d in filas]
+
+
+def test_proyeccion_con_campo_desconocido(cliente):
+    assert cliente.get("/conflicto/", params={"fields": "id,contraseña"}).status_code == 400
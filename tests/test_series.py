@@ -0,0 +1,61 @@
+# tests/test_series.py
+import pytest
+from sqlalchemy import func, select
+from models import SessionLocal, ConflictoMaceda
+
+
+def test_rango_amplio_se_acota_a_los_datos(cliente):
+    sin_rango = cliente.get("/conflicto/serie/mes", params={"por": "region"}).json()
+    amplio = cliente.get("/conflicto/serie/mes", params={"por": "region", "desde": 1900, "hasta": 2099})
+    assert amplio.status_code == 200
+    assert amplio.json() == sin_rango
+    años = {p["año"] for p in sin_rango}
+    assert min(años) > 1900 and max(años) < 2099
+
+
+def test_rango_de_años_validado(cliente):
+    assert cliente.get("/conflicto/serie/mes", params={"desde": 0, "hasta": 20000}).status_code == 422
+    assert cliente.get("/conflicto/serie/año", params={"desde": 1800, "hasta": 2100}).status_code == 400
+    assert cliente.get("/conflicto/serie/año", params={"desde": 2010, "hasta": 2000}).status_code == 400
+
+
+def test_serie_anual_suma_todos_los_eventos(cliente):
+    serie = cliente.get("/conflicto/serie/año").json()
+    with SessionLocal() as db:
+        total = db.execute(select(func.count()).where(func.typeof(ConflictoMaceda.año) == "integer")).scalar()
+    assert sum(p["eventos"] for p in serie) == total
+    # Sin huecos entre el primer y el último año
+    años = [p["año"] for p in serie]
+    assert años == list(range(años[0], años[-1] + 1))
+
+
+def test_region_se_resuelve_con_la_dimension(cliente):
+    canonica = cliente.get("/conflicto/serie/año", params={"region": "Araucanía"}).json()
+    assert canonica
+    assert cliente.get("/conflicto/serie/año", params={"region": "ARAUCANIA "}).json() == canonica
+    assert cliente.get("/conflicto/serie/año", params={"region": "Atlántida"}).json() == []
+    lista = cliente.get("/conflicto/", params={"region": "araucania", "total": "true", "limit": 1})
+    con_año = sum(p["eventos"] for p in canonica)
+    assert 0 < con_año <= int(lista.headers["X-Total-Count"])
+
+
+def test_por_region_devuelve_nombres_canonicos(cliente):
+    serie = cliente.get("/conflicto/serie/año", params={"por": "region"}).json()
+    regiones = list(dict.fromkeys(p["region"] for p in serie))
+    assert "Araucanía" in regiones
+    assert regiones == sorted(regiones, key=lambda r: (r is not None, r or ""))
+
+
+@pytest.mark.parametrize("periodo, params", [
+    ("mes", {"ventana": 6}),
+    ("trimestre", {"ventana": 3, "por": "region"}),
+    ("año", {"ventana": 4, "por": "tipo_evento"}),
+    ("mes", {"acumulado": "true", "por": "tipo_evento"}),
+    ("año", {"acumulado": "true"}),
+])
+def test_rango_igual_al_tramo_de_la_serie_completa(cliente, periodo, params):
+    completa = cliente.get(f"/conflicto/serie/{periodo}", params=params).json()
+    for desde, hasta in [(2000, 2005), (1995, 1995), (2018, 2030)]:
+        rango = cliente.get(f"/conflicto/serie/{periodo}", params=dict(params, desde=desde, hasta=hasta)).json()
+        assert rango
+        assert rango == [p for p in completa if desde <= p["año"] <= hasta], (desde, hasta)
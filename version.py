@@ -0,0 +1,34 @@
+# version.py
+import os
+import threading
+from models import engine
+
+# Contador local para cambios hechos por este proceso (p. ej. una carga en caliente)
+_contador = 0
+_lock = threading.Lock()
+
+
+def incrementar_version():
+    global _contador
+    with _lock:
+        _contador += 1
+    return _contador
+
+
+def version_datos():
+    """Versión del dataset sin consultar la base de datos.
+
+    Combina el contador local con la fecha de modificación y el tamaño de
+    mdp.db (y de su archivo -wal si existe), así que cambia con cualquier
+    escritura hecha por este u otro proceso.
+    """
+    partes = [str(_contador)]
+    ruta = engine.url.database
+    if ruta and ruta != ":memory:":
+        for sufijo in ("", "-wal"):
+            try:
+                st = os.stat(ruta + sufijo)
+            except FileNotFoundError:
+                continue
+            partes.append(f"{st.st_mtime_ns:x}.{st.st_size:x}")
+    return "-".join(partes)